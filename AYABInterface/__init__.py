@@ -18,6 +18,18 @@ def NeedlePositions(*args, **kw):
     return NeedlePositions(*args, **kw)
 
 
+def RepeatedNeedlePositions(*args, **kw):
+    """Create a new RepeatedNeedlePositions object.
+
+    :return: an :class:`AYABInterface.needle_positions.RepeatedNeedlePositions`
+
+    .. seealso::
+      :class:`AYABInterface.needle_positions.RepeatedNeedlePositions`
+    """
+    from .needle_positions import RepeatedNeedlePositions
+    return RepeatedNeedlePositions(*args, **kw)
+
+
 def get_machines():
     """Return a list of all machines that can be used.
 
@@ -38,4 +50,18 @@ def get_connections():
     from .serial import list_serial_ports
     return list_serial_ports()
 
-__all__ = ["NeedlePositions", "get_machines", "get_connections"]
+
+def get_ayab_connections():
+    """Return a list of the serial connections with an AYAB shield.
+
+    :rtype: list
+    :return: a list of :class:`AYABInterface.SerialPort` which answered a
+      :ref:`reqinfo`. Their ``controller`` attribute contains the answer.
+
+    .. seealso:: :func:`AYABInterface.discovery.list_ayab_ports`
+    """
+    from .discovery import list_ayab_ports
+    return list_ayab_ports()
+
+__all__ = ["NeedlePositions", "RepeatedNeedlePositions", "get_machines",
+           "get_connections", "get_ayab_connections"]
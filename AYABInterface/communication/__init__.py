@@ -5,6 +5,13 @@ Requirement: Make objects from binary stuff.
 from .hardware_messages import read_message_type, ConnectionClosed
 from .states import WaitingForStart
 from .cache import NeedlePositionCache
+from .history import MessageHistory, ReadRecorder
+from .framing import FrameReader, CompleteReader, read_timed_out
+from .observers import SynchronousDispatcher, ParallelDispatcher, BLOCK
+from .latency import LineLatency
+from .profiling import hooks as _profiling_hooks, measure, \
+    READ_MESSAGE_TYPE, RECEIVE_MESSAGE, ENTER_STATE, SEND_MESSAGE
+from ..utils import perf_counter_ns
 from threading import RLock, Thread
 from itertools import chain
 from time import sleep
@@ -16,7 +23,8 @@ class Communication(object):
 
     def __init__(self, file, get_needle_positions, machine,
                  on_message_received=(), left_end_needle=None,
-                 right_end_needle=None):
+                 right_end_needle=None, history_capacity=None,
+                 resynchronize=False, push_lines_ahead=False):
         """Create a new Communication object.
 
         :param file: a file-like object with read and write methods for the
@@ -37,14 +45,33 @@ class Communication(object):
         :param right_end_needle: A needle number on the machine.
           Other needles that are on the right side of this needle are not used
           for knitting. Their needle positions are not be set.
+        :param int history_capacity: the size in bytes of the :attr:`history`
+          of sent and received messages. If it is :obj:`None`, no history is
+          kept.
+        :param bool resynchronize: whether to read only valid frames from
+          the :paramref:`file`. Bytes that do not belong to a valid message
+          are dropped instead of being read as an
+          :class:`~AYABInterface.communication.hardware_messages.UnknownMessage`.
+          See :attr:`frame_reader`.
+        :param bool push_lines_ahead: whether to send the :ref:`cnfline` of
+          the next line right after the requested line. The controller can
+          then read the next line from its buffer without waiting for the
+          host. This requires a firmware that handles the
+          :ref:`cnfline` messages in order. See :meth:`pushes_lines_ahead`.
 
         """
+        self._connection = file
+        self._frame_reader = None
+        if resynchronize:
+            file = self._frame_reader = FrameReader(file)
         self._file = file
         self._on_message_received = on_message_received
         self._machine = machine
         self._state = WaitingForStart(self)
         self._controller = None
         self._last_requested_line_number = 0
+        self._push_lines_ahead = push_lines_ahead
+        self._pushed_line_number = None
         self._needle_positions_cache = NeedlePositionCache(
             get_needle_positions, self._machine)
         self._left_end_needle = (
@@ -57,6 +84,13 @@ class Communication(object):
         self._thread = None
         self._number_of_threads_receiving_messages = 0
         self._on_message = []
+        self._dispatcher = SynchronousDispatcher()
+        self._line_latency = LineLatency()
+        self._on_frame = []
+        self._history = None
+        if history_capacity is not None:
+            self._history = MessageHistory(history_capacity)
+            self.on_frame(self._record_in_history)
 
     @property
     def needle_positions(self):
@@ -66,6 +100,53 @@ class Communication(object):
         """
         return self._needle_positions_cache
 
+    @property
+    def history(self):
+        """The history of the raw messages sent and received.
+
+        :rtype: AYABInterface.communication.history.MessageHistory
+        :return: the history or :obj:`None` if no :paramref:`history_capacity
+          <__init__.history_capacity>` was given
+
+        Use this for a post-mortem analysis of failed knitting jobs:
+
+        .. code:: python
+
+            with open("messages.bin", "wb") as file:
+                communication.history.write_to(file)
+
+        """
+        return self._history
+
+    @property
+    def frame_reader(self):
+        """The reader that drops invalid bytes from the controller.
+
+        :rtype: AYABInterface.communication.framing.FrameReader
+        :return: the frame reader or :obj:`None` if :paramref:`resynchronize
+          <__init__.resynchronize>` is :obj:`False`
+
+        .. code:: python
+
+            print(communication.frame_reader.dropped_bytes, "bytes dropped")
+
+        """
+        return self._frame_reader
+
+    @property
+    def line_latency(self):
+        """The time it takes to answer a reqLine with a cnfLine.
+
+        :rtype: AYABInterface.communication.latency.LineLatency
+
+        .. code:: python
+
+            turnaround = communication.line_latency.histogram()
+            print(turnaround.percentile(99) / 1e6, "ms")
+
+        """
+        return self._line_latency
+
     def start(self):
         """Start the communication about a content.
 
@@ -79,9 +160,13 @@ class Communication(object):
     def _message_received(self, message):
         """Notify the observers about the received message."""
         with self.lock:
-            self._state.receive_message(message)
-            for callable in chain(self._on_message_received, self._on_message):
-                callable(message)
+            if _profiling_hooks:
+                measure(RECEIVE_MESSAGE, self._state,
+                        self._state.receive_message, message)
+            else:
+                self._state.receive_message(message)
+            self._dispatcher.notify(
+                chain(self._on_message_received, self._on_message), message)
 
     def on_message(self, callable):
         """Add an observer to received messages.
@@ -93,12 +178,62 @@ class Communication(object):
         """
         self._on_message.append(callable)
 
+    def on_frame(self, callable):
+        """Add an observer to the raw bytes of the messages.
+
+        :param callable: a callable that is called with the message and the
+          bytes of the message every time a
+          :class:`AYABInterface.communication.host_messages.Message` is sent or
+          a :class:`AYABInterface.communication.hardware_messages.Message` is
+          received. The bytes include the ``b"\\r\\n"`` at the end.
+
+        In contrast to :meth:`on_message`, these observers are always called
+        directly while the :attr:`lock` is held. They should be fast.
+        """
+        self._on_frame.append(callable)
+
+    def _frame_transferred(self, message, frame):
+        """Notify the frame observers."""
+        for callable in self._on_frame:
+            callable(message, frame)
+
+    def _record_in_history(self, message, frame):
+        """Add the frame to the history."""
+        self._history.append(frame, message.is_from_host())
+
     def receive_message(self):
-        """Receive a message from the file."""
+        """Receive a message from the file.
+
+        If the file has a read timeout and no message arrives in time, no
+        message is received. The bytes of a message which is only partially
+        read are waited for.
+        """
         with self.lock:
             assert self.can_receive_messages()
-            message_type = self._read_message_type(self._file)
-            message = message_type(self._file, self)
+            if not self._on_frame:
+                file = self._file
+            else:
+                file = ReadRecorder(self._file)
+            if _profiling_hooks:
+                message_type = measure(READ_MESSAGE_TYPE, self,
+                                       self._read_message_type, file)
+            else:
+                message_type = self._read_message_type(file)
+            if message_type is ConnectionClosed and \
+                    read_timed_out(self._connection):
+                return
+            frame_start = perf_counter_ns()
+            if self._frame_reader is None and \
+                    getattr(self._connection, "timeout", None) is not None:
+                message = message_type(
+                    CompleteReader(file, self._connection), self)
+            else:
+                message = message_type(file, self)
+            if message.is_line_request():
+                self._line_latency.line_requested(frame_start,
+                                                  perf_counter_ns())
+            if self._on_frame and file.bytes:
+                self._frame_transferred(message, file.bytes)
             self._message_received(message)
 
     def can_receive_messages(self):
@@ -120,9 +255,15 @@ class Communication(object):
                 not self._state.is_connection_closed()
 
     def stop(self):
-        """Stop the communication with the shield."""
+        """Stop the communication with the shield.
+
+        If the observers were :meth:`parallelized <parallelize_observers>`,
+        the queued notifications are delivered and the thread stops.
+        """
         with self.lock:
             self._message_received(ConnectionClosed(self._file, self))
+            dispatcher = self._dispatcher
+        dispatcher.close()
 
     def api_version_is_supported(self, api_version):
         """Return whether an api version is supported by this class.
@@ -144,10 +285,19 @@ class Communication(object):
           :paramref:`host_message_class` as arguments
         """
         message = host_message_class(self._file, self, *args)
+        is_line_confirmation = message.is_line_confirmation()
         with self.lock:
-            message.send()
-            for callable in self._on_message:
-                callable(message)
+            if is_line_confirmation:
+                self._line_latency.line_looked_up()
+            if _profiling_hooks:
+                measure(SEND_MESSAGE, message, message.send)
+            else:
+                message.send()
+            if is_line_confirmation:
+                self._line_latency.line_written()
+            if self._on_frame:
+                self._frame_transferred(message, message.as_bytes() + b'\r\n')
+            self._dispatcher.notify(self._on_message, message)
 
     @property
     def state(self):
@@ -177,7 +327,10 @@ class Communication(object):
         with self.lock:
             self._state.exit()
             self._state = new_state
-            self._state.enter()
+            if _profiling_hooks:
+                measure(ENTER_STATE, new_state, new_state.enter)
+            else:
+                new_state.enter()
 
     @property
     def left_end_needle(self):
@@ -241,6 +394,45 @@ class Communication(object):
         """Set the last requested line number."""
         self._last_requested_line_number = line_number
 
+    def pushes_lines_ahead(self):
+        """Whether the next line is sent before it is requested.
+
+        :rtype: bool
+
+        When a line is requested, its :ref:`cnfline` is followed by the
+        :ref:`cnfline` of the next line. When the next line is requested,
+        it is not sent again. The :attr:`line_latency` then measures the
+        time until the line after the requested line is written.
+
+        If the controller requests a different line, e.g. because it
+        repeats a line, the pushed line is already on its way to the
+        controller and arrives before the requested line. Its line number
+        does not match the :ref:`reqline`, so the controller drops it, see
+        :ref:`cnfline`. The requested line is sent and no line is pushed
+        after it, so that the requested line is the only one the controller
+        receives after the stale one. Pushing resumes with the next
+        request.
+
+        .. seealso:: :attr:`pushed_line_number`
+        """
+        return self._push_lines_ahead
+
+    @property
+    def pushed_line_number(self):
+        """The number of the line that was sent before it was requested.
+
+        :rtype: int
+        :return: the line number or :obj:`None` if no line was pushed ahead
+
+        .. seealso:: :meth:`pushes_lines_ahead`
+        """
+        return self._pushed_line_number
+
+    @pushed_line_number.setter
+    def pushed_line_number(self, line_number):
+        """Set the pushed line number."""
+        self._pushed_line_number = line_number
+
     def parallelize(self, seconds_to_wait=2):
         """Start a parallel thread for receiving messages.
 
@@ -280,6 +472,31 @@ class Communication(object):
             with self._lock:
                 self._number_of_threads_receiving_messages -= 1
 
+    def parallelize_observers(self, max_size=1024, policy=BLOCK):
+        """Notify the observers in a separate thread.
+
+        By default, the observers from :paramref:`on_message_received
+        <__init__.on_message_received>` and :meth:`on_message` are called
+        while the :attr:`lock` is held, so slow observers delay the answers
+        to the controller. After calling this, the messages are queued and
+        the observers are called in a separate thread in the same order.
+
+        :param int max_size: the maximum number of queued notifications
+        :param str policy: the backpressure policy if the queue is full, one
+          of :data:`~AYABInterface.communication.observers.POLICIES`
+        :rtype: AYABInterface.communication.observers.ParallelDispatcher
+        :return: the dispatcher which notifies the observers
+
+        .. seealso:: :meth:`stop`
+        """
+        dispatcher = ParallelDispatcher(max_size, policy)
+        with self.lock:
+            old_dispatcher = self._dispatcher
+            self._dispatcher = dispatcher
+        # queued observers may need the lock to finish
+        old_dispatcher.close()
+        return dispatcher
+
     def runs_in_parallel(self):
         """Whether the communication runs in parallel.
 
@@ -1,10 +1,19 @@
 """Convert and cache needle positions."""
+from collections import OrderedDict
 from crc8 import crc8
 
+#: the number of needle positions :class:`NeedlePositionCache` remembers the
+#: bytes of. A repeat of up to this many rows is converted only once.
+ROW_TABLE_SIZE = 256
+
 
 class NeedlePositionCache(object):
 
-    """Convert and cache needle positions."""
+    """Convert and cache needle positions.
+
+    Patterns with repeats have many lines with the same needle positions.
+    Their bytes are shared by all these lines, see :meth:`get_bytes`.
+    """
 
     def __init__(self, get_needle_positions, machine):
         """Create a new NeedlePositions object."""
@@ -13,6 +22,10 @@ class NeedlePositionCache(object):
         self._get_cache = {}
         self._needle_position_bytes_cache = {}
         self._line_configuration_message_cache = {}
+        self._interned_bytes = {}
+        self._row_table = OrderedDict()
+        self._hits = 0
+        self._misses = 0
 
     def get(self, line_number):
         """Return the needle positions or None.
@@ -49,10 +62,48 @@ class NeedlePositionCache(object):
             if line is None:
                 line_bytes = None
             else:
-                line_bytes = self._machine.needle_positions_to_bytes(line)
+                line_bytes = self._intern(line)
             self._needle_position_bytes_cache[line_number] = line_bytes
         return self._needle_position_bytes_cache[line_number]
 
+    def _intern(self, line):
+        """Convert the needle positions unless they were converted before.
+
+        The bytes of the :data:`ROW_TABLE_SIZE` most recently used needle
+        positions are remembered, so a repeat of up to this many rows is
+        converted only once. Equal bytes are always shared.
+        """
+        try:
+            key = tuple(line)
+            line_bytes = self._row_table.get(key)
+        except TypeError:
+            # the needle positions can not be compared by content
+            key = line_bytes = None
+        if line_bytes is not None:
+            self._row_table.move_to_end(key)
+        else:
+            line_bytes = self._machine.needle_positions_to_bytes(line)
+            line_bytes = self._interned_bytes.setdefault(line_bytes,
+                                                         line_bytes)
+            if key is not None:
+                if len(self._row_table) >= ROW_TABLE_SIZE:
+                    self._row_table.popitem(last=False)
+                self._row_table[key] = line_bytes
+        return line_bytes
+
+    @property
+    def distinct_lines(self):
+        """The number of different bytes of the needle positions.
+
+        :rtype: int
+
+        Lines with the same needle positions share the result of
+        :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes`.
+        Only the line number, the last line flag and the checksum of their
+        :meth:`cnfLine messages <get_line_configuration_message>` differ.
+        """
+        return len(self._interned_bytes)
+
     def get_line_configuration_message(self, line_number):
         """Return the cnfLine content without id for the line.
 
@@ -60,7 +111,10 @@ class NeedlePositionCache(object):
         :rtype: bytes
         :return: a cnfLine message without id as defined in :ref:`cnfLine`
         """
-        if line_number not in self._line_configuration_message_cache:
+        if line_number in self._line_configuration_message_cache:
+            self._hits += 1
+        else:
+            self._misses += 1
             line_bytes = self.get_bytes(line_number)
             if line_bytes is not None:
                 line_bytes = bytes([line_number & 255]) + line_bytes
@@ -77,4 +131,48 @@ class NeedlePositionCache(object):
             line += crc8(line).digest()
         return line
 
-__all__ = ["NeedlePositionCache"]
+    def __len__(self):
+        """The number of cached entries.
+
+        :rtype: int
+
+        Each line can have up to three entries: the needle positions, their
+        bytes and the cnfLine message.
+        """
+        return (len(self._get_cache) + len(self._needle_position_bytes_cache) +
+                len(self._line_configuration_message_cache))
+
+    @property
+    def hits(self):
+        """How often a cnfLine message was found in the cache.
+
+        :rtype: int
+
+        .. seealso:: :meth:`get_line_configuration_message`
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """How often a cnfLine message had to be computed.
+
+        :rtype: int
+
+        .. seealso:: :meth:`get_line_configuration_message`
+        """
+        return self._misses
+
+    @property
+    def hit_rate(self):
+        """The ratio of :attr:`hits` to all lookups.
+
+        :rtype: float
+        :return: a value between ``0`` and ``1`` or :obj:`None` if no message
+          was looked up
+        """
+        lookups = self._hits + self._misses
+        if not lookups:
+            return None
+        return self._hits / lookups
+
+__all__ = ["NeedlePositionCache", "ROW_TABLE_SIZE"]
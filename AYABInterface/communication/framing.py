@@ -0,0 +1,239 @@
+"""Split the bytes from the controller into valid frames.
+
+Without framing, a stray byte on the line is read as an
+:class:`~AYABInterface.communication.hardware_messages.UnknownMessage`
+which skips everything up to the next ``b"\\r\\n"``. This can swallow a
+:ref:`reqline` and cost a whole row.
+
+A :class:`FrameReader` wraps the file of the controller. It only lets
+frames through that
+
+- start with a known :attr:`message id
+  <AYABInterface.communication.hardware_messages.Message.MESSAGE_ID>`,
+- have the :attr:`payload length
+  <AYABInterface.communication.hardware_messages.LineRequest.PAYLOAD_LENGTH>`
+  of this message type and
+- end with ``b"\\r\\n"``.
+
+If a frame is not valid, its first byte is dropped and the next byte is
+tried as the start of a frame. :ref:`debug` messages have no fixed length.
+They are valid if they contain only printable characters and are not
+longer than :data:`MAXIMUM_DEBUG_LENGTH`.
+
+If the file has a read timeout and a read times out, the bytes of an
+incomplete frame are kept until the rest of the frame arrives, see
+:func:`read_timed_out`.
+
+.. code:: python
+
+    communication = Communication(serial, get_needle_positions, machine,
+                                  resynchronize=True)
+    # ...
+    print(communication.frame_reader.dropped_bytes)
+
+"""
+from .hardware_messages import message_type_by_id
+
+#: the maximum number of bytes between the id and the end of a debug message
+MAXIMUM_DEBUG_LENGTH = 255
+_END_OF_FRAME = b"\r\n"
+_PRINTABLE = frozenset(range(0x20, 0x7f)) | frozenset(b"\t")
+
+
+def read_timed_out(file):
+    """Whether an empty read from a file was a timeout.
+
+    :param file: the file that returned ``b""``, e.g. a
+      :class:`serial.Serial`
+    :rtype: bool
+    :return: whether the file has a read timeout and is still open. Other
+      files return ``b""`` only when they are closed.
+    """
+    return getattr(file, "timeout", None) is not None and \
+        getattr(file, "is_open", False) is True
+
+
+class CompleteReader(object):
+
+    """A file wrapper that waits for all the bytes of a read.
+
+    Reads that :func:`time out <read_timed_out>` are repeated until the
+    requested bytes arrive or the file is closed.
+    """
+
+    def __init__(self, file, connection=None):
+        """Create a new CompleteReader.
+
+        :param file: the file to read from, e.g. a :class:`serial.Serial`
+          with a read timeout
+        :param connection: the file whose timeout is checked if
+          :paramref:`file` wraps it, defaults to :paramref:`file`
+        """
+        self._file = file
+        self._connection = file if connection is None else connection
+
+    def read(self, size=1):
+        """Read :paramref:`size` bytes unless the file is closed before."""
+        data = b""
+        while len(data) < size:
+            more = self._file.read(size - len(data))
+            if not more and not read_timed_out(self._connection):
+                break
+            data += more
+        return data
+
+
+class FrameReader(object):
+
+    """A file wrapper that reads only valid frames."""
+
+    def __init__(self, file):
+        """Create a new FrameReader.
+
+        :param file: the file-like object connected to the controller, e.g.
+          a :class:`serial.Serial`
+        """
+        self._file = file
+        self._timed_out = False
+        self._pending = bytearray()
+        self._frame = b""
+        self._offset = 0
+        self._dropped_bytes = 0
+        self._resynchronizations = 0
+        self._on_dropped = []
+
+    @property
+    def dropped_bytes(self):
+        """The number of bytes which were not part of a valid frame.
+
+        :rtype: int
+        """
+        return self._dropped_bytes
+
+    @property
+    def resynchronizations(self):
+        """How often bytes were dropped until a valid frame was found.
+
+        :rtype: int
+        """
+        return self._resynchronizations
+
+    def on_dropped(self, callable):
+        """Add an observer to the dropped bytes.
+
+        :param callable: a callable that is called with the :class:`bytes`
+          which were dropped before a valid frame or the end of the file
+        """
+        self._on_dropped.append(callable)
+
+    def _fill(self, size):
+        """Read from the file until :paramref:`size` bytes are pending.
+
+        :rtype: bool
+        :return: whether enough bytes could be read
+        """
+        pending = self._pending
+        while len(pending) < size:
+            data = self._file.read(size - len(pending))
+            if not data:
+                self._timed_out = read_timed_out(self._file)
+                return False
+            pending.extend(data)
+        return True
+
+    def _debug_frame_length(self):
+        """The length of the debug frame at the start or :obj:`None`."""
+        pending = self._pending
+        index = 1
+        while index <= MAXIMUM_DEBUG_LENGTH + 1:
+            if not self._fill(index + 1):
+                return None
+            byte = pending[index]
+            if byte == 0x0d:
+                if not self._fill(index + 2):
+                    return None
+                if pending[index + 1] == 0x0a:
+                    return index + 2
+                return None
+            if byte not in _PRINTABLE:
+                return None
+            index += 1
+        return None
+
+    def _frame_length(self):
+        """The length of the valid frame at the start or :obj:`None`."""
+        message_type = message_type_by_id(self._pending[0])
+        if message_type is None:
+            return None
+        payload_length = message_type.PAYLOAD_LENGTH
+        if payload_length is None:
+            return self._debug_frame_length()
+        length = 1 + payload_length + len(_END_OF_FRAME)
+        if not self._fill(length):
+            return None
+        if self._pending[length - 2:length] != _END_OF_FRAME:
+            return None
+        return length
+
+    def _drop(self, dropped):
+        """Count the dropped bytes and notify the observers."""
+        if not dropped:
+            return
+        self._dropped_bytes += len(dropped)
+        self._resynchronizations += 1
+        dropped = bytes(dropped)
+        for callable in self._on_dropped:
+            callable(dropped)
+
+    def read_frame(self):
+        """Read the next valid frame.
+
+        :rtype: bytes
+        :return: the frame including the ``b"\\r\\n"`` at the end or
+          ``b""`` if the file ends or a read timed out
+        """
+        pending = self._pending
+        dropped = bytearray()
+        self._timed_out = False
+        while self._fill(1):
+            length = self._frame_length()
+            if length is not None:
+                self._drop(dropped)
+                frame = bytes(pending[:length])
+                del pending[:length]
+                return frame
+            if self._timed_out:
+                break
+            dropped.append(pending.pop(0))
+        if not self._timed_out:
+            dropped.extend(pending)
+            pending.clear()
+        self._drop(dropped)
+        return b""
+
+    def read(self, size=1):
+        """Read bytes of valid frames.
+
+        :rtype: bytes
+        :return: up to :paramref:`size` bytes of the current frame or
+          ``b""`` if the file ends
+        """
+        if self._offset >= len(self._frame):
+            self._frame = self.read_frame()
+            self._offset = 0
+        data = self._frame[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def write(self, data):
+        """Write to the file."""
+        return self._file.write(data)
+
+    def close(self):
+        """Close the file."""
+        close = getattr(self._file, "close", None)
+        if close is not None:
+            close()
+
+__all__ = ["FrameReader", "CompleteReader", "read_timed_out",
+           "MAXIMUM_DEBUG_LENGTH"]
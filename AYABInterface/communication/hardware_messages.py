@@ -2,6 +2,7 @@
 from ..utils import next_line
 from collections import namedtuple
 from .carriages import id_to_carriage_type
+from .profiling import hooks as _profiling_hooks, measure, INIT_MESSAGE
 import struct
 
 
@@ -13,7 +14,10 @@ class Message(object):
         """Create a new Message."""
         self._file = file
         self._communication = communication
-        self._init()
+        if _profiling_hooks:
+            measure(INIT_MESSAGE, self, self._init)
+        else:
+            self._init()
 
     def _init(self):
         """Initialize the message.
@@ -151,6 +155,8 @@ class SuccessConfirmation(FixedSizeMessage):
 
     """Base class for massages of success and failure."""
 
+    PAYLOAD_LENGTH = 1  #: The number of bytes between id and b"\r\n"
+
     def _init(self):
         """Read the success byte."""
         self._success = self._file.read(1)
@@ -246,6 +252,7 @@ class InformationConfirmation(FixedSizeMessage):
     """
 
     MESSAGE_ID = 0xc3  #: The first byte that indicates this message
+    PAYLOAD_LENGTH = 3  #: The number of bytes between id and b"\r\n"
 
     def is_information_confirmation(self):
         """Whether this is a InformationConfirmation message.
@@ -330,6 +337,7 @@ class LineRequest(FixedSizeMessage):
     """
 
     MESSAGE_ID = 0x82  #: The first byte that indicates this message
+    PAYLOAD_LENGTH = 1  #: The number of bytes between id and b"\r\n"
 
     def is_line_request(self):
         """Whether this is a LineRequest message.
@@ -363,6 +371,7 @@ class StateIndication(FixedSizeMessage):
     """
 
     MESSAGE_ID = 0x84  #: The first byte that indicates this message
+    PAYLOAD_LENGTH = 7  #: The number of bytes between id and b"\r\n"
 
     def is_state_indication(self):
         """Whether this is a InformationConfirmation message.
@@ -435,6 +444,7 @@ class Debug(Message):
     """
 
     MESSAGE_ID = 0x23
+    PAYLOAD_LENGTH = None  #: The debug output has a variable length
 
     def is_debug(self):
         """Whether this is a Debug message.
@@ -482,6 +492,15 @@ for message_type in list(globals().values()):
 del message_type, message_id
 
 
+def message_type_by_id(message_id):
+    """The message type for the first byte of a message.
+
+    :param int message_id: the first byte of the message
+    :return: the message type or :obj:`None` if the id is unknown
+    """
+    return _message_types.get(message_id)
+
+
 def read_message_type(file):
     """Read the message type from a file."""
     message_byte = file.read(1)
@@ -490,8 +509,8 @@ def read_message_type(file):
     message_number = message_byte[0]
     return _message_types.get(message_number, UnknownMessage)
 
-__all__ = ["read_message_type", "StateIndication", "LineRequest",
-           "TestConfirmation", "InformationConfirmation", "Debug",
-           "StartConfirmation", "SuccessConfirmation",
+__all__ = ["read_message_type", "message_type_by_id", "StateIndication",
+           "LineRequest", "TestConfirmation", "InformationConfirmation",
+           "Debug", "StartConfirmation", "SuccessConfirmation",
            "UnknownMessage", "Message", "ConnectionClosed", "FirmwareVersion",
            "FixedSizeMessage"]
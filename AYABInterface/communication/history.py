@@ -0,0 +1,207 @@
+"""Keep a bounded history of the messages sent and received.
+
+The history is a ring buffer in a preallocated :class:`bytearray`.
+Each record consists of a header and the raw bytes of the message:
+
+- 8 bytes: the :func:`time.monotonic` timestamp as little endian double
+- 1 byte: ``1`` if the message was sent by the host, ``0`` if it was
+  received from the controller
+- 2 bytes: the length of the message as little endian unsigned short
+- the bytes of the message including the ``b"\\r\\n"``
+
+When the buffer is full, the oldest records are overwritten.
+"""
+from collections import deque, namedtuple
+from time import monotonic
+import struct
+
+_HEADER = struct.Struct("<dBH")
+HEADER_SIZE = _HEADER.size  #: the size of the header of each record
+DEFAULT_CAPACITY = 65536  #: the default size of the buffer in bytes
+
+Record = namedtuple("Record", ["timestamp", "is_from_host", "bytes"])
+
+
+class MessageHistory(object):
+
+    """A fixed-capacity ring buffer of raw messages with timestamps."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Create a new MessageHistory.
+
+        :param int capacity: the size of the buffer in bytes
+        :raises ValueError: if the capacity can not hold a single record
+        """
+        if capacity <= HEADER_SIZE:
+            raise ValueError("The capacity is {} but at least {} is expected."
+                             "".format(capacity, HEADER_SIZE + 1))
+        self._buffer = bytearray(capacity)
+        self._offsets = deque()
+        self._end = 0
+        self._wrap = 0
+        self._dropped = 0
+
+    @property
+    def capacity(self):
+        """The size of the buffer in bytes.
+
+        :rtype: int
+        """
+        return len(self._buffer)
+
+    @property
+    def dropped(self):
+        """The number of records that were overwritten.
+
+        :rtype: int
+        """
+        return self._dropped
+
+    def append(self, message_bytes, is_from_host, timestamp=None):
+        """Add a message to the history.
+
+        :param bytes message_bytes: the raw bytes of the message
+        :param bool is_from_host: whether the message is sent by the host
+        :param float timestamp: the :func:`time.monotonic` time of the
+          message. If it is :obj:`None`, the current time is used.
+        :raises ValueError: if the record does not fit into the buffer
+        """
+        size = HEADER_SIZE + len(message_bytes)
+        if size > len(self._buffer) or len(message_bytes) > 0xffff:
+            raise ValueError("A message of {} bytes does not fit into a "
+                             "history of {} bytes.".format(
+                                 len(message_bytes), len(self._buffer)))
+        if timestamp is None:
+            timestamp = monotonic()
+        offsets = self._offsets
+        start = self._end
+        if start + size > len(self._buffer):
+            # the records after the end belong to the last lap
+            while offsets and offsets[0] >= start:
+                offsets.popleft()
+                self._dropped += 1
+            self._wrap = start
+            start = 0
+        end = start + size
+        while offsets and start <= offsets[0] < end:
+            offsets.popleft()
+            self._dropped += 1
+        _HEADER.pack_into(self._buffer, start, timestamp, bool(is_from_host),
+                          len(message_bytes))
+        self._buffer[start + HEADER_SIZE:end] = message_bytes
+        offsets.append(start)
+        self._end = end
+
+    def __len__(self):
+        """The number of records in the history.
+
+        :rtype: int
+        """
+        return len(self._offsets)
+
+    def views(self):
+        """Return the records as memory views without copying.
+
+        :rtype: list
+        :return: a list of up to two :class:`memoryviews <memoryview>` which
+          contain the records from the oldest to the newest in the format
+          described in :mod:`this module
+          <AYABInterface.communication.history>`
+
+        The views are only valid until the next :meth:`append`.
+        """
+        if not self._offsets:
+            return []
+        view = memoryview(self._buffer)
+        first = self._offsets[0]
+        if first < self._end:
+            return [view[first:self._end]]
+        return [view[first:self._wrap], view[:self._end]]
+
+    def __iter__(self):
+        """Iterate over the records from the oldest to the newest.
+
+        :return: an iterator over :class:`Records <Record>`. The
+          :attr:`Record.bytes` are :class:`memoryviews <memoryview>`.
+        """
+        view = memoryview(self._buffer)
+        for offset in list(self._offsets):
+            timestamp, is_from_host, length = \
+                _HEADER.unpack_from(self._buffer, offset)
+            start = offset + HEADER_SIZE
+            yield Record(timestamp, bool(is_from_host),
+                         view[start:start + length])
+
+    def write_to(self, file):
+        """Write the records to a file.
+
+        :param file: a binary file-like object with a ``write`` method
+        :return: the number of bytes written
+        :rtype: int
+
+        The records can be read again with :func:`read_records`.
+        """
+        written = 0
+        for view in self.views():
+            file.write(view)
+            written += len(view)
+        return written
+
+    def clear(self):
+        """Remove all records from the history."""
+        self._offsets.clear()
+        self._end = 0
+        self._wrap = 0
+
+
+class ReadRecorder(object):
+
+    """A file wrapper that remembers the bytes read from it."""
+
+    def __init__(self, file):
+        """Create a new ReadRecorder.
+
+        :param file: a file-like object with a ``read`` method
+        """
+        self._file = file
+        self._read = []
+
+    def read(self, *args):
+        """Read from the file and remember the bytes."""
+        data = self._file.read(*args)
+        self._read.append(data)
+        return data
+
+    def write(self, data):
+        """Write to the file."""
+        return self._file.write(data)
+
+    @property
+    def bytes(self):
+        """The bytes read so far.
+
+        :rtype: bytes
+        """
+        return b''.join(self._read)
+
+
+def read_records(data):
+    """Read records written by :meth:`MessageHistory.write_to`.
+
+    :param bytes data: the bytes in the format of :mod:`this module
+      <AYABInterface.communication.history>`
+    :return: a list of :class:`Records <Record>`
+    :rtype: list
+    """
+    records = []
+    offset = 0
+    while offset < len(data):
+        timestamp, is_from_host, length = _HEADER.unpack_from(data, offset)
+        offset += HEADER_SIZE
+        records.append(Record(timestamp, bool(is_from_host),
+                              bytes(data[offset:offset + length])))
+        offset += length
+    return records
+
+__all__ = ["MessageHistory", "Record", "read_records", "ReadRecorder",
+           "HEADER_SIZE", "DEFAULT_CAPACITY"]
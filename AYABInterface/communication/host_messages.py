@@ -28,6 +28,14 @@ class Message(object):
         """
         return False
 
+    def is_line_confirmation(self):
+        """Whether this is a LineConfirmation message.
+
+        :rtype: bool
+        :return: :obj:`False`
+        """
+        return False
+
     def init(self):
         """Override this method."""
 
@@ -135,14 +143,28 @@ class LineConfirmation(Message):
     MESSAGE_ID = 0x42  #: the first byte to identify this message
 
     def init(self, line_number):
-        """Initialize the StartRequest with the line number."""
-        self._line_number = line_number
+        """Initialize the LineConfirmation with the line number.
 
-    def content_bytes(self):
-        """Return the start and stop needle."""
+        The content is looked up in the :attr:`needle positions
+        <AYABInterface.communication.Communication.needle_positions>`
+        when the message is created.
+        """
+        self._line_number = line_number
         get_message = \
             self._communication.needle_positions.get_line_configuration_message
-        return get_message(self._line_number)
+        self._content = get_message(line_number)
+
+    def is_line_confirmation(self):
+        """Whether this is a LineConfirmation message.
+
+        :rtype: bool
+        :return: :obj:`True`
+        """
+        return True
+
+    def content_bytes(self):
+        """Return the line number, needle positions and checksum."""
+        return self._content
 
 
 class InformationRequest(Message):
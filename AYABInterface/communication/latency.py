@@ -0,0 +1,245 @@
+"""Measure how fast the lines are answered.
+
+When the controller sends a :ref:`reqline`, the host has to answer with a
+:ref:`cnfline` before the carriage reaches the needles.
+:class:`LineLatency` records the time of each phase of this turnaround in a
+:class:`Histogram`.
+
+All times are measured in nanoseconds with
+:func:`~AYABInterface.utils.perf_counter_ns`.
+"""
+from ..utils import perf_counter_ns
+
+#: The number of bits to distinguish values of the same magnitude.
+#: With ``7`` bits, the relative error of a value is below ``2 ** -6``,
+#: about 1.6%.
+DEFAULT_SUB_BUCKET_BITS = 7
+
+PARSE = "parse"  #: the first byte is read until the reqLine is parsed
+LOOKUP = "lookup"  #: the reqLine is parsed until the cnfLine is created
+WRITE = "write"  #: the cnfLine is created until it is written
+TURNAROUND = "turnaround"  #: the first byte is read until cnfLine is written
+PHASES = (PARSE, LOOKUP, WRITE, TURNAROUND)  #: all the measured phases
+
+
+class Histogram(object):
+
+    """A histogram with logarithmic buckets and linear sub-buckets.
+
+    This is a simplified `HDR histogram <http://hdrhistogram.org/>`__.
+    Values below ``2 ** sub_bucket_bits`` are counted exactly.
+    Larger values are counted with a relative error below
+    ``2 ** (1 - sub_bucket_bits)``.
+    """
+
+    def __init__(self, sub_bucket_bits=DEFAULT_SUB_BUCKET_BITS):
+        """Create a new empty Histogram.
+
+        :param int sub_bucket_bits: the precision of the histogram
+        """
+        self._sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half_sub_bucket_count = self._sub_bucket_count >> 1
+        self.reset()
+
+    def reset(self):
+        """Remove all values."""
+        self._counts = {}
+        self._count = 0
+        self._total = 0
+        self._min = None
+        self._max = None
+
+    def _index(self, value):
+        """The index of the bucket the value is counted in."""
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._sub_bucket_bits
+        return shift * self._half_sub_bucket_count + (value >> shift)
+
+    def _highest_value(self, index):
+        """The highest value that is counted in the bucket."""
+        if index < self._sub_bucket_count:
+            return index
+        shift, sub_bucket = divmod(index - self._sub_bucket_count,
+                                   self._half_sub_bucket_count)
+        shift += 1
+        sub_bucket += self._half_sub_bucket_count
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value):
+        """Add a value to the histogram.
+
+        :param int value: a value ``>= 0``
+        :raises ValueError: if the value is negative
+        """
+        if value < 0:
+            raise ValueError("The value is {} but a value >= 0 was expected."
+                             "".format(value))
+        index = self._index(value)
+        counts = self._counts
+        counts[index] = counts.get(index, 0) + 1
+        self._count += 1
+        self._total += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    @property
+    def count(self):
+        """The number of recorded values.
+
+        :rtype: int
+        """
+        return self._count
+
+    @property
+    def total(self):
+        """The sum of the recorded values.
+
+        :rtype: int
+        """
+        return self._total
+
+    @property
+    def min(self):
+        """The lowest recorded value or :obj:`None`."""
+        return self._min
+
+    @property
+    def max(self):
+        """The highest recorded value or :obj:`None`."""
+        return self._max
+
+    @property
+    def mean(self):
+        """The average of the recorded values or :obj:`None`.
+
+        :rtype: float
+        """
+        if not self._count:
+            return None
+        return self._total / self._count
+
+    def percentile(self, percent):
+        """Return the value below which a percentage of values lie.
+
+        :param float percent: a number between ``0`` and ``100``
+        :return: the highest value equivalent to the percentile or
+          :obj:`None` if no value was recorded
+        :rtype: int
+        """
+        if not self._count:
+            return None
+        required = max(1, self._count * percent / 100)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= required:
+                return min(self._highest_value(index), self._max)
+        return self._max
+
+    def count_above(self, value):
+        """The number of recorded values above a value.
+
+        :param int value: the threshold
+        :rtype: int
+
+        Values in the same bucket as the :paramref:`value` are not counted.
+        """
+        index = self._index(value)
+        return sum(count for bucket, count in self._counts.items()
+                   if bucket > index)
+
+    def buckets(self):
+        """The non-empty buckets.
+
+        :rtype: list
+        :return: a list of ``(highest_value, count)`` tuples in ascending
+          order
+        """
+        return [(self._highest_value(index), self._counts[index])
+                for index in sorted(self._counts)]
+
+    def __repr__(self):
+        """This object as string.
+
+        :rtype: str
+        """
+        return "<{} count={} min={} max={}>".format(
+            self.__class__.__name__, self._count, self._min, self._max)
+
+
+class LineLatency(object):
+
+    """The latency between a reqLine and the cnfLine answering it."""
+
+    def __init__(self, sub_bucket_bits=DEFAULT_SUB_BUCKET_BITS):
+        """Create a new LineLatency object.
+
+        :param int sub_bucket_bits: the precision of the :class:`histograms
+          <Histogram>`
+        """
+        self._histograms = {phase: Histogram(sub_bucket_bits)
+                            for phase in PHASES}
+        self._pending = None
+        self._on_turnaround = []
+
+    def histogram(self, phase=TURNAROUND):
+        """Return the histogram of a phase.
+
+        :param str phase: one of :data:`PHASES`
+        :rtype: Histogram
+        """
+        return self._histograms[phase]
+
+    def line_requested(self, frame_start, parse_done):
+        """Notify that a reqLine was received.
+
+        :param int frame_start: the time the first byte was read
+        :param int parse_done: the time the message was parsed
+        """
+        self._pending = [frame_start, parse_done, None]
+
+    def line_looked_up(self):
+        """Notify that the cnfLine for the requested line was created."""
+        if self._pending is not None:
+            self._pending[2] = perf_counter_ns()
+
+    def line_written(self):
+        """Notify that the cnfLine was written and record the times."""
+        pending = self._pending
+        if pending is None or pending[2] is None:
+            return
+        self._pending = None
+        frame_start, parse_done, lookup_done = pending
+        write_done = perf_counter_ns()
+        histograms = self._histograms
+        histograms[PARSE].record(parse_done - frame_start)
+        histograms[LOOKUP].record(lookup_done - parse_done)
+        histograms[WRITE].record(write_done - lookup_done)
+        turnaround = write_done - frame_start
+        histograms[TURNAROUND].record(turnaround)
+        for on_turnaround in self._on_turnaround:
+            on_turnaround(turnaround)
+
+    def on_turnaround(self, callable):
+        """Add an observer for the turnaround times.
+
+        :param callable: a callable that is called with the turnaround time
+          in nanoseconds each time a cnfLine was written
+
+        Use this to alert when the turnaround approaches the tolerance of the
+        carriage.
+        """
+        self._on_turnaround.append(callable)
+
+    def reset(self):
+        """Remove all the recorded values."""
+        for histogram in self._histograms.values():
+            histogram.reset()
+        self._pending = None
+
+__all__ = ["Histogram", "LineLatency", "PHASES", "PARSE", "LOOKUP", "WRITE",
+           "TURNAROUND", "DEFAULT_SUB_BUCKET_BITS"]
@@ -0,0 +1,264 @@
+"""Export metrics of running communications.
+
+The :class:`MetricsRegistry` collects the metrics of several
+:class:`communications <AYABInterface.communication.Communication>` and
+renders them in the `Prometheus text exposition format
+<https://prometheus.io/docs/instrumenting/exposition_formats/>`__.
+
+.. code:: python
+
+    registry = MetricsRegistry()
+    registry.add_communication(communication, machine="KH-910 left")
+    print(registry.render())
+    server = registry.serve(9105)  # http://localhost:9105/metrics
+
+"""
+from .latency import TURNAROUND
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+
+#: the content type of :meth:`MetricsRegistry.render`
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+#: the quantiles of the turnaround time that are exported
+TURNAROUND_QUANTILES = (0.5, 0.9, 0.99, 1)
+
+_METRICS = [
+    # name, type, help
+    ("ayab_lines_served_total", "counter",
+     "The number of cnfLine messages sent."),
+    ("ayab_bytes_received_total", "counter",
+     "The number of bytes received from the controller."),
+    ("ayab_bytes_sent_total", "counter",
+     "The number of bytes sent to the controller."),
+    ("ayab_messages_received_total", "counter",
+     "The number of messages received by message type."),
+    ("ayab_messages_sent_total", "counter",
+     "The number of messages sent by message type."),
+    ("ayab_unknown_messages_total", "counter",
+     "The number of received messages with an unknown type."),
+    ("ayab_invalid_messages_total", "counter",
+     "The number of received messages that are not valid."),
+    ("ayab_dropped_bytes_total", "counter",
+     "The number of received bytes that were not part of a valid message."),
+    ("ayab_cache_hits_total", "counter",
+     "The number of cnfLine messages found in the cache."),
+    ("ayab_cache_misses_total", "counter",
+     "The number of cnfLine messages that were computed."),
+    ("ayab_state", "gauge",
+     "The state of the communication is 1."),
+    ("ayab_line_turnaround_seconds", "summary",
+     "The time from receiving a reqLine until the cnfLine is written."),
+]
+
+
+def _escape(value):
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace(
+        '"', '\\"')
+
+
+def _format_labels(labels):
+    """Format the labels as ``{name="value",...}``."""
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, _escape(value))
+                          for name, value in sorted(labels.items())) + "}"
+
+
+def _format_value(value):
+    """Format a sample value."""
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class CommunicationMetrics(object):
+
+    """The metrics of one communication."""
+
+    def __init__(self, communication, labels):
+        """Observe a communication.
+
+        :param AYABInterface.communication.Communication communication: the
+          communication to observe
+        :param dict labels: the labels to add to all the samples
+        """
+        self._communication = communication
+        self._labels = dict(labels)
+        self._lock = Lock()
+        self._lines_served = 0
+        self._bytes_received = 0
+        self._bytes_sent = 0
+        self._messages_received = {}
+        self._messages_sent = {}
+        self._unknown_messages = 0
+        self._invalid_messages = 0
+        communication.on_frame(self._frame_transferred)
+
+    @property
+    def labels(self):
+        """The labels of this communication.
+
+        :rtype: dict
+        """
+        return self._labels.copy()
+
+    def _frame_transferred(self, message, frame):
+        """Count the message."""
+        name = message.__class__.__name__
+        with self._lock:
+            if message.is_from_host():
+                self._bytes_sent += len(frame)
+                counts = self._messages_sent
+                if message.is_line_confirmation():
+                    self._lines_served += 1
+            else:
+                self._bytes_received += len(frame)
+                counts = self._messages_received
+                if message.is_unknown():
+                    self._unknown_messages += 1
+                elif not message.is_valid():
+                    self._invalid_messages += 1
+            counts[name] = counts.get(name, 0) + 1
+
+    def samples(self):
+        """The current values.
+
+        :rtype: list
+        :return: a list of ``(name, labels, value)`` tuples
+        """
+        labels = self._labels
+        cache = self._communication.needle_positions
+        with self._lock:
+            samples = [
+                ("ayab_lines_served_total", labels, self._lines_served),
+                ("ayab_bytes_received_total", labels, self._bytes_received),
+                ("ayab_bytes_sent_total", labels, self._bytes_sent),
+                ("ayab_unknown_messages_total", labels,
+                 self._unknown_messages),
+                ("ayab_invalid_messages_total", labels,
+                 self._invalid_messages)]
+            for name, counts in [
+                    ("ayab_messages_received_total", self._messages_received),
+                    ("ayab_messages_sent_total", self._messages_sent)]:
+                for message_type, count in sorted(counts.items()):
+                    samples.append((name, dict(labels, type=message_type),
+                                    count))
+        frame_reader = self._communication.frame_reader
+        if frame_reader is not None:
+            samples.append(("ayab_dropped_bytes_total", labels,
+                            frame_reader.dropped_bytes))
+        samples.append(("ayab_cache_hits_total", labels, cache.hits))
+        samples.append(("ayab_cache_misses_total", labels, cache.misses))
+        state = self._communication.state.__class__.__name__
+        samples.append(("ayab_state", dict(labels, state=state), 1))
+        turnaround = self._communication.line_latency.histogram(TURNAROUND)
+        if turnaround.count:
+            for quantile in TURNAROUND_QUANTILES:
+                value = turnaround.percentile(quantile * 100) / 1e9
+                samples.append(("ayab_line_turnaround_seconds",
+                                dict(labels, quantile=quantile), value))
+        samples.append(("ayab_line_turnaround_seconds_sum", labels,
+                        turnaround.total / 1e9))
+        samples.append(("ayab_line_turnaround_seconds_count", labels,
+                        turnaround.count))
+        return samples
+
+
+class MetricsRegistry(object):
+
+    """A collection of the metrics of several communications."""
+
+    def __init__(self):
+        """Create a new empty MetricsRegistry."""
+        self._communications = []
+
+    def add_communication(self, communication, **labels):
+        """Collect the metrics of a communication.
+
+        :param AYABInterface.communication.Communication communication: the
+          communication to observe
+        :param labels: labels to distinguish the communication from others,
+          e.g. ``machine="left"``
+        :rtype: CommunicationMetrics
+        """
+        metrics = CommunicationMetrics(communication, labels)
+        self._communications.append(metrics)
+        return metrics
+
+    def samples(self):
+        """The current values of all communications.
+
+        :rtype: list
+        :return: a list of ``(name, labels, value)`` tuples
+        """
+        samples = []
+        for metrics in self._communications:
+            samples.extend(metrics.samples())
+        return samples
+
+    def render(self):
+        """Render the metrics in the Prometheus text format.
+
+        :rtype: str
+        """
+        by_name = {}
+        for name, labels, value in self.samples():
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, metric_type, help in _METRICS:
+            lines.append("# HELP {} {}".format(name, help))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            names = [name]
+            if metric_type == "summary":
+                names.extend([name + "_sum", name + "_count"])
+            for sample_name in names:
+                for labels, value in by_name.get(sample_name, ()):
+                    lines.append("{}{} {}".format(
+                        sample_name, _format_labels(labels),
+                        _format_value(value)))
+        lines.append("")
+        return "\n".join(lines)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the metrics over HTTP in a separate thread.
+
+        :param int port: the port to listen on, ``0`` to choose a free port
+        :param str host: the host to listen on
+        :return: the running server. Use its ``server_address`` to get the
+          port and call ``shutdown()`` to stop it.
+        :rtype: http.server.HTTPServer
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = _ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+__all__ = ["MetricsRegistry", "CommunicationMetrics", "CONTENT_TYPE",
+           "TURNAROUND_QUANTILES"]
@@ -0,0 +1,183 @@
+"""Notify the observers of the communication about messages.
+
+By default, the observers are called in the thread that sends or receives
+the message. A :class:`ParallelDispatcher` calls them in a separate thread
+so that slow observers do not delay the answers to the controller.
+"""
+from collections import deque
+from threading import Condition, Thread, current_thread
+import traceback
+
+BLOCK = "block"  #: wait until there is space in the queue
+DROP_OLDEST = "drop oldest"  #: remove the oldest notification if full
+#: replace a queued message of the same type if full, else drop the oldest
+COALESCE = "coalesce"
+POLICIES = (BLOCK, DROP_OLDEST, COALESCE)  #: all the backpressure policies
+
+
+class SynchronousDispatcher(object):
+
+    """Call the observers directly."""
+
+    def notify(self, observers, message):
+        """Call the observers with the message.
+
+        :param observers: an iterable over callables
+        :param message: the message to pass to the observers
+        """
+        for observer in observers:
+            observer(message)
+
+    def close(self):
+        """Nothing to close."""
+
+
+class ParallelDispatcher(object):
+
+    """Call the observers in a separate thread."""
+
+    def __init__(self, max_size=1024, policy=BLOCK, on_error=None):
+        """Create a new ParallelDispatcher.
+
+        :param int max_size: the maximum number of notifications that wait
+          to be delivered
+        :param str policy: what to do when :paramref:`max_size` is reached,
+          one of :data:`POLICIES`
+        :param on_error: a callable that is called with the exception if an
+          observer raises one. By default, the traceback is printed.
+        :raises ValueError: if the policy is unknown or the size is not
+          positive
+
+        .. warning:: With the :data:`BLOCK` policy, observers must not wait
+          for the :attr:`~AYABInterface.communication.Communication.lock`
+          because the communication waits for the observers while it holds
+          the lock.
+        """
+        if policy not in POLICIES:
+            raise ValueError("The policy is {} but one of {} was expected."
+                             "".format(repr(policy),
+                                       ", ".join(map(repr, POLICIES))))
+        if max_size < 1:
+            raise ValueError("The max_size is {} but a positive number was "
+                             "expected.".format(max_size))
+        self._max_size = max_size
+        self._policy = policy
+        self._on_error = on_error
+        self._queue = deque()
+        self._condition = Condition()
+        self._closed = False
+        self._dropped = 0
+        self._thread = Thread(target=self._deliver_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def policy(self):
+        """The backpressure policy.
+
+        :rtype: str
+        """
+        return self._policy
+
+    @property
+    def dropped(self):
+        """The number of notifications that were dropped or coalesced.
+
+        :rtype: int
+        """
+        return self._dropped
+
+    def notify(self, observers, message):
+        """Queue the message for the observers.
+
+        :param observers: an iterable over callables
+        :param message: the message to pass to the observers
+
+        After :meth:`close`, the observers are called directly.
+        """
+        observers = tuple(observers)
+        if not observers:
+            return
+        with self._condition:
+            if self._enqueue(observers, message):
+                return
+        SynchronousDispatcher().notify(observers, message)
+
+    def _enqueue(self, observers, message):
+        """Queue the message according to the policy.
+
+        :rtype: bool
+        :return: whether the message is delivered by the thread
+        """
+        queue = self._queue
+        if self._policy == BLOCK:
+            while len(queue) >= self._max_size and not self._closed:
+                self._condition.wait()
+        elif len(queue) >= self._max_size and not self._closed:
+            if self._policy == COALESCE and \
+                    self._coalesce(observers, message):
+                return True
+            queue.popleft()
+            self._dropped += 1
+        if self._closed:
+            return False
+        queue.append([observers, message])
+        self._condition.notify_all()
+        return True
+
+    def _coalesce(self, observers, message):
+        """Replace a queued message of the same type.
+
+        :rtype: bool
+        :return: whether a message was replaced
+        """
+        message_type = type(message)
+        for entry in reversed(self._queue):
+            if type(entry[1]) is message_type and entry[0] == observers:
+                entry[1] = message
+                self._dropped += 1
+                return True
+        return False
+
+    def _deliver_loop(self):
+        """Call the observers until closed."""
+        condition = self._condition
+        queue = self._queue
+        while True:
+            with condition:
+                while not queue and not self._closed:
+                    condition.wait()
+                if not queue:
+                    return
+                observers, message = queue.popleft()
+                condition.notify_all()
+            for observer in observers:
+                try:
+                    observer(message)
+                except Exception as error:
+                    if self._on_error is None:
+                        traceback.print_exc()
+                    else:
+                        self._on_error(error)
+
+    def close(self, timeout=None):
+        """Deliver the queued notifications and stop the thread.
+
+        :param float timeout: the maximum time in seconds to wait for the
+          delivery
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        """Whether the observers are still notified.
+
+        :rtype: bool
+        """
+        return self._thread.is_alive()
+
+__all__ = ["SynchronousDispatcher", "ParallelDispatcher", "BLOCK",
+           "DROP_OLDEST", "COALESCE", "POLICIES"]
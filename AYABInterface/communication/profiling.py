@@ -0,0 +1,137 @@
+"""Hooks to measure the time spent in the phases of the communication.
+
+By default, no hooks are installed and the communication runs without
+measuring anything. When a hook is :func:`added <add_hook>`, it is called
+before and after each of these phases:
+
+- :data:`READ_MESSAGE_TYPE`:
+  :func:`~AYABInterface.communication.hardware_messages.read_message_type`
+- :data:`INIT_MESSAGE`: a received message reads its content
+- :data:`RECEIVE_MESSAGE`: a :meth:`state receives a message
+  <AYABInterface.communication.states.State.receive_message>`
+- :data:`ENTER_STATE`: a :meth:`state is entered
+  <AYABInterface.communication.states.State.enter>`
+- :data:`SEND_MESSAGE`: a :meth:`message is sent
+  <AYABInterface.communication.host_messages.Message.send>`
+
+Example:
+
+.. code:: python
+
+    from AYABInterface.communication.profiling import add_hook, \
+        PhaseTimes, INIT_MESSAGE
+
+    times = PhaseTimes()
+    add_hook(times)
+    # ... communicate ...
+    print(times.histogram(INIT_MESSAGE).mean)
+
+"""
+from .latency import Histogram
+from ..utils import perf_counter_ns
+
+READ_MESSAGE_TYPE = "read_message_type"  #: the type of a message is read
+INIT_MESSAGE = "init_message"  #: the content of a message is read
+RECEIVE_MESSAGE = "receive_message"  #: the state handles a message
+ENTER_STATE = "enter_state"  #: a state is entered
+SEND_MESSAGE = "send_message"  #: a message is sent to the controller
+#: all the phases that can be measured
+PHASES = (READ_MESSAGE_TYPE, INIT_MESSAGE, RECEIVE_MESSAGE, ENTER_STATE,
+          SEND_MESSAGE)
+
+#: The installed hooks. The communication checks whether this list is empty
+#: and only measures if it is not.
+hooks = []
+
+
+class Hook(object):
+
+    """The base class for hooks.
+
+    Override :meth:`enter` and :meth:`exit`.
+    """
+
+    def enter(self, phase, subject, start):
+        """Called when a phase starts.
+
+        :param str phase: one of :data:`PHASES`
+        :param subject: the object the phase is about, e.g. the message or
+          the state
+        :param int start: the :func:`~AYABInterface.utils.perf_counter_ns`
+          at the start
+        """
+
+    def exit(self, phase, subject, start, duration):
+        """Called when a phase ends.
+
+        :param str phase: one of :data:`PHASES`
+        :param subject: the object the phase is about
+        :param int start: the :func:`~AYABInterface.utils.perf_counter_ns`
+          at the start
+        :param int duration: the duration of the phase in nanoseconds
+        """
+
+
+class PhaseTimes(Hook):
+
+    """A hook that records the durations in a histogram per phase."""
+
+    def __init__(self):
+        """Create a new PhaseTimes hook."""
+        self._histograms = {phase: Histogram() for phase in PHASES}
+
+    def exit(self, phase, subject, start, duration):
+        """Record the duration of the phase."""
+        self._histograms[phase].record(duration)
+
+    def histogram(self, phase):
+        """The durations of a phase.
+
+        :param str phase: one of :data:`PHASES`
+        :rtype: AYABInterface.communication.latency.Histogram
+        """
+        return self._histograms[phase]
+
+
+def add_hook(hook):
+    """Install a hook.
+
+    :param Hook hook: an object with the methods of :class:`Hook`
+    """
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Uninstall a hook.
+
+    :param Hook hook: a hook that was added with :func:`add_hook`
+    :raises ValueError: if the hook is not installed
+    """
+    hooks.remove(hook)
+
+
+def measure(phase, subject, function, *args):
+    """Call a function and notify the hooks.
+
+    :param str phase: one of :data:`PHASES`
+    :param subject: the object the phase is about
+    :param function: the callable to measure
+    :param args: the arguments for the :paramref:`function`
+    :return: the result of the :paramref:`function`
+
+    This is only called by the communication if :data:`hooks` is not empty.
+    """
+    current_hooks = list(hooks)
+    start = perf_counter_ns()
+    for hook in current_hooks:
+        hook.enter(phase, subject, start)
+    try:
+        return function(*args)
+    finally:
+        duration = perf_counter_ns() - start
+        for hook in current_hooks:
+            hook.exit(phase, subject, start, duration)
+
+__all__ = ["Hook", "PhaseTimes", "add_hook", "remove_hook", "measure",
+           "hooks", "PHASES", "READ_MESSAGE_TYPE", "INIT_MESSAGE",
+           "RECEIVE_MESSAGE", "ENTER_STATE", "SEND_MESSAGE"]
@@ -0,0 +1,294 @@
+"""Record and replay the traffic of a communication.
+
+A :class:`Recorder` wraps the file passed to the
+:class:`~AYABInterface.communication.Communication` and writes both
+directions of the traffic with timestamps into a log:
+
+.. code:: python
+
+    with open("session.ayabrec", "wb") as log:
+        recorder = Recorder(serial_port.connect(), log)
+        communication = Communication(recorder, get_needle_positions, machine)
+        ...
+
+A :class:`ReplayFile` feeds the log back into a new communication at the
+original or an accelerated speed and compares what the host writes with
+the recording:
+
+.. code:: python
+
+    with open("session.ayabrec", "rb") as log:
+        file = ReplayFile(read_log(log), speed=10)
+    communication = Communication(file, get_needle_positions, machine)
+
+The log starts with :data:`MAGIC`. Each chunk is a header followed by the
+data:
+
+- 1 byte: :data:`FROM_CONTROLLER` or :data:`TO_CONTROLLER`
+- 8 bytes: the seconds since the start of the recording as little endian
+  double
+- 2 bytes: the length of the data as little endian unsigned short
+"""
+from .host_messages import LineConfirmation, StartRequest
+from ..utils import next_line
+from collections import namedtuple
+from time import perf_counter, sleep
+import struct
+
+MAGIC = b"AYABREC\x01"  #: the first bytes of a log
+FROM_CONTROLLER = 0  #: the data was read from the controller
+TO_CONTROLLER = 1  #: the data was written to the controller
+#: the seconds in which consecutive reads or writes are put into one chunk
+DEFAULT_MERGE_INTERVAL = 0.001
+_HEADER = struct.Struct("<BdH")
+_MAXIMUM_CHUNK_SIZE = 0xffff
+
+Chunk = namedtuple("Chunk", ["direction", "timestamp", "data"])
+
+
+class Recorder(object):
+
+    """A file wrapper that logs what is read and written."""
+
+    def __init__(self, file, log, merge_interval=DEFAULT_MERGE_INTERVAL,
+                 clock=perf_counter):
+        """Create a new Recorder.
+
+        :param file: the file-like object connected to the controller, e.g.
+          a :class:`serial.Serial`
+        :param log: a binary file-like object to write the log to
+        :param float merge_interval: reads or writes in the same direction
+          within this time in seconds are stored as one chunk. This makes
+          the log more compact.
+        :param clock: a callable that returns the current time in seconds
+        """
+        self._file = file
+        self._log = log
+        self._merge_interval = merge_interval
+        self._clock = clock
+        self._start = clock()
+        self._direction = None
+        self._timestamp = None
+        self._data = bytearray()
+        log.write(MAGIC)
+
+    def _add(self, direction, data):
+        """Add data to the current chunk or start a new chunk."""
+        if not data:
+            return
+        now = self._clock() - self._start
+        if direction != self._direction or \
+                now - self._timestamp > self._merge_interval or \
+                len(self._data) + len(data) > _MAXIMUM_CHUNK_SIZE:
+            self.flush()
+            self._direction = direction
+            self._timestamp = now
+        self._data.extend(data)
+
+    def read(self, *args):
+        """Read from the file and log the bytes.
+
+        :rtype: bytes
+        """
+        data = self._file.read(*args)
+        self._add(FROM_CONTROLLER, data)
+        return data
+
+    def write(self, data):
+        """Write to the file and log the bytes."""
+        result = self._file.write(data)
+        self._add(TO_CONTROLLER, data)
+        return result
+
+    def flush(self):
+        """Write the current chunk to the log."""
+        data = self._data
+        while data:
+            chunk = data[:_MAXIMUM_CHUNK_SIZE]
+            del data[:_MAXIMUM_CHUNK_SIZE]
+            self._log.write(_HEADER.pack(self._direction, self._timestamp,
+                                         len(chunk)))
+            self._log.write(chunk)
+
+    def close(self):
+        """Write the remaining data to the log and close the file."""
+        self.flush()
+        close = getattr(self._file, "close", None)
+        if close is not None:
+            close()
+
+
+def read_log(file):
+    """Read a log written by a :class:`Recorder`.
+
+    :param file: a binary file-like object
+    :rtype: list
+    :return: a list of :class:`Chunks <Chunk>`
+    :raises ValueError: if the file is not a log
+    """
+    data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("The file does not start with {}.".format(MAGIC))
+    chunks = []
+    offset = len(MAGIC)
+    while offset + _HEADER.size <= len(data):
+        direction, timestamp, length = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        chunks.append(Chunk(direction, timestamp,
+                            bytes(data[offset:offset + length])))
+        offset += length
+    return chunks
+
+
+class ReplayFile(object):
+
+    """A file that replays what the controller sent in a recording."""
+
+    def __init__(self, chunks, speed=1, clock=perf_counter, sleep=sleep):
+        """Create a new ReplayFile.
+
+        :param list chunks: the :class:`Chunks <Chunk>` from :func:`read_log`
+        :param float speed: how much faster than the recording the data is
+          replayed. ``1`` is the original speed. If it is :obj:`None`, the
+          data is replayed without waiting.
+        :param clock: a callable that returns the current time in seconds
+        :param sleep: a callable that waits for a number of seconds
+        """
+        self._input = [chunk for chunk in chunks
+                       if chunk.direction == FROM_CONTROLLER]
+        self._expected_output = b''.join(
+            chunk.data for chunk in chunks if chunk.direction == TO_CONTROLLER)
+        self._speed = speed
+        self._clock = clock
+        self._sleep = sleep
+        self._start = None
+        self._index = 0
+        self._offset = 0
+        self._output = bytearray()
+
+    def _wait_for(self, chunk):
+        """Wait until the chunk was received in the recording."""
+        if self._start is None:
+            self._start = self._clock() - chunk.timestamp / (self._speed or 1)
+        if not self._speed:
+            return
+        delay = self._start + chunk.timestamp / self._speed - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+
+    def read(self, size=1):
+        """Read the recorded bytes from the controller.
+
+        :rtype: bytes
+        :return: up to :paramref:`size` bytes, ``b""`` at the end of the
+          recording
+        """
+        result = []
+        while size > 0 and self._index < len(self._input):
+            chunk = self._input[self._index]
+            if self._offset == 0:
+                self._wait_for(chunk)
+            data = chunk.data[self._offset:self._offset + size]
+            result.append(data)
+            size -= len(data)
+            self._offset += len(data)
+            if self._offset >= len(chunk.data):
+                self._index += 1
+                self._offset = 0
+        return b''.join(result)
+
+    def write(self, data):
+        """Remember the bytes written by the host.
+
+        :return: the number of bytes written
+        :rtype: int
+        """
+        self._output.extend(data)
+        return len(data)
+
+    @property
+    def output(self):
+        """The bytes written by the host during the replay.
+
+        :rtype: bytes
+        """
+        return bytes(self._output)
+
+    @property
+    def expected_output(self):
+        """The bytes written by the host in the recording.
+
+        :rtype: bytes
+        """
+        return self._expected_output
+
+    def output_matches(self):
+        """Whether the host wrote the same bytes as in the recording.
+
+        :rtype: bool
+        """
+        return self._output == self._expected_output
+
+    def is_at_end(self):
+        """Whether all recorded bytes were read.
+
+        :rtype: bool
+        """
+        return self._index >= len(self._input)
+
+
+def recorded_needle_positions(chunks, machine):
+    """Extract the needle positions the host sent in a recording.
+
+    :param list chunks: the :class:`Chunks <Chunk>` from :func:`read_log`
+    :param AYABInterface.machines.Machine machine: the machine of the
+      recording
+    :rtype: dict
+    :return: a mapping of line numbers to lists of :attr:`needle positions
+      <AYABInterface.machines.Machine.needle_positions>`. Lines after the
+      last line are not included.
+
+    Use the :meth:`~dict.get` method of the result as the
+    ``get_needle_positions`` argument of the
+    :class:`~AYABInterface.communication.Communication` to replay a
+    recording without the original pattern.
+    """
+    output = b''.join(chunk.data for chunk in chunks
+                      if chunk.direction == TO_CONTROLLER)
+    positions = machine.needle_positions
+    number_of_needles = machine.number_of_needles
+    lines = {}
+    last_lines = set()
+    last_line = 0
+    offset = 0
+    while offset < len(output):
+        message_id = output[offset]
+        if message_id == LineConfirmation.MESSAGE_ID:
+            content = output[offset + 1:offset + 29]
+            if len(content) < 28:
+                break
+            last_line = next_line(last_line, content[0])
+            is_last = content[26]
+            if not (is_last and last_line - 1 in last_lines and
+                    not any(content[1:26])):
+                # lines after the last line are empty and not included
+                lines[last_line] = [
+                    positions[(content[1 + needle // 8] >> (needle % 8)) & 1]
+                    for needle in range(number_of_needles)]
+            if is_last:
+                last_lines.add(last_line)
+            offset += 29
+        elif message_id == StartRequest.MESSAGE_ID:
+            offset += 3
+        else:
+            offset += 1
+        end = output.find(b'\r\n', offset)
+        if end == -1:
+            break
+        offset = end + 2
+    return lines
+
+
+__all__ = ["Recorder", "ReplayFile", "read_log", "recorded_needle_positions",
+           "Chunk", "MAGIC", "FROM_CONTROLLER", "TO_CONTROLLER",
+           "DEFAULT_MERGE_INTERVAL"]
@@ -0,0 +1,436 @@
+"""A simulation of the AYAB shield for testing without hardware.
+
+The :class:`Simulator` speaks the API version 4 of the
+:ref:`communication specification <serial-communication-specification>` from
+the controller's side:
+
+1. :ref:`reqinfo` is answered with :ref:`cnfinfo`, followed by an
+   :ref:`indstate` when the machine is initialized.
+2. :ref:`reqstart` is answered with :ref:`cnfstart` and the first
+   :ref:`reqline`.
+3. Each :ref:`cnfline` is checked and, after the carriage passed the needles,
+   the next line is requested until the last line is received.
+
+Use :meth:`Simulator.socketpair` to connect a
+:class:`~AYABInterface.communication.Communication` in the same process
+or :meth:`Simulator.pty` to create a serial device that can be opened like
+the real shield.
+
+.. code:: python
+
+    simulator, file = Simulator.socketpair(carriage_speed=400)
+    simulator.start()
+    communication = Communication(file, get_needle_positions, KH910())
+    communication.parallelize(0)
+
+"""
+from .hardware_messages import InformationConfirmation, StartConfirmation, \
+    StateIndication, LineRequest
+from .host_messages import InformationRequest, StartRequest, \
+    LineConfirmation, TestRequest
+from ..machines import KH910
+from ..utils import next_line
+from crc8 import crc8
+from threading import Thread
+from time import sleep, perf_counter
+import socket
+import os
+
+#: The number of bytes after the first byte of the host messages.
+_CONTENT_LENGTH = {InformationRequest.MESSAGE_ID: 0,
+                   StartRequest.MESSAGE_ID: 2,
+                   LineConfirmation.MESSAGE_ID: 28,
+                   TestRequest.MESSAGE_ID: 0}
+
+#: the needles the carriage moves beyond the knitted needles in each row
+DEFAULT_TURN_MARGIN = 24
+
+
+class SimulatedFile(object):
+
+    """A file object for a socket without buffering."""
+
+    def __init__(self, sock):
+        """Create a new SimulatedFile.
+
+        :param socket.socket sock: the socket to read from and write to
+        """
+        self._socket = sock
+
+    def read(self, size=1):
+        """Read bytes from the socket.
+
+        :rtype: bytes
+        :return: :paramref:`size` bytes or less if the connection is closed
+        """
+        chunks = []
+        while size > 0:
+            try:
+                chunk = self._socket.recv(size)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def write(self, data):
+        """Write bytes to the socket.
+
+        :return: the number of bytes written
+        :rtype: int
+        """
+        self._socket.sendall(data)
+        return len(data)
+
+    def close(self):
+        """Close the socket."""
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+
+
+class _FileDescriptorFile(object):
+
+    """A file object for a file descriptor of a pty."""
+
+    def __init__(self, file_descriptor):
+        self._file_descriptor = file_descriptor
+
+    def read(self, size=1):
+        chunks = []
+        while size > 0:
+            try:
+                chunk = os.read(self._file_descriptor, size)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._file_descriptor, view):]
+        return len(data)
+
+    def close(self):
+        os.close(self._file_descriptor)
+
+
+class Simulator(object):
+
+    """Simulate the firmware of the AYAB shield."""
+
+    def __init__(self, file, machine=None, api_version=4,
+                 firmware_version=(0, 99), carriage_speed=None,
+                 response_delay=0, initialization_delay=0,
+                 turn_margin=DEFAULT_TURN_MARGIN, record_lines=True):
+        """Create a new Simulator.
+
+        :param file: a file-like object with ``read`` and ``write`` methods
+          connected to the host
+        :param AYABInterface.machines.Machine machine: the simulated machine,
+          by default a :class:`~AYABInterface.machines.KH910`
+        :param int api_version: the API version sent in :ref:`cnfinfo`
+        :param tuple firmware_version: the major and minor firmware version
+        :param float carriage_speed: the speed of the carriage in needles per
+          second. If it is :obj:`None`, the next line is requested
+          immediately.
+        :param float response_delay: the seconds to wait before answering
+        :param float initialization_delay: the seconds between
+          :ref:`cnfinfo` and the :ref:`indstate` that indicates that the
+          machine is ready
+        :param int turn_margin: the needles the carriage moves beyond the
+          :ref:`knitted needles <reqstart>` to turn around
+        :param bool record_lines: whether to remember the received
+          :attr:`lines` and the :attr:`line_order`. Turn this off for long
+          sessions.
+        """
+        self._file = file
+        self._machine = KH910() if machine is None else machine
+        self._api_version = api_version
+        self._firmware_version = tuple(firmware_version)
+        self._carriage_speed = carriage_speed
+        self._response_delay = response_delay
+        self._initialization_delay = initialization_delay
+        self._turn_margin = turn_margin
+        self._left_end_needle = None
+        self._right_end_needle = None
+        self._line_number = 0
+        self._lines = {}
+        self._line_order = []
+        self._record_lines = record_lines
+        self._number_of_lines = 0
+        self._errors = []
+        self._finished = False
+        self._carriage_position = 0
+        self._thread = None
+        self._start_time = None
+        self._end_time = None
+        self._host_file_descriptor = None
+
+    @classmethod
+    def socketpair(cls, *args, **kw):
+        """Create a simulator connected through a socket pair.
+
+        :param args: the arguments for :class:`Simulator`
+        :return: a tuple ``(simulator, file)`` where ``file`` is the file
+          to pass to the
+          :class:`~AYABInterface.communication.Communication`
+        :rtype: tuple
+        """
+        host_socket, controller_socket = socket.socketpair()
+        simulator = cls(SimulatedFile(controller_socket), *args, **kw)
+        return simulator, SimulatedFile(host_socket)
+
+    @classmethod
+    def pty(cls, *args, **kw):
+        """Create a simulator connected to a pseudo terminal.
+
+        :param args: the arguments for :class:`Simulator`
+        :return: a tuple ``(simulator, device)`` where ``device`` is the
+          path of the pseudo terminal, e.g. ``"/dev/pts/4"``. It can be
+          opened with :class:`AYABInterface.serial.SerialPort`.
+        :rtype: tuple
+        :raises OSError: if pseudo terminals are not supported, e.g. on
+          Windows
+        """
+        import tty
+        controller, host = os.openpty()
+        tty.setraw(controller)
+        tty.setraw(host)
+        device = os.ttyname(host)
+        simulator = cls(_FileDescriptorFile(controller), *args, **kw)
+        simulator._host_file_descriptor = host
+        return simulator, device
+
+    @property
+    def machine(self):
+        """The simulated machine.
+
+        :rtype: AYABInterface.machines.Machine
+        """
+        return self._machine
+
+    @property
+    def lines(self):
+        """The needle position bytes received per line number.
+
+        :rtype: dict
+        :return: a mapping of line numbers to the 25 bytes of
+          needle positions received in the :ref:`cnfline`
+        """
+        return self._lines.copy()
+
+    @property
+    def line_order(self):
+        """The line numbers in the order they were received.
+
+        :rtype: list
+        """
+        return self._line_order.copy()
+
+    @property
+    def number_of_lines(self):
+        """The number of received lines.
+
+        :rtype: int
+        """
+        return self._number_of_lines
+
+    @property
+    def errors(self):
+        """The violations of the protocol by the host.
+
+        :rtype: list
+        :return: a list of strings describing the errors
+        """
+        return self._errors.copy()
+
+    @property
+    def left_end_needle(self):
+        """The left end needle from :ref:`reqstart` or :obj:`None`."""
+        return self._left_end_needle
+
+    @property
+    def right_end_needle(self):
+        """The right end needle from :ref:`reqstart` or :obj:`None`."""
+        return self._right_end_needle
+
+    def is_finished(self):
+        """Whether the last line was received.
+
+        :rtype: bool
+        """
+        return self._finished
+
+    @property
+    def lines_per_second(self):
+        """The knitting speed between :ref:`cnfstart` and the last line.
+
+        :rtype: float
+        :return: the number of received lines per second or :obj:`None`
+        """
+        if self._start_time is None or self._end_time is None or \
+                self._end_time == self._start_time:
+            return None
+        return self._number_of_lines / (self._end_time - self._start_time)
+
+    def line_duration(self):
+        """The seconds the carriage needs to pass over a line.
+
+        :rtype: float
+        """
+        if not self._carriage_speed:
+            return 0
+        left = self._left_end_needle or 0
+        right = self._right_end_needle
+        if right is None:
+            right = self._machine.number_of_needles - 1
+        needles = right - left + 1 + 2 * self._turn_margin
+        return needles / self._carriage_speed
+
+    def _send(self, message_id, content=b''):
+        """Send a message to the host."""
+        if self._response_delay:
+            sleep(self._response_delay)
+        self._file.write(bytes([message_id]) + content + b'\r\n')
+
+    def _read_end_of_message(self):
+        """Read until b"\\r\\n".
+
+        :rtype: bool
+        :return: whether the end of the message was found in time
+        """
+        read = self._file.read
+        last = read(1)
+        current = read(1)
+        if last == b'\r' and current == b'\n':
+            return True
+        while current != b'' and not (last == b'\r' and current == b'\n'):
+            last, current = current, read(1)
+        return False
+
+    def receive_message(self):
+        """Receive and answer one message from the host.
+
+        :rtype: bool
+        :return: whether the connection is still open
+        """
+        message_id = self._file.read(1)
+        if message_id == b'':
+            return False
+        message_id = message_id[0]
+        length = _CONTENT_LENGTH.get(message_id)
+        if length is None:
+            self._errors.append("unknown message 0x{:02x}".format(message_id))
+            self._read_end_of_message()
+            return True
+        content = self._file.read(length)
+        if len(content) != length:
+            return False
+        if not self._read_end_of_message():
+            self._errors.append("message 0x{:02x} is too long"
+                                "".format(message_id))
+        if message_id == InformationRequest.MESSAGE_ID:
+            self._receive_information_request()
+        elif message_id == StartRequest.MESSAGE_ID:
+            self._receive_start_request(content)
+        elif message_id == LineConfirmation.MESSAGE_ID:
+            self._receive_line_confirmation(content)
+        return True
+
+    def _receive_information_request(self):
+        """Answer with cnfInfo and indicate that the machine is ready."""
+        self._send(InformationConfirmation.MESSAGE_ID,
+                   bytes((self._api_version,) + self._firmware_version))
+        if self._initialization_delay:
+            sleep(self._initialization_delay)
+        self._send_state_indication(1)
+
+    def _send_state_indication(self, ready):
+        """Send an indState message."""
+        self._send(StateIndication.MESSAGE_ID, bytes(
+            [ready, 0, 0, 0, 0, 1, self._carriage_position & 255]))
+
+    def _receive_start_request(self, content):
+        """Answer with cnfStart and request the first line."""
+        left, right = content
+        success = left < right < self._machine.number_of_needles
+        self._send(StartConfirmation.MESSAGE_ID, bytes([success]))
+        if not success:
+            self._errors.append("invalid needles {} {}".format(left, right))
+            return
+        self._left_end_needle = left
+        self._right_end_needle = right
+        self._carriage_position = left
+        self._line_number = 0
+        self._start_time = perf_counter()
+        self._send(LineRequest.MESSAGE_ID, bytes([0]))
+
+    def _receive_line_confirmation(self, content):
+        """Check the line and request the next one."""
+        line_number = next_line(self._line_number, content[0])
+        if crc8(content[:-1]).digest() != content[-1:]:
+            self._errors.append("wrong crc in line {}".format(line_number))
+        if line_number != self._line_number:
+            self._errors.append("line {} was sent but {} was requested"
+                                "".format(line_number, self._line_number))
+        if self._record_lines:
+            self._lines[line_number] = content[1:26]
+            self._line_order.append(line_number)
+        self._number_of_lines += 1
+        duration = self.line_duration()
+        if duration:
+            sleep(duration)
+        self._carriage_position = (
+            self._left_end_needle if line_number & 1 else
+            self._right_end_needle)
+        self._end_time = perf_counter()
+        if content[26]:
+            self._finished = True
+            return
+        self._line_number = line_number + 1
+        self._send(LineRequest.MESSAGE_ID, bytes([self._line_number & 255]))
+
+    def run(self):
+        """Answer the host until the last line is knit or the host quits."""
+        while not self._finished and self.receive_message():
+            pass
+
+    def start(self):
+        """Run the simulator in a separate thread.
+
+        .. seealso:: :meth:`run`, :meth:`join`
+        """
+        self._thread = Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def join(self, timeout=None):
+        """Wait for the simulator thread to finish.
+
+        :param float timeout: the maximum seconds to wait
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        """Close the connection to the host.
+
+        The host receives a
+        :class:`~AYABInterface.communication.hardware_messages.ConnectionClosed`
+        message.
+        """
+        self._file.close()
+        if self._host_file_descriptor is not None:
+            os.close(self._host_file_descriptor)
+            self._host_file_descriptor = None
+
+__all__ = ["Simulator", "SimulatedFile", "DEFAULT_TURN_MARGIN"]
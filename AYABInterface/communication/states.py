@@ -508,9 +508,27 @@ class KnittingLine(State):
         Also, the :attr:`last line requested
         <AYABInterface.communication.Communication.last_requested_line_number>`
         is set.
-        """
-        self._communication.last_requested_line_number = self._line_number
-        self._communication.send(LineConfirmation, self._line_number)
+
+        If the communication :meth:`pushes lines ahead
+        <AYABInterface.communication.Communication.pushes_lines_ahead>`, the
+        line is not sent again if it was :attr:`pushed
+        <AYABInterface.communication.Communication.pushed_line_number>`
+        before and the next line is sent right away. If another line than
+        the pushed one was requested, the requested line is sent without
+        pushing the next one.
+        """
+        communication = self._communication
+        line_number = self._line_number
+        communication.last_requested_line_number = line_number
+        pushed_line_number = communication.pushed_line_number
+        if pushed_line_number != line_number:
+            communication.send(LineConfirmation, line_number)
+        communication.pushed_line_number = None
+        if communication.pushes_lines_ahead() and \
+                pushed_line_number in (None, line_number) and \
+                not communication.needle_positions.is_last(line_number):
+            communication.send(LineConfirmation, line_number + 1)
+            communication.pushed_line_number = line_number + 1
 
     def is_knitting(self):
         """The machine ready to knit or knitting.
@@ -0,0 +1,218 @@
+"""Test the resynchronizing frame reader.
+
+.. seealso:: :mod:`AYABInterface.communication.framing`
+"""
+from AYABInterface.communication.framing import FrameReader, \
+    MAXIMUM_DEBUG_LENGTH, CompleteReader, read_timed_out
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from unittest.mock import Mock
+from pytest import fixture
+from io import BytesIO
+import pytest
+
+LINE_REQUEST = b'\x82\x05\r\n'
+STATE_INDICATION = b'\x84\x01\x00\x00\x00\x00\x01\x00\r\n'
+INFORMATION_CONFIRMATION = b'\xc3\x04\x05\x02\r\n'
+DEBUG = b'#debug output 1\r\n'
+
+
+def frames(data):
+    """Read all frames from the data."""
+    reader = FrameReader(BytesIO(data))
+    result = []
+    frame = reader.read_frame()
+    while frame:
+        result.append(frame)
+        frame = reader.read_frame()
+    return reader, result
+
+
+class TestValidFrames(object):
+
+    @pytest.mark.parametrize("frame", [
+        LINE_REQUEST, STATE_INDICATION, INFORMATION_CONFIRMATION, DEBUG,
+        b'\xc1\x01\r\n', b'\xc4\x00\r\n', b'#\r\n'])
+    def test_frame_is_read(self, frame):
+        reader, result = frames(frame * 2)
+        assert result == [frame, frame]
+        assert reader.dropped_bytes == 0
+        assert reader.resynchronizations == 0
+
+    def test_end_of_file(self):
+        reader = FrameReader(BytesIO())
+        assert reader.read_frame() == b''
+        assert reader.read() == b''
+
+    def test_read_splits_frames(self):
+        reader = FrameReader(BytesIO(LINE_REQUEST + DEBUG))
+        assert reader.read(10) == LINE_REQUEST
+        assert reader.read(1) == b'#'
+        assert reader.read(100) == DEBUG[1:]
+
+
+class TestResynchronization(object):
+
+    @pytest.mark.parametrize("noise", [
+        b'\x00', b'\xff\xfe', b'\r\n', b'\x82', b'\x82\x01', b'\x84\x01\r\n',
+        b'\xc3\r\n', b'#\x82\r\n', b'\x82\x05\r'])
+    def test_noise_before_frame(self, noise):
+        reader, result = frames(noise + LINE_REQUEST + STATE_INDICATION)
+        assert result == [LINE_REQUEST, STATE_INDICATION]
+        assert reader.dropped_bytes == len(noise)
+        assert reader.resynchronizations == 1
+
+    def test_noise_between_frames(self):
+        reader, result = frames(LINE_REQUEST + b'\x17' + LINE_REQUEST +
+                                b'\x00\x00' + DEBUG)
+        assert result == [LINE_REQUEST, LINE_REQUEST, DEBUG]
+        assert reader.dropped_bytes == 3
+        assert reader.resynchronizations == 2
+
+    def test_truncated_frame_at_end(self):
+        reader, result = frames(LINE_REQUEST + b'\x84\x01\x00')
+        assert result == [LINE_REQUEST]
+        assert reader.dropped_bytes == 3
+
+    def test_debug_message_is_not_too_long(self):
+        too_long = b'#' + b'a' * (MAXIMUM_DEBUG_LENGTH + 1) + b'\r\n'
+        longest = b'#' + b'a' * MAXIMUM_DEBUG_LENGTH + b'\r\n'
+        reader, result = frames(too_long + longest)
+        assert result == [longest]
+        assert reader.dropped_bytes == len(too_long)
+
+    def test_on_dropped(self):
+        reader = FrameReader(BytesIO(b'\x01\x02' + LINE_REQUEST + b'\x03'))
+        dropped = Mock()
+        reader.on_dropped(dropped)
+        assert reader.read_frame() == LINE_REQUEST
+        dropped.assert_called_once_with(b'\x01\x02')
+        assert reader.read_frame() == b''
+        dropped.assert_called_with(b'\x03')
+
+
+class TestFileInterface(object):
+
+    def test_write(self):
+        file = Mock()
+        FrameReader(file).write(b'abc')
+        file.write.assert_called_once_with(b'abc')
+
+    def test_close(self):
+        file = Mock()
+        FrameReader(file).close()
+        file.close.assert_called_once_with()
+
+
+class TimingOutConnection(object):
+
+    """A serial connection whose reads time out between the chunks."""
+
+    timeout = 0.1
+    is_open = True
+
+    def __init__(self, *chunks):
+        self._chunks = list(chunks)
+        self.output = BytesIO()
+        self.write = self.output.write
+
+    def read(self, size=1):
+        if not self._chunks:
+            return b""
+        chunk = self._chunks[0]
+        self._chunks[0] = chunk[size:]
+        if not self._chunks[0]:
+            self._chunks.pop(0)
+        return chunk[:size]
+
+
+class TestReadTimeouts(object):
+
+    def test_timeout_of_open_connection(self):
+        assert read_timed_out(TimingOutConnection())
+
+    def test_no_timeout_of_closed_connection(self):
+        connection = TimingOutConnection()
+        connection.is_open = False
+        assert not read_timed_out(connection)
+
+    def test_no_timeout_without_timeout(self):
+        assert not read_timed_out(BytesIO())
+
+    def test_complete_reader_waits_for_the_bytes(self):
+        file = CompleteReader(TimingOutConnection(b"ab", b"", b"", b"cd"))
+        assert file.read(3) == b"abc"
+
+    def test_complete_reader_stops_at_the_end(self):
+        connection = TimingOutConnection(b"ab", b"")
+        connection.is_open = False
+        assert CompleteReader(connection).read(3) == b"ab"
+
+    def test_partial_frame_is_kept(self):
+        connection = TimingOutConnection(LINE_REQUEST[:2], b"",
+                                         LINE_REQUEST[2:])
+        reader = FrameReader(connection)
+        assert reader.read_frame() == b""
+        assert reader.read_frame() == LINE_REQUEST
+        assert reader.dropped_bytes == 0
+
+
+class Connection(object):
+
+    def __init__(self, input):
+        self.read = BytesIO(input).read
+        self.output = BytesIO()
+        self.write = self.output.write
+
+
+class TestCommunication(object):
+
+    @fixture
+    def messages(self):
+        return []
+
+    def communication(self, input, messages, resynchronize):
+        lines = ["B" * 200] * 10
+        communication = Communication(
+            Connection(input),
+            lambda i: lines[i] if 0 <= i < len(lines) else None, KH910(),
+            on_message_received=[messages.append],
+            resynchronize=resynchronize)
+        communication.start()
+        for i in range(3):
+            communication.receive_message()
+        return communication
+
+    INPUT = INFORMATION_CONFIRMATION + b'\x13' + LINE_REQUEST
+
+    def test_without_framing_the_line_request_is_lost(self, messages):
+        communication = self.communication(self.INPUT, messages, False)
+        assert communication.frame_reader is None
+        assert [message.is_unknown() for message in messages] == \
+            [False, True, False]
+        assert messages[-1].is_connection_closed()
+
+    def test_with_framing_the_line_request_is_received(self, messages):
+        communication = self.communication(self.INPUT, messages, True)
+        assert communication.frame_reader.dropped_bytes == 1
+        assert messages[1].is_line_request()
+        assert messages[1].line_number == 5
+        assert messages[2].is_connection_closed()
+
+    @pytest.mark.parametrize("resynchronize", [True, False])
+    def test_timeouts_are_not_a_closed_connection(self, messages,
+                                                  resynchronize):
+        connection = TimingOutConnection(
+            INFORMATION_CONFIRMATION, b"", LINE_REQUEST[:2], b"",
+            LINE_REQUEST[2:])
+        communication = Communication(
+            connection, lambda i: "B" * 200, KH910(),
+            on_message_received=[messages.append],
+            resynchronize=resynchronize)
+        communication.start()
+        for i in range(4):
+            communication.receive_message()
+        assert len(messages) == 2
+        assert messages[1].is_line_request()
+        assert messages[1].line_number == 5
+        assert communication.can_receive_messages()
@@ -3,7 +3,7 @@ from AYABInterface.communication.host_messages import LineConfirmation
 from AYABInterface.communication.hardware_messages import read_message_type, \
     UnknownMessage, SuccessConfirmation, StartConfirmation, LineRequest, \
     InformationConfirmation, TestConfirmation, StateIndication, Debug, \
-    ConnectionClosed
+    ConnectionClosed, message_type_by_id
 import pytest
 from io import BytesIO
 from pytest import fixture
@@ -76,6 +76,18 @@ class TestReadMessageFromFile(object):
     def test_read_unknown_message(self, byte):
         assert read_message_type(one_byte_file(byte)) == UnknownMessage
 
+    @pytest.mark.parametrize("byte,message_type", [
+        (0xc1, StartConfirmation), (0x23, Debug), (0x00, None)])
+    def test_message_type_by_id(self, byte, message_type):
+        assert message_type_by_id(byte) == message_type
+
+    @pytest.mark.parametrize("message_type,length", [
+        (StartConfirmation, 1), (InformationConfirmation, 3),
+        (_TestConfirmation, 1), (LineRequest, 1), (StateIndication, 7),
+        (Debug, None)])
+    def test_payload_length(self, message_type, length):
+        assert message_type.PAYLOAD_LENGTH == length
+
 
 @fixture
 def file():
@@ -0,0 +1,121 @@
+"""Test the MessageHistory.
+
+.. seealso:: :class:`AYABInterface.communication.history.MessageHistory`
+"""
+from AYABInterface.communication.history import MessageHistory, \
+    read_records, HEADER_SIZE, ReadRecorder
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from io import BytesIO
+from pytest import fixture, raises
+import pytest
+
+
+@fixture
+def history():
+    return MessageHistory(100)
+
+
+def records(history):
+    return [(record.timestamp, record.is_from_host, bytes(record.bytes))
+            for record in history]
+
+
+class TestMessageHistory(object):
+
+    """Test storing and exporting messages."""
+
+    def test_empty(self, history):
+        assert len(history) == 0
+        assert history.views() == []
+        assert list(history) == []
+
+    def test_capacity(self, history):
+        assert history.capacity == 100
+
+    def test_append(self, history):
+        history.append(b'\x03\r\n', True, 1.5)
+        history.append(b'\xc3\x04\x05\x02\r\n', False, 2)
+        assert records(history) == [(1.5, True, b'\x03\r\n'),
+                                    (2, False, b'\xc3\x04\x05\x02\r\n')]
+
+    def test_timestamp_is_set(self, history):
+        history.append(b'a', True)
+        assert list(history)[0].timestamp > 0
+
+    def test_oldest_records_are_overwritten(self, history):
+        for i in range(20):
+            history.append(bytes([i]) * 10, False, i)
+        assert [record[0] for record in records(history)] == \
+            [16, 17, 18, 19]
+        assert history.dropped == 16
+        assert sum(map(len, history.views())) == 4 * (HEADER_SIZE + 10)
+
+    @pytest.mark.parametrize("sizes", [[1, 20, 3, 40, 5, 60, 7, 80],
+                                       [50, 50, 50, 1, 1, 1, 1, 1, 1, 1]])
+    def test_export_and_read(self, history, sizes):
+        for i, size in enumerate(sizes):
+            history.append(bytes([i]) * size, i % 2, i)
+        file = BytesIO()
+        written = history.write_to(file)
+        assert written == len(file.getvalue())
+        assert read_records(file.getvalue()) == records(history)
+        assert records(history)[-1] == \
+            (len(sizes) - 1, bool((len(sizes) - 1) % 2),
+             bytes([len(sizes) - 1]) * sizes[-1])
+
+    def test_views_do_not_copy(self, history):
+        history.append(b'abc', True, 0)
+        view, = history.views()
+        assert isinstance(view, memoryview)
+        assert view.obj is history._buffer
+
+    def test_too_large_message(self, history):
+        with raises(ValueError):
+            history.append(b'a' * (101 - HEADER_SIZE), True)
+
+    def test_too_small_capacity(self):
+        with raises(ValueError):
+            MessageHistory(HEADER_SIZE)
+
+    def test_clear(self, history):
+        history.append(b'a', True)
+        history.clear()
+        assert len(history) == 0
+
+
+class TestReadRecorder(object):
+
+    def test_records_read_bytes(self):
+        recorder = ReadRecorder(BytesIO(b'abcdef'))
+        assert recorder.read(1) == b'a'
+        assert recorder.read(2) == b'bc'
+        assert recorder.bytes == b'abc'
+
+
+class Connection(object):
+
+    def __init__(self, input):
+        self.read = BytesIO(input).read
+        self.write = BytesIO().write
+
+
+class TestCommunicationHistory(object):
+
+    """Test the history attribute of the Communication."""
+
+    def test_no_history_by_default(self):
+        communication = Communication(Connection(b''), lambda i: None,
+                                      KH910())
+        assert communication.history is None
+
+    def test_messages_are_recorded(self):
+        communication = Communication(
+            Connection(b'\xc3\x04\x05\x02\r\n'), lambda i: None, KH910(),
+            history_capacity=1000)
+        communication.start()
+        communication.receive_message()
+        communication.receive_message()
+        assert [(record.is_from_host, bytes(record.bytes))
+                for record in communication.history] == \
+            [(True, b'\x03\r\n'), (False, b'\xc3\x04\x05\x02\r\n')]
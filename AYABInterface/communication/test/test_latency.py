@@ -0,0 +1,126 @@
+"""Test the latency measurement.
+
+.. seealso:: :mod:`AYABInterface.communication.latency`
+"""
+from AYABInterface.communication.latency import Histogram, LineLatency, \
+    PARSE, LOOKUP, WRITE, TURNAROUND, PHASES
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from pytest import fixture, raises
+from io import BytesIO
+import pytest
+
+
+@fixture
+def histogram():
+    return Histogram()
+
+
+class TestHistogram(object):
+
+    def test_empty(self, histogram):
+        assert histogram.count == 0
+        assert histogram.total == 0
+        assert histogram.min is None
+        assert histogram.max is None
+        assert histogram.mean is None
+        assert histogram.percentile(50) is None
+
+    @pytest.mark.parametrize("values", [[1, 2, 3], [100, 0, 127, 5]])
+    def test_small_values_are_exact(self, histogram, values):
+        for value in values:
+            histogram.record(value)
+        assert histogram.buckets() == [(value, 1) for value in sorted(values)]
+        assert histogram.min == min(values)
+        assert histogram.max == max(values)
+        assert histogram.mean == sum(values) / len(values)
+        assert histogram.total == sum(values)
+
+    @pytest.mark.parametrize("value", [128, 1000, 123456789, 2 ** 40 + 1])
+    def test_relative_error(self, histogram, value):
+        histogram.record(value)
+        highest_value, count = histogram.buckets()[0]
+        assert count == 1
+        assert value <= highest_value <= value * 1.016
+
+    def test_percentile(self, histogram):
+        for value in range(1, 101):
+            histogram.record(value * 1000)
+        assert 50000 <= histogram.percentile(50) <= 50500
+        assert 99000 <= histogram.percentile(99) <= 99800
+        assert histogram.percentile(100) == 100000
+
+    def test_count_above(self, histogram):
+        for value in [10, 20, 30000, 40000]:
+            histogram.record(value)
+        assert histogram.count_above(20) == 2
+        assert histogram.count_above(9) == 4
+
+    def test_negative_values(self, histogram):
+        with raises(ValueError):
+            histogram.record(-1)
+
+    def test_reset(self, histogram):
+        histogram.record(2)
+        histogram.reset()
+        assert histogram.count == 0
+        assert histogram.buckets() == []
+
+
+class TestLineLatency(object):
+
+    @fixture
+    def latency(self):
+        return LineLatency()
+
+    def test_phases_are_recorded(self, latency):
+        turnarounds = []
+        latency.on_turnaround(turnarounds.append)
+        latency.line_requested(100, 300)
+        latency.line_looked_up()
+        latency.line_written()
+        parse = latency.histogram(PARSE)
+        assert parse.min == parse.max == 200
+        assert latency.histogram(LOOKUP).count == 1
+        assert latency.histogram(WRITE).count == 1
+        assert latency.histogram().count == 1
+        assert turnarounds == [latency.histogram(TURNAROUND).max]
+
+    def test_nothing_is_recorded_without_request(self, latency):
+        latency.line_looked_up()
+        latency.line_written()
+        assert all(latency.histogram(phase).count == 0 for phase in PHASES)
+
+    def test_reset(self, latency):
+        latency.line_requested(1, 2)
+        latency.line_looked_up()
+        latency.line_written()
+        latency.reset()
+        assert latency.histogram().count == 0
+
+
+class Connection(object):
+
+    def __init__(self, input):
+        self.read = BytesIO(input).read
+        self.write = BytesIO().write
+
+
+class TestCommunicationLatency(object):
+
+    def test_lines_are_measured(self):
+        lines = ["B" * 200] * 3
+        connection = Connection(
+            b'\xc3\x04\x05\x02\r\n' +
+            b'\x84\x01\x00\x00\x00\x00\x01\x00\r\n' +
+            b'\xc1\x01\r\n' + b'\x82\x00\r\n' + b'\x82\x01\r\n')
+        communication = Communication(
+            connection, lambda i: lines[i] if 0 <= i < len(lines) else None,
+            KH910())
+        communication.start()
+        for i in range(5):
+            communication.receive_message()
+        assert communication.state.is_knitting_line()
+        turnaround = communication.line_latency.histogram(TURNAROUND)
+        assert turnaround.count == 2
+        assert turnaround.min > 0
@@ -0,0 +1,132 @@
+"""Test the metrics export.
+
+.. seealso:: :mod:`AYABInterface.communication.metrics`
+"""
+from AYABInterface.communication.metrics import MetricsRegistry, CONTENT_TYPE
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from urllib.request import urlopen
+from urllib.error import HTTPError
+from pytest import fixture, raises
+from io import BytesIO
+import pytest
+
+INPUT = (b'\xc3\x04\x05\x02\r\n' +
+         b'\x84\x01\x00\x00\x00\x00\x01\x00\r\n' +
+         b'\xc1\x01\r\n' + b'\x82\x00\r\n' + b'\x82\x01\r\n' +
+         b'\x99\r\n' + b'\xc1\x09\r\n')
+
+
+class Connection(object):
+
+    def __init__(self, input):
+        self.read = BytesIO(input).read
+        self.write = BytesIO().write
+
+
+@fixture
+def communication():
+    lines = ["B" * 200] * 3
+    return Communication(
+        Connection(INPUT),
+        lambda i: lines[i] if 0 <= i < len(lines) else None, KH910())
+
+
+@fixture
+def registry(communication):
+    registry = MetricsRegistry()
+    registry.add_communication(communication, machine="left")
+    communication.start()
+    for i in range(7):
+        communication.receive_message()
+    return registry
+
+
+def samples(registry):
+    return {(name, tuple(sorted(labels.items()))): value
+            for name, labels, value in registry.samples()}
+
+
+class TestSamples(object):
+
+    @pytest.mark.parametrize("name,value", [
+        ("ayab_lines_served_total", 2),
+        ("ayab_bytes_received_total", len(INPUT)),
+        ("ayab_bytes_sent_total", 3 + 5 + 2 * 31),
+        ("ayab_unknown_messages_total", 1),
+        ("ayab_invalid_messages_total", 1),
+        ("ayab_cache_hits_total", 0),
+        ("ayab_cache_misses_total", 2),
+        ("ayab_line_turnaround_seconds_count", 2)])
+    def test_counters(self, registry, name, value):
+        assert samples(registry)[(name, (("machine", "left"),))] == value
+
+    def test_turnaround_sum(self, registry, communication):
+        histogram = communication.line_latency.histogram()
+        assert histogram.total > 0
+        assert samples(registry)[("ayab_line_turnaround_seconds_sum",
+                                  (("machine", "left"),))] == \
+            histogram.total / 1e9
+
+    def test_messages_by_type(self, registry):
+        values = samples(registry)
+        assert values[("ayab_messages_received_total",
+                       (("machine", "left"), ("type", "LineRequest")))] == 2
+        assert values[("ayab_messages_sent_total",
+                       (("machine", "left"),
+                        ("type", "LineConfirmation")))] == 2
+
+    def test_no_dropped_bytes_without_framing(self, registry):
+        assert not any(name == "ayab_dropped_bytes_total"
+                       for name, labels, value in registry.samples())
+
+    def test_dropped_bytes(self):
+        communication = Communication(Connection(b'\x99\r\n\x82\x00\r\n'),
+                                      lambda i: None, KH910(),
+                                      resynchronize=True)
+        registry = MetricsRegistry()
+        registry.add_communication(communication)
+        communication.start()
+        communication.receive_message()
+        assert samples(registry)[("ayab_dropped_bytes_total", ())] == 3
+
+    def test_state(self, registry):
+        assert samples(registry)[("ayab_state", (
+            ("machine", "left"), ("state", "KnittingLine")))] == 1
+
+
+class TestRender(object):
+
+    def test_format(self, registry):
+        text = registry.render()
+        assert "# TYPE ayab_lines_served_total counter\n" \
+            'ayab_lines_served_total{machine="left"} 2\n' in text
+        assert 'ayab_line_turnaround_seconds{machine="left",quantile="0.5"} '\
+            in text
+        assert '\nayab_line_turnaround_seconds_sum{machine="left"} ' in text
+        assert text.endswith("\n")
+
+    def test_escape_labels(self, communication):
+        registry = MetricsRegistry()
+        registry.add_communication(communication, machine='a"b\\c\nd')
+        assert 'machine="a\\"b\\\\c\\nd"' in registry.render()
+
+    def test_empty_registry(self):
+        assert "# TYPE ayab_state gauge" in MetricsRegistry().render()
+
+
+class TestServe(object):
+
+    @pytest.mark.timeout(5)
+    def test_http_endpoint(self, registry):
+        server = registry.serve(0)
+        try:
+            url = "http://127.0.0.1:{}".format(server.server_address[1])
+            with urlopen(url + "/metrics") as response:
+                assert response.headers["Content-Type"] == CONTENT_TYPE
+                assert response.read().decode() == registry.render()
+            with raises(HTTPError):
+                urlopen(url + "/unknown")
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -143,3 +143,111 @@ class TestLineConfigurationMessage(object):
         empty_last_line += crc8.crc8(empty_last_line).digest()
         line = cache.get_line_configuration_message(line_number)
         assert line == empty_last_line
+
+
+class TestHitRate(object):
+
+    """Test the hits and misses of get_line_configuration_message."""
+
+    def test_no_lookups(self, cache):
+        assert cache.hits == 0
+        assert cache.misses == 0
+        assert cache.hit_rate is None
+
+    def test_hits_and_misses(self, cache, get_line, machine):
+        get_line.return_value = []
+        machine.needle_positions_to_bytes.return_value = b'123'
+        for line in [1, 1, 2, 1]:
+            cache.get_line_configuration_message(line)
+        assert cache.hits == 2
+        assert cache.misses == 2
+        assert cache.hit_rate == 0.5
+
+
+class TestLength(object):
+
+    def test_empty(self, cache):
+        assert len(cache) == 0
+
+    def test_entries_are_counted(self, cache, get_line, machine):
+        get_line.return_value = []
+        machine.needle_positions_to_bytes.return_value = b'123'
+        cache.get_line_configuration_message(1)
+        assert len(cache) == 3
+        cache.get(5)
+        assert len(cache) == 4
+
+
+class TestInterning(object):
+
+    """Lines with the same needle positions are converted once."""
+
+    @fixture
+    def lines(self):
+        return {0: ["B", "D"], 1: ["D", "D"], 2: ["B", "D"], 3: ("B", "D")}
+
+    @fixture
+    def cache(self, lines, machine):
+        machine.needle_positions_to_bytes.side_effect = \
+            lambda line: bytes(map(ord, line))
+        return NeedlePositionCache(lines.get, machine)
+
+    def test_same_bytes_object(self, cache, machine):
+        line_bytes = cache.get_bytes(0)
+        assert cache.get_bytes(2) is line_bytes
+        assert cache.get_bytes(3) is line_bytes
+        assert cache.get_bytes(1) == b"DD"
+        assert machine.needle_positions_to_bytes.call_count == 2
+        assert cache.distinct_lines == 2
+
+    def test_row_table_is_bounded(self, machine, monkeypatch):
+        monkeypatch.setattr(needle_position_cache, "ROW_TABLE_SIZE", 3)
+        machine.needle_positions_to_bytes.side_effect = \
+            lambda line: bytes(line)
+        cache = NeedlePositionCache(lambda line_number: [line_number % 5],
+                                    machine)
+        for line_number in range(20):
+            cache.get_bytes(line_number)
+            assert len(cache._row_table) <= 3
+        assert machine.needle_positions_to_bytes.call_count == 20
+        assert cache.get_bytes(20) is cache.get_bytes(0)
+        assert cache.distinct_lines == 5
+
+    def test_repeat_of_row_table_size_is_converted_once(self, machine):
+        machine.needle_positions_to_bytes.side_effect = \
+            lambda line: bytes(line)
+        repeat = needle_position_cache.ROW_TABLE_SIZE
+        cache = NeedlePositionCache(
+            lambda line_number: [line_number % repeat % 256,
+                                 line_number % repeat // 256], machine)
+        for line_number in range(3 * repeat):
+            cache.get_bytes(line_number)
+        assert machine.needle_positions_to_bytes.call_count == repeat
+
+    def test_recently_used_rows_are_kept(self, machine, monkeypatch):
+        monkeypatch.setattr(needle_position_cache, "ROW_TABLE_SIZE", 3)
+        machine.needle_positions_to_bytes.side_effect = \
+            lambda line: bytes(line)
+        rows = [0, 1, 2, 0, 3, 0, 1]
+        cache = NeedlePositionCache(lambda line_number: [rows[line_number]],
+                                    machine)
+        for line_number in range(len(rows)):
+            cache.get_bytes(line_number)
+        assert [call[0][0] for call in
+                machine.needle_positions_to_bytes.call_args_list] == \
+            [[0], [1], [2], [3], [1]]
+
+    def test_messages_differ(self, cache):
+        message_0 = cache.get_line_configuration_message(0)
+        message_2 = cache.get_line_configuration_message(2)
+        assert message_0[1:-2] == message_2[1:-2] == b"BD"
+        assert message_0[0] == 0
+        assert message_2[0] == 2
+
+    def test_unhashable_lines_are_converted(self, machine):
+        machine.needle_positions_to_bytes.return_value = b"1"
+        cache = NeedlePositionCache(lambda line_number: [["B"]], machine)
+        assert cache.get_bytes(0) == b"1"
+        assert cache.get_bytes(1) == b"1"
+        assert machine.needle_positions_to_bytes.call_count == 2
+        assert cache.distinct_lines == 1
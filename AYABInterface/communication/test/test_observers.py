@@ -0,0 +1,153 @@
+"""Test the dispatching of messages to the observers.
+
+.. seealso:: :mod:`AYABInterface.communication.observers`
+"""
+from AYABInterface.communication.observers import ParallelDispatcher, \
+    SynchronousDispatcher, BLOCK, DROP_OLDEST, COALESCE
+from AYABInterface.communication import Communication
+from unittest.mock import Mock
+from threading import Event, Thread, current_thread
+from pytest import fixture, raises
+import pytest
+
+
+class TestSynchronousDispatcher(object):
+
+    def test_observers_are_called(self):
+        messages = []
+        SynchronousDispatcher().notify([messages.append] * 2, 1)
+        assert messages == [1, 1]
+
+
+class BlockedObserver(object):
+
+    """An observer which waits until it is released."""
+
+    def __init__(self):
+        self.event = Event()
+        self.messages = []
+        self.threads = []
+
+    def __call__(self, message):
+        self.event.wait(1)
+        self.messages.append(message)
+        self.threads.append(current_thread())
+
+
+@fixture
+def observer():
+    return BlockedObserver()
+
+
+class TestParallelDispatcher(object):
+
+    @pytest.mark.timeout(2)
+    def test_messages_are_delivered_in_order(self, observer):
+        dispatcher = ParallelDispatcher()
+        observer.event.set()
+        for i in range(100):
+            dispatcher.notify([observer], i)
+        dispatcher.close()
+        assert observer.messages == list(range(100))
+        assert current_thread() not in observer.threads
+        assert not dispatcher.is_alive()
+
+    @pytest.mark.timeout(2)
+    def test_drop_oldest(self, observer):
+        dispatcher = ParallelDispatcher(2, DROP_OLDEST)
+        dispatcher.notify([observer], 0)
+        while dispatcher._queue:
+            pass
+        for i in range(1, 6):
+            dispatcher.notify([observer], i)
+        observer.event.set()
+        dispatcher.close()
+        assert observer.messages == [0, 4, 5]
+        assert dispatcher.dropped == 3
+
+    @pytest.mark.timeout(2)
+    def test_coalesce(self, observer):
+        dispatcher = ParallelDispatcher(2, COALESCE)
+        dispatcher.notify([observer], 0)
+        while dispatcher._queue:
+            pass
+        for message in ["a", 1, "b", 2, "c"]:
+            dispatcher.notify([observer], message)
+        observer.event.set()
+        dispatcher.close()
+        assert observer.messages == [0, "c", 2]
+
+    @pytest.mark.timeout(2)
+    def test_block(self, observer):
+        dispatcher = ParallelDispatcher(1, BLOCK)
+        observer.event.set()
+        for i in range(10):
+            dispatcher.notify([observer], i)
+            assert len(dispatcher._queue) <= 1
+        dispatcher.close()
+        assert observer.messages == list(range(10))
+        assert dispatcher.dropped == 0
+
+    @pytest.mark.timeout(2)
+    def test_errors_are_passed_on(self):
+        error = ValueError()
+        on_error = Mock()
+        dispatcher = ParallelDispatcher(on_error=on_error)
+        dispatcher.notify([Mock(side_effect=error)], 1)
+        dispatcher.close()
+        on_error.assert_called_once_with(error)
+
+    def test_notify_after_close_is_synchronous(self):
+        dispatcher = ParallelDispatcher()
+        dispatcher.close()
+        observer = Mock()
+        dispatcher.notify([observer], 3)
+        observer.assert_called_once_with(3)
+
+    @pytest.mark.parametrize("args", [(0,), (1, "unknown")])
+    def test_invalid_arguments(self, args):
+        with raises(ValueError):
+            ParallelDispatcher(*args)
+
+
+class TestCommunicationObservers(object):
+
+    @pytest.mark.timeout(2)
+    def test_observers_are_notified_in_parallel(self, observer):
+        communication = Communication(Mock(), Mock(), Mock(),
+                                      on_message_received=[observer])
+        communication.on_message(observer)
+        dispatcher = communication.parallelize_observers(policy=DROP_OLDEST)
+        assert dispatcher.policy == DROP_OLDEST
+        message = Mock()
+        communication._message_received(message)
+        assert observer.messages == []
+        observer.event.set()
+        communication.stop()
+        assert not dispatcher.is_alive()
+        assert observer.messages[:2] == [message, message]
+        assert observer.messages[2].is_connection_closed()
+
+    def test_replace_dispatcher_while_observer_needs_the_lock(self):
+        communication = Communication(Mock(), Mock(), Mock())
+        started = Event()
+        locked = []
+
+        def observer(message):
+            started.set()
+            # give parallelize_observers time to take the lock
+            Event().wait(0.2)
+            with communication.lock:
+                locked.append(message)
+        communication.on_message(observer)
+        communication.parallelize_observers()
+        message = Mock()
+        communication._message_received(message)
+        started.wait(1)
+        thread = Thread(target=communication.parallelize_observers)
+        thread.daemon = True
+        thread.start()
+        thread.join(2)
+        assert not thread.is_alive()
+        assert locked == [message]
+        communication.stop()
@@ -0,0 +1,81 @@
+"""Test the profiling hooks.
+
+.. seealso:: :mod:`AYABInterface.communication.profiling`
+"""
+from AYABInterface.communication.profiling import add_hook, remove_hook, \
+    hooks, Hook, PhaseTimes, measure, PHASES, READ_MESSAGE_TYPE, \
+    INIT_MESSAGE, RECEIVE_MESSAGE, ENTER_STATE, SEND_MESSAGE
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from pytest import fixture, raises
+from io import BytesIO
+
+
+class RecordingHook(Hook):
+
+    def __init__(self):
+        self.calls = []
+
+    def enter(self, phase, subject, start):
+        self.calls.append(("enter", phase))
+
+    def exit(self, phase, subject, start, duration):
+        assert duration >= 0
+        self.calls.append(("exit", phase))
+
+
+@fixture
+def hook():
+    hook = RecordingHook()
+    add_hook(hook)
+    yield hook
+    remove_hook(hook)
+
+
+class TestMeasure(object):
+
+    def test_no_hooks_by_default(self):
+        assert hooks == []
+
+    def test_result_is_returned(self, hook):
+        assert measure(INIT_MESSAGE, None, max, 1, 4, 2) == 4
+        assert hook.calls == [("enter", INIT_MESSAGE), ("exit", INIT_MESSAGE)]
+
+    def test_exit_is_called_on_error(self, hook):
+        with raises(ZeroDivisionError):
+            measure(SEND_MESSAGE, None, lambda: 1 / 0)
+        assert hook.calls[-1] == ("exit", SEND_MESSAGE)
+
+    def test_remove_unknown_hook(self):
+        with raises(ValueError):
+            remove_hook(Hook())
+
+
+class Connection(object):
+
+    def __init__(self, input):
+        self.read = BytesIO(input).read
+        self.write = BytesIO().write
+
+
+class TestCommunicationPhases(object):
+
+    def test_all_phases_are_measured(self, hook):
+        times = PhaseTimes()
+        add_hook(times)
+        try:
+            communication = Communication(
+                Connection(b'\xc3\x04\x05\x02\r\n'), lambda i: None, KH910())
+            communication.start()
+            communication.receive_message()
+        finally:
+            remove_hook(times)
+        assert hook.calls == [
+            ("enter", ENTER_STATE), ("enter", SEND_MESSAGE),
+            ("exit", SEND_MESSAGE), ("exit", ENTER_STATE),
+            ("enter", READ_MESSAGE_TYPE), ("exit", READ_MESSAGE_TYPE),
+            ("enter", INIT_MESSAGE), ("exit", INIT_MESSAGE),
+            ("enter", RECEIVE_MESSAGE), ("enter", ENTER_STATE),
+            ("exit", ENTER_STATE), ("exit", RECEIVE_MESSAGE)]
+        for phase in PHASES:
+            assert times.histogram(phase).count >= 1
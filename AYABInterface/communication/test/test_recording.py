@@ -0,0 +1,137 @@
+"""Test recording and replaying the traffic.
+
+.. seealso:: :mod:`AYABInterface.communication.recording`
+"""
+from AYABInterface.communication.recording import Recorder, ReplayFile, \
+    read_log, recorded_needle_positions, Chunk, MAGIC, FROM_CONTROLLER, \
+    TO_CONTROLLER
+from AYABInterface.communication.simulator import Simulator
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from pytest import fixture, raises
+from io import BytesIO
+import pytest
+
+LINES = [["B", "D"] * 100, ["D"] * 200, ["B"] * 200, ["D", "B"] * 100] * 5
+
+
+def get_line(line_number):
+    if 0 <= line_number < len(LINES):
+        return LINES[line_number]
+    return None
+
+
+class Clock(object):
+
+    """A clock that can be set by the test."""
+
+    def __init__(self):
+        self.time = 100
+
+    def __call__(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += seconds
+
+
+@fixture
+def clock():
+    return Clock()
+
+
+class TestRecorder(object):
+
+    def test_log_starts_with_magic(self, clock):
+        log = BytesIO()
+        Recorder(BytesIO(), log, clock=clock)
+        assert log.getvalue() == MAGIC
+
+    def test_chunks_are_merged(self, clock):
+        log = BytesIO()
+        recorder = Recorder(BytesIO(b'abcdef'), log, 0.25, clock)
+        recorder.read(1)
+        clock.time += 0.125
+        recorder.read(2)
+        clock.time += 1
+        recorder.read(1)
+        recorder.write(b'xy')
+        recorder.write(b'z')
+        recorder.close()
+        log.seek(0)
+        assert read_log(log) == [Chunk(FROM_CONTROLLER, 0, b'abc'),
+                                 Chunk(FROM_CONTROLLER, 1.125, b'd'),
+                                 Chunk(TO_CONTROLLER, 1.125, b'xyz')]
+
+    def test_read_invalid_log(self):
+        with raises(ValueError):
+            read_log(BytesIO(b'nolog'))
+
+
+class TestReplayFile(object):
+
+    @fixture
+    def chunks(self):
+        return [Chunk(FROM_CONTROLLER, 1, b'ab'),
+                Chunk(TO_CONTROLLER, 2, b'x'),
+                Chunk(FROM_CONTROLLER, 5, b'cd')]
+
+    @pytest.mark.parametrize("speed,duration", [(1, 4), (2, 2), (None, 0)])
+    def test_timing(self, chunks, clock, speed, duration):
+        file = ReplayFile(chunks, speed, clock, clock.sleep)
+        assert file.read(1) == b'a'
+        start = clock.time
+        assert file.read(2) == b'bc'
+        assert clock.time - start == duration
+        assert file.read(5) == b'd'
+        assert file.is_at_end()
+        assert file.read(1) == b''
+
+    def test_output(self, chunks):
+        file = ReplayFile(chunks)
+        assert file.expected_output == b'x'
+        assert not file.output_matches()
+        file.write(b'x')
+        assert file.output == b'x'
+        assert file.output_matches()
+
+
+class TestRecordAndReplay(object):
+
+    @fixture
+    def chunks(self):
+        simulator, file = Simulator.socketpair()
+        log = BytesIO()
+        recorder = Recorder(file, log)
+        simulator.start()
+        communication = Communication(recorder, get_line, KH910())
+        communication.start()
+        while not communication.state.is_knitting_line() or \
+                communication.state.line_number != len(LINES) - 1:
+            communication.receive_message()
+        simulator.join(1)
+        simulator.close()
+        communication.receive_message()
+        recorder.close()
+        log.seek(0)
+        return read_log(log)
+
+    @pytest.mark.timeout(10)
+    def test_replay_produces_same_output(self, chunks):
+        file = ReplayFile(chunks, None)
+        communication = Communication(file, get_line, KH910())
+        communication.start()
+        while not communication.state.is_connection_closed():
+            communication.receive_message()
+        assert file.output_matches()
+
+    @pytest.mark.timeout(10)
+    def test_needle_positions_can_be_extracted(self, chunks):
+        lines = recorded_needle_positions(chunks, KH910())
+        assert lines == dict(enumerate(LINES))
+        file = ReplayFile(chunks, None)
+        communication = Communication(file, lines.get, KH910())
+        communication.start()
+        while not communication.state.is_connection_closed():
+            communication.receive_message()
+        assert file.output_matches()
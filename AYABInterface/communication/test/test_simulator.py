@@ -0,0 +1,158 @@
+"""Test the simulation of the controller.
+
+.. seealso:: :mod:`AYABInterface.communication.simulator`
+"""
+from AYABInterface.communication.simulator import Simulator
+from AYABInterface.communication import Communication
+from AYABInterface.machines import KH910
+from AYABInterface.serial import SerialPort
+import pytest
+import sys
+
+LINES = [["B", "D"] * 100, ["D"] * 200, ["D", "B"] * 100] * 100
+
+
+def get_line(line_number):
+    if 0 <= line_number < len(LINES):
+        return LINES[line_number]
+    return None
+
+
+def knit_all_lines(communication):
+    """Receive messages until the last line was sent."""
+    communication.start()
+    while not (communication.state.is_knitting_line() and
+               communication.state.line_number == len(LINES) - 1):
+        communication.receive_message()
+
+
+def knit(simulator, file, **communication_arguments):
+    """Knit all the lines and return the communication."""
+    simulator.start()
+    communication = Communication(file, get_line, KH910(),
+                                  **communication_arguments)
+    knit_all_lines(communication)
+    simulator.join(1)
+    simulator.close()
+    communication.receive_message()
+    return communication
+
+
+class TestSocketPair(object):
+
+    @pytest.mark.timeout(10)
+    def test_all_lines_are_knit(self):
+        simulator, file = Simulator.socketpair()
+        communication = knit(simulator, file)
+        assert communication.state.is_connection_closed()
+        assert simulator.errors == []
+        assert simulator.line_order == list(range(len(LINES)))
+        machine = KH910()
+        for line_number, line in enumerate(LINES):
+            assert simulator.lines[line_number] == \
+                machine.needle_positions_to_bytes(line)
+        assert simulator.lines_per_second > 0
+        assert simulator.number_of_lines == len(LINES)
+
+    @pytest.mark.timeout(10)
+    def test_lines_are_pushed_ahead(self):
+        simulator, file = Simulator.socketpair()
+        communication = knit(simulator, file, push_lines_ahead=True)
+        assert simulator.errors == []
+        assert simulator.line_order == list(range(len(LINES)))
+        assert communication.pushed_line_number is None
+
+    @pytest.mark.timeout(10)
+    def test_lines_are_not_recorded(self):
+        simulator, file = Simulator.socketpair(record_lines=False)
+        knit(simulator, file)
+        assert simulator.lines == {}
+        assert simulator.line_order == []
+        assert simulator.number_of_lines == len(LINES)
+
+    @pytest.mark.timeout(10)
+    def test_controller_information(self):
+        simulator, file = Simulator.socketpair(firmware_version=(3, 2))
+        communication = knit(simulator, file)
+        assert communication.controller.firmware_version == (3, 2)
+        assert communication.controller.api_version == 4
+
+    @pytest.mark.timeout(10)
+    def test_unsupported_api_version(self):
+        simulator, file = Simulator.socketpair(api_version=3)
+        simulator.start()
+        communication = Communication(file, get_line, KH910())
+        communication.start()
+        communication.receive_message()
+        assert communication.state.is_unsupported_api_version()
+        simulator.close()
+
+    @pytest.mark.timeout(10)
+    def test_start_needles(self):
+        simulator, file = Simulator.socketpair()
+        simulator.start()
+        communication = Communication(file, get_line, KH910(),
+                                      left_end_needle=10,
+                                      right_end_needle=20)
+        communication.start()
+        while not communication.state.is_knitting_line():
+            communication.receive_message()
+        assert simulator.left_end_needle == 10
+        assert simulator.right_end_needle == 20
+        simulator.close()
+
+
+class TestLineDuration(object):
+
+    @pytest.mark.parametrize("speed,margin,duration", [
+        (None, 24, 0), (248, 24, 1), (100, 0, 2)])
+    def test_duration(self, speed, margin, duration):
+        simulator = Simulator(None, carriage_speed=speed, turn_margin=margin)
+        assert simulator.line_duration() == duration
+
+
+class TestProtocolErrors(object):
+
+    @pytest.mark.timeout(10)
+    def test_unknown_message(self):
+        simulator, file = Simulator.socketpair()
+        file.write(b'\x99abc\r\n\x03\r\n')
+        simulator.receive_message()
+        simulator.receive_message()
+        assert simulator.errors == ["unknown message 0x99"]
+        assert file.read(6) == b'\xc3\x04\x00\x63\r\n'
+        simulator.close()
+
+    @pytest.mark.timeout(10)
+    def test_wrong_line(self):
+        simulator, file = Simulator.socketpair()
+        file.write(b'\x01\x00\xc7\r\n')
+        simulator.receive_message()
+        line = b'\x05' + b'\x00' * 25 + b'\x01'
+        file.write(b'\x42' + line + b'\x00\r\n')
+        simulator.receive_message()
+        assert simulator.errors == ["wrong crc in line 5",
+                                    "line 5 was sent but 0 was requested"]
+        assert simulator.is_finished()
+        simulator.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="pseudo terminals are tested on Linux")
+class TestPty(object):
+
+    @pytest.mark.timeout(10)
+    def test_knit_through_serial_port(self):
+        simulator, device = Simulator.pty()
+        connection = SerialPort(device).connect()
+        try:
+            simulator.start()
+            communication = Communication(connection, get_line, KH910())
+            knit_all_lines(communication)
+            simulator.join(1)
+            assert simulator.is_finished()
+            assert simulator.errors == []
+            assert len(simulator.line_order) == len(LINES)
+        finally:
+            connection.close()
+            simulator.close()
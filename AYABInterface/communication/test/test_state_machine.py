@@ -3,7 +3,7 @@ from AYABInterface.communication.states import ConnectionClosed, \
     InitializingMachine, StartingToKnit, StartingFailed, KnittingStarted, \
     KnittingLine
 from pytest import fixture
-from unittest.mock import Mock
+from unittest.mock import Mock, call
 from test_assertions import assert_identify
 import pytest
 from AYABInterface.communication.host_messages import LineConfirmation, \
@@ -169,6 +169,13 @@ class TestKnittingLine(TestKnittingStarted):
     tests = ["is_knitting", "is_knitting_line"]  #: the true tests
     line_number = object()
 
+    @fixture
+    def communication(self):
+        communication = Mock()
+        communication.state = None
+        communication.pushes_lines_ahead.return_value = False
+        return communication
+
     @fixture
     def state(self, communication):
         return self.state_class(communication, self.line_number)
@@ -190,3 +197,60 @@ class TestKnittingLine(TestKnittingStarted):
     def test_enter_sets_last_line_requested(self, state, communication):
         state.enter()
         assert communication.last_requested_line_number == self.line_number
+
+
+class TestKnittingLinePushedAhead(object):
+
+    """Test pushing the next line in KnittingLine.enter.
+
+    .. seealso::
+      :meth:`AYABInterface.communication.Communication.pushes_lines_ahead`
+    """
+
+    @fixture
+    def communication(self):
+        communication = Mock()
+        communication.pushes_lines_ahead.return_value = True
+        communication.needle_positions.is_last.return_value = False
+        communication.pushed_line_number = None
+        return communication
+
+    def test_next_line_is_pushed(self, communication):
+        KnittingLine(communication, 4).enter()
+        assert communication.send.call_args_list == [
+            call(LineConfirmation, 4), call(LineConfirmation, 5)]
+        assert communication.pushed_line_number == 5
+
+    def test_pushed_line_is_not_sent_again(self, communication):
+        communication.pushed_line_number = 5
+        KnittingLine(communication, 5).enter()
+        communication.send.assert_called_once_with(LineConfirmation, 6)
+        assert communication.pushed_line_number == 6
+
+    def test_other_requested_line_is_sent(self, communication):
+        communication.pushed_line_number = 5
+        KnittingLine(communication, 4).enter()
+        communication.send.assert_called_once_with(LineConfirmation, 4)
+        assert communication.pushed_line_number is None
+
+    def test_pushing_resumes_after_other_requested_line(self,
+                                                        communication):
+        communication.pushed_line_number = 5
+        KnittingLine(communication, 4).enter()
+        KnittingLine(communication, 5).enter()
+        assert communication.send.call_args_list == [
+            call(LineConfirmation, 4), call(LineConfirmation, 5),
+            call(LineConfirmation, 6)]
+        assert communication.pushed_line_number == 6
+
+    def test_nothing_is_pushed_after_the_last_line(self, communication):
+        communication.needle_positions.is_last.return_value = True
+        KnittingLine(communication, 7).enter()
+        communication.send.assert_called_once_with(LineConfirmation, 7)
+        communication.needle_positions.is_last.assert_called_once_with(7)
+        assert communication.pushed_line_number is None
+
+    def test_lines_are_not_pushed_by_default(self, communication):
+        communication.pushes_lines_ahead.return_value = False
+        KnittingLine(communication, 4).enter()
+        communication.send.assert_called_once_with(LineConfirmation, 4)
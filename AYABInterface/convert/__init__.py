@@ -1,41 +1,233 @@
-"""Conversion of colors to needle positions."""
+"""Conversion of colors to needle positions.
+
+The needle positions of all the colors of a row are computed in one pass
+over the row, see :func:`color_masks`. If :mod:`numpy` is installed, rows
+of integers with at least :data:`NUMPY_MINIMUM_WIDTH` colors are converted
+with it.
+
+:func:`colors_to_packed_needle_positions` stores the needle positions as
+bits of an :class:`int` instead of a list, see :class:`PackedNeedlePositions`.
+"""
 from collections import namedtuple
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 NeedlePositions = namedtuple("NeedlePositions", ["needle_coloring", "colors",
                                                  "two_colors"])
 
+#: rows shorter than this are converted without :mod:`numpy`
+NUMPY_MINIMUM_WIDTH = 64
+
+#: the number of bytes of the needle positions in a :ref:`cnfline`
+LINE_BYTES = 25
+
+# _MASK_DIGITS[i] translates the byte i to b"0" and others to b"1"
+_MASK_DIGITS = [b"1" * i + b"0" + b"1" * (255 - i) for i in range(256)]
+
+
+class PackedNeedlePositions(namedtuple("PackedNeedlePositions", [
+        "mask", "width", "colors", "two_colors"])):
+
+    """The needle positions of a color as bits of an :class:`int`.
+
+    This is a compact alternative to :class:`NeedlePositions`. Bit ``i`` of
+    the :attr:`mask` is the value of needle ``i`` in the
+    :attr:`needle_coloring`. A row of one color has the mask ``0``.
+
+    .. seealso:: :func:`colors_to_packed_needle_positions`
+    """
+
+    __slots__ = ()
+
+    @property
+    def needle_coloring(self):
+        """The mask as a list of ``0`` and ``1``.
+
+        :rtype: list
+        """
+        mask = self.mask
+        return [(mask >> index) & 1 for index in range(self.width)]
+
+    def to_bytes(self, start_needle=0, length=LINE_BYTES):
+        """The mask in the wire format of a :ref:`cnfline`.
+
+        :param int start_needle: the needle of the first color of the row
+        :param int length: the number of bytes
+        :rtype: bytes
+        :return: the same as
+          :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes`
+          for a machine with the needle positions of the
+          :attr:`needle_coloring` placed at the :paramref:`start_needle`
+        :raises OverflowError: if the needles do not fit into the bytes
+        """
+        return (self.mask << start_needle).to_bytes(length, "little")
+
+
+def _python_color_masks(row):
+    """Compute the color masks in one pass over the row."""
+    width = len(row)
+    masks = {}
+    colors = []
+    for index, color in enumerate(row):
+        mask = masks.get(color)
+        if mask is None:
+            mask = masks[color] = [1] * width
+            colors.append(color)
+        mask[index] = 0
+    return colors, [masks[color] for color in colors]
+
+
+def _numpy_color_masks(row):
+    """Compute the color masks of a numeric row with numpy."""
+    values, first_indices, inverse = numpy.unique(
+        row, return_index=True, return_inverse=True)
+    order = numpy.argsort(first_indices)
+    colors = values[order].tolist()
+    masks = (inverse[numpy.newaxis, :] != order[:, numpy.newaxis])
+    return colors, masks.astype(numpy.int8).tolist()
+
+
+def _numpy_row(row):
+    """The row as array if its color masks are computed with numpy.
+
+    :return: a one-dimensional :class:`numpy.ndarray` of integers or
+      :obj:`None` if the row has other colors
+    """
+    if numpy is None or len(row) < NUMPY_MINIMUM_WIDTH:
+        return None
+    if not isinstance(row, numpy.ndarray):
+        if not isinstance(row[0], int):
+            return None
+        try:
+            row = numpy.asarray(row)
+        except (TypeError, ValueError):
+            return None
+    if row.ndim != 1 or row.dtype.kind not in "biu":
+        return None
+    return row
+
+
+def color_masks(row):
+    """Find the colors of a row and where they are.
+
+    :param row: a sequence of colors, e.g. a :class:`list` or a
+      :class:`numpy.ndarray`
+    :rtype: tuple
+    :return: a tuple ``(colors, masks)``. The ``colors`` are listed in the
+      order of their first occurrence. For each color, the list in
+      ``masks`` has a ``0`` where the row has this color and a ``1``
+      elsewhere.
 
-def _row_color(row, color):
-    return [(0 if color_ == color else 1) for color_ in row]
+    .. code:: python
+
+        >>> color_masks([1, 2, 0, 2])
+        ([1, 2, 0], [[0, 1, 1, 1], [1, 0, 1, 0], [1, 1, 0, 1]])
+
+    """
+    array = _numpy_row(row)
+    if array is not None:
+        return _numpy_color_masks(array)
+    return _python_color_masks(row)
 
 
 def colors_to_needle_positions(rows):
     """Convert rows to needle positions.
 
-    :return:
+    :param rows: an iterable over rows of colors, e.g. a list of lists or a
+      two-dimensional :class:`numpy.ndarray`
+    :return: a list with a list of :class:`NeedlePositions` for each row
     :rtype: list
     """
     needles = []
     for row in rows:
-        colors = set(row)
+        if numpy is not None and isinstance(row, numpy.ndarray):
+            colors, masks = color_masks(row)
+            row = row.tolist()
+        else:
+            colors = set(row)
+            masks = None
         if len(colors) == 1:
             needles.append([NeedlePositions(row, tuple(colors), False)])
         elif len(colors) == 2:
             color1, color2 = colors
             if color1 != row[0]:
                 color1, color2 = color2, color1
-            needles_ = _row_color(row, color1)
+            if masks is None:
+                needles_ = [(0 if color == color1 else 1) for color in row]
+            else:
+                needles_ = masks[0]
             needles.append([NeedlePositions(needles_, (color1, color2), True)])
         else:
-            colors = []
-            for color in row:
-                if color not in colors:
-                    colors.append(color)
-            needles_ = []
-            for color in colors:
-                needles_.append(NeedlePositions(_row_color(row, color),
-                                                (color,), False))
-            needles.append(needles_)
+            if masks is None:
+                colors, masks = color_masks(row)
+            needles.append([NeedlePositions(mask, (color,), False)
+                            for color, mask in zip(colors, masks)])
+    return needles
+
+
+def _packed_masks(row, colors, number=None):
+    """Compute the masks of the first colors of a row as int.
+
+    :param list colors: the colors of the row in the order of their first
+      occurrence
+    :param int number: the number of masks to compute, all by default
+    """
+    if len(colors) > len(_MASK_DIGITS):
+        masks = color_masks(row)[1][:number]
+        return [int("".join(map(str, reversed(mask))), 2) for mask in masks]
+    # the last needle is the most significant bit
+    try:
+        indices = bytes(reversed(row))
+        digits = colors
+    except (TypeError, ValueError):
+        index = {color: i for i, color in enumerate(colors)}
+        indices = bytes(map(index.__getitem__, reversed(row)))
+        digits = range(len(colors))
+    return [int(indices.translate(_MASK_DIGITS[digit]), 2)
+            for digit in digits[:number]]
+
+
+def colors_to_packed_needle_positions(rows):
+    """Convert rows to packed needle positions.
+
+    :param rows: an iterable over rows of colors, e.g. a list of lists
+    :return: a list with a list of :class:`PackedNeedlePositions` for each
+      row. The colors are the same as in :func:`colors_to_needle_positions`.
+    :rtype: list
+
+    Each mask is computed by translating the row to a string of binary
+    digits. For two colors and more, this needs about an eighth of the
+    memory of the lists and :meth:`~PackedNeedlePositions.to_bytes` skips
+    the conversion of
+    :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes`.
+    """
+    needles = []
+    for row in rows:
+        if numpy is not None and isinstance(row, numpy.ndarray):
+            row = row.tolist()
+        width = len(row)
+        colors = set(row)
+        if len(colors) == 1:
+            needles.append([PackedNeedlePositions(0, width, tuple(colors),
+                                                  False)])
+        elif len(colors) == 2:
+            color1, color2 = colors
+            if color1 != row[0]:
+                color1, color2 = color2, color1
+            colors = [color1, color2]
+            needles.append([PackedNeedlePositions(
+                _packed_masks(row, colors, 1)[0], width, tuple(colors),
+                True)])
+        else:
+            colors = sorted(colors, key=row.index)
+            needles.append([PackedNeedlePositions(mask, width, (color,),
+                                                  False)
+                            for color, mask in zip(
+                                colors, _packed_masks(row, colors))])
     return needles
 
-__all__ = ["colors_to_needle_positions", "NeedlePositions"]
+__all__ = ["colors_to_needle_positions", "color_masks", "NeedlePositions",
+           "NUMPY_MINIMUM_WIDTH", "colors_to_packed_needle_positions",
+           "PackedNeedlePositions", "LINE_BYTES"]
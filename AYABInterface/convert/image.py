@@ -0,0 +1,145 @@
+"""Stream the rows of an image as needle positions.
+
+The pipeline reads one row of an image at a time, finds its colors with
+:func:`~AYABInterface.convert.colors_to_needle_positions` and converts the
+result with :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes`.
+No list of all the rows is created, so large images can be knit without
+holding the intermediate results in memory.
+
+.. code:: python
+
+    from AYABInterface.machines import KH910
+
+    for line in image_to_needle_positions("pattern.png", KH910(), 2):
+        print(line.row, line.colors, line.bytes)
+
+Images are read with `Pillow <https://pypi.python.org/pypi/Pillow>`__ if it
+is installed. Without Pillow, pass the rows of palette indices, e.g. as a
+list of lists or a two-dimensional :class:`numpy.ndarray`.
+"""
+from . import colors_to_needle_positions
+from collections import namedtuple
+import sys
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+#: the number of colors images without a palette are reduced to
+DEFAULT_NUMBER_OF_COLORS = 2
+
+#: A line to knit, one of the lines that a row of the image needs.
+#: The :attr:`needle_positions` are the
+#: :attr:`~AYABInterface.machines.Machine.needle_positions` of the machine
+#: and the :attr:`bytes` the result of
+#: :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes`.
+Line = namedtuple("Line", ["row", "colors", "two_colors", "needle_positions",
+                           "bytes"])
+
+
+def _is_image(source):
+    """Whether the source is an image of Pillow."""
+    return Image is not None and isinstance(source, Image.Image)
+
+
+def _open_image(source):
+    """Open the image file or return the image."""
+    if _is_image(source):
+        return source
+    if Image is None:
+        raise ImportError("Install Pillow to read image files with '{} -m "
+                          "pip install Pillow'.".format(sys.executable))
+    return Image.open(source)
+
+
+def _palette_image(image, number_of_colors):
+    """Convert an image to one byte per pixel."""
+    if number_of_colors is None:
+        if image.mode in ("L", "P"):
+            return image
+        if image.mode == "1":
+            return image.convert("L")
+        number_of_colors = DEFAULT_NUMBER_OF_COLORS
+    return image.convert("RGB").quantize(number_of_colors)
+
+
+def image_rows(source, number_of_colors=None):
+    """Yield the rows of an image as lists of palette indices.
+
+    :param source: a file name or a binary file of an image, an image of
+      Pillow or an iterable over rows of colors. Rows are passed on
+      unchanged.
+    :param int number_of_colors: the number of colors to reduce the image
+      to. If it is :obj:`None`, images with a palette and gray scale images
+      keep their colors and other images are reduced to
+      :data:`DEFAULT_NUMBER_OF_COLORS`.
+    :raises ImportError: if an image file should be read but Pillow is not
+      installed
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, "read") or \
+            _is_image(source):
+        image = _palette_image(_open_image(source), number_of_colors)
+        width = image.size[0]
+        data = memoryview(image.tobytes())
+        for start in range(0, len(data), width):
+            yield list(data[start:start + width])
+    else:
+        yield from source
+
+
+def rows_to_needle_positions(rows, machine, start_needle=None):
+    """Convert rows of colors to needle positions while iterating.
+
+    :param rows: an iterable over rows of colors, e.g. from
+      :func:`image_rows`
+    :param AYABInterface.machines.Machine machine: the machine to knit on
+    :param int start_needle: the needle of the first color of each row. If
+      it is :obj:`None`, the rows are centered on the machine.
+    :return: a generator of :class:`Lines <Line>`
+    :raises ValueError: if a row does not fit on the machine
+
+    A ``0`` in the :attr:`needle coloring
+    <AYABInterface.convert.NeedlePositions.needle_coloring>` is the first
+    of the :attr:`~AYABInterface.machines.Machine.needle_positions` and a
+    ``1`` the second. Needles outside of the row are in the first position.
+    """
+    positions = machine.needle_positions
+    number_of_needles = machine.number_of_needles
+    to_bytes = machine.needle_positions_to_bytes
+    for row_index, row in enumerate(rows):
+        width = len(row)
+        start = (number_of_needles - width) // 2 \
+            if start_needle is None else start_needle
+        if start < 0 or start + width > number_of_needles:
+            raise ValueError("Row {} with {} colors does not fit at needle {}"
+                             " on a machine with {} needles.".format(
+                                 row_index, width, start, number_of_needles))
+        left = [positions[0]] * start
+        right = [positions[0]] * (number_of_needles - start - width)
+        row_needles = colors_to_needle_positions([row])[0]
+        if len(row_needles) == 1 and not row_needles[0].two_colors:
+            # the needle coloring of a row with one color is the row
+            row_needles = [row_needles[0]._replace(
+                needle_coloring=[0] * width)]
+        for needles in row_needles:
+            needle_positions = left + [positions[value] for value in
+                                       needles.needle_coloring] + right
+            yield Line(row_index, needles.colors, needles.two_colors,
+                       needle_positions, to_bytes(needle_positions))
+
+
+def image_to_needle_positions(source, machine, number_of_colors=None,
+                              start_needle=None):
+    """Stream the lines to knit an image.
+
+    :param source: see :func:`image_rows`
+    :param AYABInterface.machines.Machine machine: the machine to knit on
+    :param int number_of_colors: see :func:`image_rows`
+    :param int start_needle: see :func:`rows_to_needle_positions`
+    :return: a generator of :class:`Lines <Line>`
+    """
+    return rows_to_needle_positions(image_rows(source, number_of_colors),
+                                    machine, start_needle)
+
+__all__ = ["image_to_needle_positions", "image_rows",
+           "rows_to_needle_positions", "Line", "DEFAULT_NUMBER_OF_COLORS"]
@@ -0,0 +1,115 @@
+"""Convert the rows of large patterns in several processes.
+
+Every row is converted independently of the others. For patterns with
+many thousands of rows, the rows are split into chunks of
+:data:`CHUNK_SIZE` which are converted in a
+:class:`~concurrent.futures.ProcessPoolExecutor`. The results are in the
+order of the rows:
+
+.. code:: python
+
+    needles = colors_to_needle_positions_in_parallel(rows)
+    assert needles == colors_to_needle_positions(rows)
+
+Starting the processes and sending the rows to them takes time. Patterns
+with less than :data:`PARALLEL_MINIMUM_ROWS` rows are converted in the
+current process. If you convert several patterns, pass the same
+:paramref:`~map_rows.executor` to start the
+processes only once.
+"""
+from . import colors_to_needle_positions
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import cpu_count
+
+#: the number of rows converted in one task of a process
+CHUNK_SIZE = 1000
+
+#: patterns with less rows are converted in the current process
+PARALLEL_MINIMUM_ROWS = 10000
+
+
+def _processors():
+    """The number of processors or 1 if it is unknown."""
+    try:
+        return cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _needle_positions_to_bytes(machine, rows):
+    """Convert the needle positions of rows to bytes on a machine."""
+    return [machine.needle_positions_to_bytes(row) for row in rows]
+
+
+def map_rows(function, rows, max_workers=None, chunk_size=CHUNK_SIZE,
+             minimum_rows=PARALLEL_MINIMUM_ROWS, executor=None):
+    """Apply a function to chunks of rows in parallel.
+
+    :param function: a function that takes a list of rows and returns a
+      list with one result per row. It must be picklable, e.g. a function
+      defined at module level or a :func:`functools.partial` of it.
+    :param rows: an iterable over rows
+    :param int max_workers: the number of processes to start. By default,
+      this is the number of processors. With only one, the rows are
+      converted in the current process.
+    :param int chunk_size: the number of rows sent to a process at once.
+      If all rows fit into one chunk, they are converted in the current
+      process.
+    :param int minimum_rows: if there are less rows, :paramref:`function`
+      is called once in the current process
+    :param concurrent.futures.Executor executor: the executor to run the
+      chunks in. If it is :obj:`None`, a
+      :class:`~concurrent.futures.ProcessPoolExecutor` is started and shut
+      down afterwards.
+    :rtype: list
+    :return: the results of all the rows in the order of the rows
+    """
+    rows = list(rows)
+    if max_workers is None and executor is None:
+        max_workers = _processors()
+    if len(rows) < minimum_rows or len(rows) <= chunk_size or \
+            max_workers == 1:
+        return function(rows)
+    chunks = [rows[start:start + chunk_size]
+              for start in range(0, len(rows), chunk_size)]
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as executor:
+            results = list(executor.map(function, chunks))
+    else:
+        results = list(executor.map(function, chunks))
+    return [result for chunk in results for result in chunk]
+
+
+def colors_to_needle_positions_in_parallel(rows, **arguments):
+    """Convert rows to needle positions in several processes.
+
+    :param rows: an iterable over rows of colors
+    :return: the same as
+      :func:`~AYABInterface.convert.colors_to_needle_positions`
+    :rtype: list
+
+    The other arguments are described in :func:`map_rows`.
+    """
+    return map_rows(colors_to_needle_positions, rows, **arguments)
+
+
+def needle_positions_to_bytes_in_parallel(machine, rows, **arguments):
+    """Convert the needle positions of rows to bytes in several processes.
+
+    :param AYABInterface.machines.Machine machine: the machine to knit on
+    :param rows: an iterable over lists of
+      :attr:`~AYABInterface.machines.Machine.needle_positions`
+    :return: a list with the result of
+      :meth:`~AYABInterface.machines.Machine.needle_positions_to_bytes` for
+      each row
+    :rtype: list
+
+    The other arguments are described in :func:`map_rows`.
+    """
+    return map_rows(partial(_needle_positions_to_bytes, machine), rows,
+                    **arguments)
+
+__all__ = ["map_rows", "colors_to_needle_positions_in_parallel",
+           "needle_positions_to_bytes_in_parallel", "CHUNK_SIZE",
+           "PARALLEL_MINIMUM_ROWS"]
@@ -1,5 +1,8 @@
 import pytest
-from AYABInterface.convert import colors_to_needle_positions
+from AYABInterface.convert import colors_to_needle_positions, color_masks, \
+    colors_to_packed_needle_positions, PackedNeedlePositions, LINE_BYTES
+from AYABInterface.machines import KH910
+import AYABInterface.convert as convert
 
 
 class TestColorsToBinary(object):
@@ -22,3 +25,125 @@ class TestColorsToBinary(object):
         assert row[0] == row.needle_coloring
         assert row[1] == row.colors
         assert row[2] == row.two_colors
+
+    def test_many_colors(self):
+        row = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+        needles = colors_to_needle_positions([row])[0]
+        assert [positions.colors for positions in needles] == \
+            [(3,), (1,), (4,), (5,), (9,), (2,), (6,)]
+        for positions in needles:
+            color = positions.colors[0]
+            assert positions.needle_coloring == \
+                [(0 if color_ == color else 1) for color_ in row]
+            assert not positions.two_colors
+
+    def test_empty_row(self):
+        assert colors_to_needle_positions([[]]) == [[]]
+
+
+class TestColorMasks(object):
+
+    """Test :func:`AYABInterface.convert.color_masks`."""
+
+    @pytest.mark.parametrize("row,colors,masks", [
+        ([], [], []),
+        (["a"], ["a"], [[0]]),
+        ([1, 2, 0, 2], [1, 2, 0], [[0, 1, 1, 1], [1, 0, 1, 0], [1, 1, 0, 1]]),
+        ("abca", ["a", "b", "c"], [[0, 1, 1, 0], [1, 0, 1, 1], [1, 1, 0, 1]])])
+    def test_masks(self, row, colors, masks):
+        assert color_masks(row) == (colors, masks)
+
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    def test_long_rows(self, use_numpy, monkeypatch):
+        if use_numpy:
+            pytest.importorskip("numpy")
+        else:
+            monkeypatch.setattr(convert, "numpy", None)
+        row = [(index * 7) % 5 for index in range(200)]
+        colors, masks = color_masks(row)
+        assert colors == [0, 2, 4, 1, 3]
+        for color, mask in zip(colors, masks):
+            assert mask == [(0 if color_ == color else 1) for color_ in row]
+
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    @pytest.mark.parametrize("row,colors", [
+        ([1] * 63 + ["a", 2], [1, "a", 2]),
+        ([1] * 64 + [2.5], [1, 2.5]),
+        ([1] * 64 + [(2, 3)], [1, (2, 3)])])
+    def test_long_rows_of_mixed_colors(self, use_numpy, monkeypatch, row,
+                                       colors):
+        if use_numpy:
+            pytest.importorskip("numpy")
+        else:
+            monkeypatch.setattr(convert, "numpy", None)
+        assert color_masks(row)[0] == colors
+
+
+class TestNumpyArrays(object):
+
+    """Convert numpy arrays."""
+
+    @pytest.fixture
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    def test_two_dimensional_array(self, numpy):
+        rows = [[0] * 100, [1, 2] * 50, [1, 2, 0, 2] * 25]
+        expected = colors_to_needle_positions(rows)
+        assert colors_to_needle_positions(numpy.array(rows)) == expected
+
+
+class TestPackedNeedlePositions(object):
+
+    """Test :func:`AYABInterface.convert.colors_to_packed_needle_positions`.
+    """
+
+    @pytest.mark.parametrize("row,expected", [
+        ([5, 5, 5], [(0, 3, (5,), False)]),
+        ([1, 2, 1, 2], [(0b1010, 4, (1, 2), True)]),
+        ([2, 1, 1], [(0b110, 3, (2, 1), True)]),
+        ([300, 1, 300], [(0b010, 3, (300, 1), True)]),
+        ([1, 2, 0, 2], [(0b1110, 4, (1,), False), (0b0101, 4, (2,), False),
+                        (0b1011, 4, (0,), False)]),
+        ("abca", [(0b0110, 4, ("a",), False), (0b1101, 4, ("b",), False),
+                  (0b1011, 4, ("c",), False)]),
+        ([], [])])
+    def test_conversion(self, row, expected):
+        assert colors_to_packed_needle_positions([row]) == [expected]
+
+    @pytest.mark.parametrize("row", [
+        [1, 2, 1, 1, 2], [1, 2, 0, 2], [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5],
+        [(index * 7) % 5 for index in range(200)]])
+    def test_same_as_lists(self, row):
+        packed = colors_to_packed_needle_positions([row])[0]
+        unpacked = colors_to_needle_positions([row])[0]
+        assert [(positions.needle_coloring, positions.colors,
+                 positions.two_colors) for positions in packed] == unpacked
+
+    def test_many_colors(self):
+        row = list(range(300)) + [7]
+        packed = colors_to_packed_needle_positions([row])[0]
+        assert len(packed) == 300
+        assert packed[7].colors == (7,)
+        assert packed[7].mask == (1 << 301) - 1 - (1 << 7) - (1 << 300)
+
+    @pytest.mark.parametrize("needle_coloring", [
+        [0, 1, 1, 0, 1, 0, 0, 0, 1], [1] * 196, [0] * 196, [1, 0] * 98])
+    @pytest.mark.parametrize("start_needle", [0, 3])
+    def test_bytes_like_machine(self, needle_coloring, start_needle):
+        machine = KH910()
+        positions = machine.needle_positions
+        needles = [positions[0]] * start_needle + \
+            [positions[value] for value in needle_coloring]
+        needles += [positions[0]] * (machine.number_of_needles - len(needles))
+        packed = PackedNeedlePositions(
+            int("".join(map(str, reversed(needle_coloring))), 2),
+            len(needle_coloring), (0,), False)
+        assert packed.needle_coloring == needle_coloring
+        assert packed.to_bytes(start_needle) == \
+            machine.needle_positions_to_bytes(needles)
+        assert len(packed.to_bytes()) == LINE_BYTES
+
+    def test_does_not_fit(self):
+        with pytest.raises(OverflowError):
+            PackedNeedlePositions(1, 1, (0,), False).to_bytes(200)
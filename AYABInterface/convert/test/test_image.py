@@ -0,0 +1,155 @@
+"""Test streaming images as needle positions.
+
+.. seealso:: :mod:`AYABInterface.convert.image`
+"""
+from AYABInterface.convert.image import image_to_needle_positions, \
+    image_rows, rows_to_needle_positions, Line
+from AYABInterface.machines import KH910
+import AYABInterface.convert.image as image_module
+from io import BytesIO
+import pytest
+import struct
+import zlib
+from pytest import fixture, raises
+
+
+@fixture
+def machine():
+    return KH910()
+
+
+@fixture
+def Image():
+    return pytest.importorskip("PIL.Image")
+
+
+@fixture
+def image_files(Image):
+    """Skip if this version of Pillow can not open files."""
+    try:
+        Image.preinit()
+    except Exception as error:
+        pytest.skip("Pillow can not read files: {}".format(error))
+
+
+def image(Image, mode, size, pixels):
+    """Create an image."""
+    image = Image.new(mode, size)
+    image.putdata(pixels)
+    return image
+
+
+def gray_png(rows):
+    """Create a PNG file with 8 bit gray values."""
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + \
+            struct.pack(">I", zlib.crc32(chunk_type + data))
+    header = struct.pack(">IIBBBBB", len(rows[0]), len(rows), 8, 0, 0, 0, 0)
+    data = b"".join(b"\x00" + bytes(row) for row in rows)
+    return BytesIO(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+                   chunk(b"IDAT", zlib.compress(data)) + chunk(b"IEND", b""))
+
+
+class TestRowsToNeedlePositions(object):
+
+    def test_two_colors(self, machine):
+        lines = list(rows_to_needle_positions([[1, 2, 2, 1]], machine, 0))
+        assert len(lines) == 1
+        line = lines[0]
+        assert line.row == 0
+        assert line.colors == (1, 2)
+        assert line.two_colors
+        assert line.needle_positions == ["B", "D", "D", "B"] + ["B"] * 196
+        assert line.bytes == machine.needle_positions_to_bytes(
+            line.needle_positions)
+
+    def test_one_color(self, machine):
+        line, = rows_to_needle_positions([["red"] * 3], machine, 10)
+        assert line.colors == ("red",)
+        assert line.needle_positions == ["B"] * 200
+
+    def test_many_colors(self, machine):
+        lines = list(rows_to_needle_positions([[0, 1, 2]], machine, 197))
+        assert [line.colors for line in lines] == [(0,), (1,), (2,)]
+        assert [line.needle_positions[197:] for line in lines] == \
+            [["B", "D", "D"], ["D", "B", "D"], ["D", "D", "B"]]
+        assert all(line.row == 0 for line in lines)
+
+    def test_rows_are_centered(self, machine):
+        line, = rows_to_needle_positions([[0, 1] * 2], machine)
+        assert line.needle_positions[98:102] == ["B", "D", "B", "D"]
+        assert line.needle_positions.count("D") == 2
+
+    @pytest.mark.parametrize("row,start", [([0] * 201, None), ([0, 1], 199),
+                                           ([0], -1)])
+    def test_row_does_not_fit(self, machine, row, start):
+        with raises(ValueError):
+            list(rows_to_needle_positions([row], machine, start))
+
+    def test_rows_are_read_while_iterating(self, machine):
+        read = []
+
+        def rows():
+            for row in range(3):
+                read.append(row)
+                yield [0, 1]
+        lines = rows_to_needle_positions(rows(), machine)
+        assert read == []
+        assert next(lines).row == 0
+        assert read == [0]
+
+
+class TestImageRows(object):
+
+    def test_rows_are_passed_on(self):
+        rows = [[1, 2], [3, 4]]
+        assert list(image_rows(rows)) == rows
+
+    def test_image_file(self, image_files):
+        file = gray_png([[0, 1, 0], [2, 2, 1]])
+        assert list(image_rows(file)) == [[0, 1, 0], [2, 2, 1]]
+
+    def test_palette_image(self, Image):
+        palette_image = image(Image, "P", (3, 2), [0, 1, 0, 2, 2, 1])
+        assert list(image_rows(palette_image)) == [[0, 1, 0], [2, 2, 1]]
+
+    def test_gray_image(self, Image):
+        gray_image = image(Image, "L", (2, 2), [0, 255, 255, 0])
+        assert list(image_rows(gray_image)) == [[0, 255], [255, 0]]
+
+    def test_bilevel_image(self, Image):
+        bilevel_image = image(Image, "1", (3, 1), [0, 255, 0])
+        assert list(image_rows(bilevel_image)) == [[0, 255, 0]]
+
+    def test_color_image_is_quantized(self, Image):
+        red, blue = (255, 0, 0), (0, 0, 255)
+        color_image = image(Image, "RGB", (4, 2), [
+            red, blue, blue, red, (250, 0, 0), red, blue, blue])
+        rows = list(image_rows(color_image))
+        assert len(rows) == 2
+        assert len(set(rows[0] + rows[1])) == 2
+        assert rows[0][0] == rows[0][3] == rows[1][0] == rows[1][1]
+        assert rows[0][1] == rows[0][2] == rows[1][2] == rows[1][3]
+
+    def test_number_of_colors(self, Image):
+        gray_image = image(Image, "L", (4, 1), [0, 10, 200, 255])
+        rows = list(image_rows(gray_image, 2))
+        assert len(set(rows[0])) == 2
+
+    def test_without_pillow(self, monkeypatch):
+        monkeypatch.setattr(image_module, "Image", None)
+        with raises(ImportError):
+            list(image_rows("pattern.png"))
+
+
+class TestImageToNeedlePositions(object):
+
+    def test_stream(self, image_files, machine):
+        file = gray_png([[0, 1, 1, 0], [2, 2, 2, 2]])
+        lines = image_to_needle_positions(file, machine, start_needle=0)
+        assert next(lines) == Line(
+            0, (0, 1), True, ["B", "D", "D", "B"] + ["B"] * 196,
+            b'\x06' + b'\x00' * 24)
+        assert next(lines).colors == (2,)
+        with raises(StopIteration):
+            next(lines)
@@ -0,0 +1,96 @@
+"""Test :mod:`AYABInterface.convert.parallel`."""
+import pytest
+from AYABInterface.convert import colors_to_needle_positions
+from AYABInterface.convert.parallel import map_rows, \
+    colors_to_needle_positions_in_parallel, \
+    needle_positions_to_bytes_in_parallel
+import AYABInterface.convert.parallel as parallel
+from AYABInterface.machines import KH910
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def double(rows):
+    return [row * 2 for row in rows]
+
+
+@pytest.fixture
+def rows():
+    return [[(needle * (row + 1) // 3) % (row % 4 + 1) for needle in range(20)]
+            for row in range(11)]
+
+
+@pytest.fixture
+def no_processes(monkeypatch):
+    def fail(*args, **kw):
+        assert False, "no process pool expected"
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", fail)
+
+
+class TestMapRows(object):
+
+    def test_order_of_results(self):
+        with ThreadPoolExecutor(3) as executor:
+            result = map_rows(double, range(10), chunk_size=3,
+                              minimum_rows=0, executor=executor)
+        assert result == [row * 2 for row in range(10)]
+
+    def test_empty(self, no_processes):
+        assert map_rows(double, [], max_workers=2, minimum_rows=0) == []
+
+    def test_one_chunk_stays_in_process(self, no_processes):
+        assert map_rows(double, [1, 2], max_workers=2, chunk_size=2,
+                        minimum_rows=0) == [2, 4]
+
+    def test_few_rows_stay_in_process(self, no_processes):
+        assert map_rows(double, [1, 2], max_workers=2, chunk_size=1,
+                        minimum_rows=3) == \
+            [2, 4]
+
+    def test_one_worker_stays_in_process(self, no_processes):
+        assert map_rows(double, [1, 2], max_workers=1, chunk_size=1,
+                        minimum_rows=0) == \
+            [2, 4]
+
+    def test_one_processor_stays_in_process(self, no_processes, monkeypatch):
+        monkeypatch.setattr(parallel, "cpu_count", lambda: 1)
+        assert map_rows(double, [1, 2], chunk_size=1,
+                        minimum_rows=0) == [2, 4]
+
+    def test_unknown_number_of_processors(self, no_processes, monkeypatch):
+        def cpu_count():
+            raise NotImplementedError()
+        monkeypatch.setattr(parallel, "cpu_count", cpu_count)
+        assert map_rows(double, [1, 2], chunk_size=1,
+                        minimum_rows=0) == [2, 4]
+
+    def test_chunks(self):
+        chunks = []
+
+        def function(rows):
+            chunks.append(rows)
+            return rows
+        with ThreadPoolExecutor(1) as executor:
+            map_rows(function, range(7), chunk_size=3, minimum_rows=0,
+                     executor=executor)
+        assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+class TestInProcesses(object):
+
+    def test_colors_to_needle_positions(self, rows):
+        result = colors_to_needle_positions_in_parallel(
+            rows, max_workers=2, chunk_size=4, minimum_rows=0)
+        assert result == colors_to_needle_positions(rows)
+
+    def test_needle_positions_to_bytes(self):
+        machine = KH910()
+        positions = machine.needle_positions
+        rows = [[positions[(needle // (row + 1)) % 2]
+                 for needle in range(machine.number_of_needles)]
+                for row in range(5)]
+        with ProcessPoolExecutor(2) as executor:
+            result = needle_positions_to_bytes_in_parallel(
+                machine, rows, chunk_size=2, minimum_rows=0,
+                executor=executor)
+        assert result == [machine.needle_positions_to_bytes(row)
+                          for row in rows]
@@ -0,0 +1,239 @@
+"""Find the serial ports with an AYAB shield attached.
+
+:func:`~AYABInterface.serial.list_serial_ports` only tells whether a port
+can be opened. :func:`list_ayab_ports` sends a :ref:`reqinfo` to all the
+candidates at the same time and returns the ports which answer with a
+:ref:`cnfinfo`:
+
+.. code:: python
+
+    for port in list_ayab_ports():
+        print(port.name, port.controller.firmware_version)
+
+The answers are remembered in a :class:`ProbeCache` by device path and USB
+serial number. A second scan only probes the devices which were not seen
+before.
+"""
+from .serial import SerialConfiguration, SerialPort, BAUD_RATE, \
+    DEFAULT_CONFIGURATION, list_port_information, probe_concurrently
+from .communication.framing import FrameReader
+from .communication.hardware_messages import InformationConfirmation
+from .communication.host_messages import InformationRequest
+from collections import namedtuple
+from io import BytesIO
+from threading import Lock
+from time import monotonic
+
+#: The seconds to wait for a :ref:`cnfinfo`. The Arduino restarts when the
+#: port is opened, so this includes the time the bootloader needs.
+HANDSHAKE_TIMEOUT = 3
+
+#: The seconds between two :ref:`reqinfo` messages while probing
+REQUEST_INTERVAL = 0.25
+
+#: The configuration :func:`probe_controller` opens the ports with. Ports
+#: are opened exclusively. On POSIX, this is an advisory lock: probing
+#: fails for ports which are connected with the
+#: :data:`~AYABInterface.serial.DEFAULT_CONFIGURATION` or another exclusive
+#: configuration but not for ports another program opened without the lock.
+PROBE_CONFIGURATION = SerialConfiguration(BAUD_RATE, REQUEST_INTERVAL,
+                                          exclusive=True)
+
+#: The versions of a controller from its :ref:`cnfinfo`
+ControllerInformation = namedtuple("ControllerInformation",
+                                   ["api_version", "firmware_version"])
+
+
+class _ReadUntil(object):
+
+    """A file that ends when the time to read is over."""
+
+    def __init__(self, file, deadline):
+        """Read from a file until the deadline.
+
+        :param file: the file to read from
+        :param float deadline: the :func:`~time.monotonic` time after which
+          nothing is read any more
+        """
+        self._file = file
+        self._deadline = deadline
+
+    def read(self, size=1):
+        """Read from the file or return ``b""`` after the deadline."""
+        if monotonic() >= self._deadline:
+            return b""
+        return self._file.read(size)
+
+
+def probe_controller(port, timeout=HANDSHAKE_TIMEOUT,
+                     configuration=PROBE_CONFIGURATION):
+    """Ask the controller on a port for its information.
+
+    :param str port: the port to probe
+    :param float timeout: the seconds to wait for the answer. A device that
+      sends data all the time is not read longer than this.
+    :param AYABInterface.serial.SerialConfiguration configuration: the
+      settings to open the port with, :data:`PROBE_CONFIGURATION` by
+      default. The read timeout must be set.
+    :rtype: ControllerInformation
+    :return: the versions of the controller or :obj:`None` if there was no
+      answer in time
+    :raises serial.SerialException: if the port can not be opened
+    """
+    connection = configuration.open(port)
+    try:
+        deadline = monotonic() + timeout
+        frames = FrameReader(_ReadUntil(connection, deadline))
+        while monotonic() < deadline:
+            InformationRequest(connection, None).send()
+            frame = frames.read_frame()
+            while frame:
+                if frame[0] == InformationConfirmation.MESSAGE_ID:
+                    message = InformationConfirmation(BytesIO(frame[1:]),
+                                                      None)
+                    return ControllerInformation(message.api_version,
+                                                 message.firmware_version)
+                frame = frames.read_frame()
+        return None
+    finally:
+        connection.close()
+
+
+class ProbeCache(object):
+
+    """Remember the results of :func:`probe_controller`.
+
+    The results are stored by :attr:`device path
+    <AYABInterface.serial.PortInformation.device>` and :attr:`USB serial
+    number <AYABInterface.serial.PortInformation.serial_number>`. If
+    another device is plugged into the same port, it is probed again.
+    Devices without a serial number can not be told apart. Use
+    :meth:`remove` when they are unplugged.
+    """
+
+    def __init__(self):
+        """Create a new empty ProbeCache."""
+        self._results = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def key(port):
+        """The key of a port in the cache.
+
+        :param AYABInterface.serial.PortInformation port: the port
+        :rtype: tuple
+        """
+        return (port.device, port.serial_number)
+
+    def __contains__(self, port):
+        """Whether the result of the port is known.
+
+        :param AYABInterface.serial.PortInformation port: the port
+        :rtype: bool
+        """
+        with self._lock:
+            return self.key(port) in self._results
+
+    def get(self, port):
+        """The result of probing a port.
+
+        :param AYABInterface.serial.PortInformation port: the port
+        :return: the result of :func:`probe_controller` or :obj:`None` if it
+          is not known
+        """
+        with self._lock:
+            return self._results.get(self.key(port))
+
+    def set(self, port, controller):
+        """Remember the result of probing a port.
+
+        :param AYABInterface.serial.PortInformation port: the port
+        :param controller: the result of :func:`probe_controller`
+        """
+        with self._lock:
+            self._results[self.key(port)] = controller
+
+    def remove(self, device):
+        """Forget the results of a device path.
+
+        :param str device: the device path, e.g. ``"/dev/ttyACM0"``
+        """
+        with self._lock:
+            for key in list(self._results):
+                if key[0] == device:
+                    del self._results[key]
+
+    def clear(self):
+        """Forget all the results."""
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self):
+        """The number of remembered results.
+
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._results)
+
+
+#: The cache used by :func:`list_ayab_ports` by default
+PROBE_CACHE = ProbeCache()
+
+
+def list_ayab_ports(timeout=HANDSHAKE_TIMEOUT, cache=PROBE_CACHE,
+                    usb_only=True, configuration=DEFAULT_CONFIGURATION):
+    """List the serial ports with an AYAB controller attached.
+
+    :param float timeout: the seconds to wait for the controllers to answer
+    :param ProbeCache cache: the cache of the results. The ports in the
+      cache are not probed again. If it is :obj:`None`, all ports are
+      probed.
+    :param bool usb_only: whether to probe only USB devices of
+      :data:`~AYABInterface.serial.USB_VENDOR_IDS`. Other devices may not
+      like to receive a :ref:`reqinfo`.
+    :param AYABInterface.serial.SerialConfiguration configuration: the
+      configuration of the returned ports
+    :rtype: list
+    :return: a list of :class:`~AYABInterface.serial.SerialPort` with a
+      :attr:`~AYABInterface.serial.SerialPort.controller`
+
+    Ports that can not be opened, e.g. because they are in use, are not
+    listed and not cached.
+    """
+    return probe_ports(list_port_information(usb_only), timeout, cache,
+                       configuration)
+
+
+def probe_ports(ports, timeout=HANDSHAKE_TIMEOUT, cache=PROBE_CACHE,
+                configuration=DEFAULT_CONFIGURATION):
+    """Probe the ports which are not in the cache.
+
+    :param list ports: a list of :class:`~AYABInterface.serial.PortInformation`
+    :rtype: list
+    :return: a list of :class:`~AYABInterface.serial.SerialPort` with a
+      :attr:`~AYABInterface.serial.SerialPort.controller`
+
+    The other arguments are described in :func:`list_ayab_ports`.
+    """
+    if cache is None:
+        cache = ProbeCache()
+    unknown = {port.device: port for port in ports if port not in cache}
+    results = probe_concurrently(
+        list(unknown), lambda device: probe_controller(device, timeout),
+        timeout + REQUEST_INTERVAL)
+    for device, controller in results.items():
+        cache.set(unknown[device], controller)
+    result = []
+    for port in ports:
+        if port.device in unknown:
+            controller = results.get(port.device)
+        else:
+            controller = cache.get(port)
+        if controller is not None:
+            result.append(SerialPort(port.device, configuration, controller))
+    return result
+
+__all__ = ["list_ayab_ports", "probe_ports", "probe_controller", "ProbeCache",
+           "PROBE_CACHE", "HANDSHAKE_TIMEOUT", "REQUEST_INTERVAL",
+           "PROBE_CONFIGURATION", "ControllerInformation"]
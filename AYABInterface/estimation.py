@@ -0,0 +1,191 @@
+"""Estimate the knitting time of patterns from recorded sessions.
+
+:func:`AYABInterface.travel.estimate_knitting_time` uses a fixed carriage
+speed and turn time. A :class:`KnittingTimeEstimator` measures them in
+recordings of a :class:`~AYABInterface.communication.recording.Recorder`
+from the needle positions of the carriage in the :ref:`indstate` messages:
+
+.. code:: python
+
+    estimator = KnittingTimeEstimator()
+    with open("session.ayabrec", "rb") as log:
+        estimator.add_recording(read_log(log))
+    print(estimator.estimate_pattern(knitting_pattern, KH910()), "seconds")
+
+Without recordings, the estimator uses
+:data:`~AYABInterface.travel.CARRIAGE_SPEED` and
+:data:`~AYABInterface.travel.TURN_TIME`.
+"""
+from .communication.framing import FrameReader
+from .communication.hardware_messages import StateIndication
+from .communication.recording import FROM_CONTROLLER
+from .interaction import Interaction
+from .travel import estimate_knitting_time, CARRIAGE_SPEED, TURN_TIME
+from collections import namedtuple
+from io import BytesIO
+
+#: Samples of a moving carriage further apart than this many seconds are
+#: not used to measure the speed.
+MAXIMUM_SAMPLE_INTERVAL = 1
+
+#: Turns of the carriage longer than this many seconds are breaks and are
+#: not used to measure the turn time.
+MAXIMUM_TURN_TIME = 30
+
+#: The position of the carriage at a point in time of a recording
+CarriageSample = namedtuple("CarriageSample", ["timestamp", "needle"])
+
+
+class _ControllerOutput(object):
+
+    """A file that reads the data from the controller in a recording."""
+
+    def __init__(self, chunks):
+        """Create a file of the chunks from the controller."""
+        self._chunks = iter([chunk for chunk in chunks
+                             if chunk.direction == FROM_CONTROLLER])
+        self._data = b""
+        self._offset = 0
+        self.timestamp = None
+
+    def read(self, size=1):
+        """Read from the current chunk and remember its timestamp."""
+        while self._offset >= len(self._data):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._data = chunk.data
+            self._offset = 0
+            self.timestamp = chunk.timestamp
+        data = self._data[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+
+def carriage_samples(chunks):
+    """Extract the positions of the carriage from a recording.
+
+    :param list chunks: the
+      :class:`Chunks <AYABInterface.communication.recording.Chunk>` of a
+      recording
+    :rtype: list
+    :return: a list of :class:`CarriageSample` with the current needle of
+      each :ref:`indstate`. The timestamp is the one of the chunk with the
+      end of the message.
+    """
+    output = _ControllerOutput(chunks)
+    frames = FrameReader(output)
+    samples = []
+    frame = frames.read_frame()
+    while frame:
+        if frame[0] == StateIndication.MESSAGE_ID:
+            message = StateIndication(BytesIO(frame[1:]), None)
+            samples.append(CarriageSample(output.timestamp,
+                                          message.current_needle))
+        frame = frames.read_frame()
+    return samples
+
+
+class KnittingTimeEstimator(object):
+
+    """Estimate the knitting time with the speed measured in recordings."""
+
+    def __init__(self, speed=CARRIAGE_SPEED, turn_time=TURN_TIME):
+        """Create a new KnittingTimeEstimator.
+
+        :param float speed: the needles the carriage moves per second until
+          a movement was recorded
+        :param float turn_time: the seconds needed to turn the carriage
+          around until a turn was recorded
+        """
+        self._default_speed = speed
+        self._default_turn_time = turn_time
+        self._moved_needles = 0
+        self._moving_seconds = 0
+        self._turns = 0
+        self._turning_seconds = 0
+
+    @property
+    def speed(self):
+        """The needles the carriage moves per second.
+
+        :rtype: float
+        :return: the average speed of all recorded movements
+        """
+        if not self._moving_seconds:
+            return self._default_speed
+        return self._moved_needles / self._moving_seconds
+
+    @property
+    def turn_time(self):
+        """The seconds needed to turn the carriage around.
+
+        :rtype: float
+        :return: the average time of all recorded turns
+        """
+        if not self._turns:
+            return self._default_turn_time
+        return self._turning_seconds / self._turns
+
+    def add_samples(self, samples):
+        """Refine the speed and the turn time with carriage positions.
+
+        :param list samples: a list of :class:`CarriageSample` in the order
+          of their timestamps
+
+        The carriage moves while the needle changes in the same direction.
+        It turns when the needle stands still between two movements in
+        opposite directions. A reversal without a sample of the standing
+        carriage has no measurable turn and is not counted.
+        """
+        direction = 0
+        stop = None
+        for sample, next_sample in zip(samples, samples[1:]):
+            needles = next_sample.needle - sample.needle
+            seconds = next_sample.timestamp - sample.timestamp
+            if not needles:
+                continue
+            new_direction = 1 if needles > 0 else -1
+            if new_direction != direction:
+                if stop is not None and direction and \
+                        0 < sample.timestamp - stop <= MAXIMUM_TURN_TIME:
+                    self._turns += 1
+                    self._turning_seconds += sample.timestamp - stop
+                direction = new_direction
+            if seconds <= MAXIMUM_SAMPLE_INTERVAL:
+                self._moved_needles += abs(needles)
+                self._moving_seconds += seconds
+            stop = next_sample.timestamp
+
+    def add_recording(self, chunks):
+        """Refine the speed and the turn time with a recording.
+
+        :param list chunks: the
+          :class:`Chunks <AYABInterface.communication.recording.Chunk>` of
+          a recording, see
+          :func:`~AYABInterface.communication.recording.read_log`
+        """
+        self.add_samples(carriage_samples(chunks))
+
+    def estimate(self, movements):
+        """Estimate the seconds needed for movements of the carriage.
+
+        :param list movements: a list of
+          :class:`Movements <AYABInterface.travel.Movement>`
+        :rtype: float
+        """
+        return estimate_knitting_time(movements, self.speed, self.turn_time)
+
+    def estimate_pattern(self, knitting_pattern, machine):
+        """Estimate the seconds needed to knit a pattern.
+
+        :param knitting_pattern: a
+          :class:`~knittingpattern.KnittingPattern.KnittingPattern`
+        :param AYABInterface.machines.Machine machine: the machine to knit on
+        :rtype: float
+        """
+        interaction = Interaction(knitting_pattern, machine)
+        return self.estimate(interaction.carriage_movements)
+
+__all__ = ["KnittingTimeEstimator", "carriage_samples", "CarriageSample",
+           "MAXIMUM_SAMPLE_INTERVAL", "MAXIMUM_TURN_TIME"]
@@ -0,0 +1,298 @@
+"""Watch for AYAB shields being plugged in and out.
+
+A :class:`PortWatcher` notifies its observers when a serial port with an
+AYAB shield appears or disappears:
+
+.. code:: python
+
+    watcher = PortWatcher()
+    watcher.on_added(lambda port: print("plugged in:", port.name))
+    watcher.on_removed(lambda port: print("unplugged:", port.name))
+    watcher.start()
+
+On Linux, the watcher waits for changes of the device directory with
+inotify and scans the ports only when a device node is created or removed.
+Ports that could not be opened, e.g. because they were in use, are probed
+again every :data:`RETRY_INTERVAL` seconds until they answer. On other
+platforms or if inotify is not available, the ports are scanned every
+:data:`POLL_INTERVAL` seconds.
+"""
+from .discovery import probe_ports, ProbeCache, HANDSHAKE_TIMEOUT, \
+    PROBE_CACHE
+from .serial import DEFAULT_CONFIGURATION, list_port_information
+from threading import Event, Lock, Thread
+from select import select
+import os
+
+#: the seconds between two scans without inotify
+POLL_INTERVAL = 2
+
+#: the seconds between two attempts to probe the ports which could not be
+#: opened if inotify is available
+RETRY_INTERVAL = 30
+
+#: the seconds to wait after a change in the device directory before the
+#: scan, so that udev can finish creating the device
+SETTLE_TIME = 0.2
+
+#: the directory of the device nodes
+DEVICE_DIRECTORY = "/dev"
+
+# from sys/inotify.h
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | \
+    _IN_DELETE
+
+
+def watch_directory(directory):
+    """Create an inotify file descriptor for the changes in a directory.
+
+    :param str directory: the directory to watch
+    :return: a non-blocking file descriptor which becomes readable when a
+      file in the :paramref:`directory` is created, removed or changed or
+      :obj:`None` if inotify is not available
+    """
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (ImportError, OSError, AttributeError, TypeError):
+        return None
+    file_descriptor = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if file_descriptor < 0:
+        return None
+    if inotify_add_watch(file_descriptor, os.fsencode(directory),
+                         _IN_MASK) < 0:
+        os.close(file_descriptor)
+        return None
+    return file_descriptor
+
+
+class PortWatcher(object):
+
+    """Notify observers about AYAB shields that are plugged in and out."""
+
+    def __init__(self, interval=POLL_INTERVAL, timeout=HANDSHAKE_TIMEOUT,
+                 cache=PROBE_CACHE, usb_only=True,
+                 configuration=DEFAULT_CONFIGURATION,
+                 directory=DEVICE_DIRECTORY, retry_interval=RETRY_INTERVAL):
+        """Create a new PortWatcher.
+
+        :param float interval: the seconds between two scans if inotify is
+          not available
+        :param timeout: see :func:`~AYABInterface.discovery.list_ayab_ports`
+        :param cache: see :func:`~AYABInterface.discovery.list_ayab_ports`
+        :param usb_only: see :func:`~AYABInterface.discovery.list_ayab_ports`
+        :param configuration: see
+          :func:`~AYABInterface.discovery.list_ayab_ports`
+        :param str directory: the directory to watch with inotify
+        :param float retry_interval: the seconds between two attempts to
+          probe the ports which could not be opened if inotify is used
+        """
+        self._interval = interval
+        self._retry_interval = retry_interval
+        self._timeout = timeout
+        self._cache = cache
+        self._usb_only = usb_only
+        self._configuration = configuration
+        self._directory = directory
+        self._ports = {}
+        self._devices = set()
+        self._unopened = []
+        self._on_added = []
+        self._on_removed = []
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+        self._wake_up = None
+        self._wake_up_lock = Lock()
+
+    def on_added(self, callable):
+        """Add an observer for ports that are plugged in.
+
+        :param callable: a callable that is called with the
+          :class:`~AYABInterface.serial.SerialPort` of the new shield
+        """
+        self._on_added.append(callable)
+
+    def on_removed(self, callable):
+        """Add an observer for ports that are unplugged.
+
+        :param callable: a callable that is called with the
+          :class:`~AYABInterface.serial.SerialPort` that was passed to the
+          :meth:`on_added` observers before
+        """
+        self._on_removed.append(callable)
+
+    @property
+    def ports(self):
+        """The ports with a shield found in the last scan.
+
+        :rtype: list
+        :return: a list of :class:`~AYABInterface.serial.SerialPort`
+        """
+        with self._lock:
+            return [self._ports[device] for device in sorted(self._ports)]
+
+    def scan(self):
+        """Scan the ports and notify the observers about the changes.
+
+        This is called by the thread started with :meth:`start`. You can
+        also call it yourself, e.g. to get the first :attr:`ports`.
+        """
+        with self._lock:
+            information = list_port_information(self._usb_only)
+            devices = set(port.device for port in information)
+            if self._cache is not None:
+                for device in self._devices - devices:
+                    self._cache.remove(device)
+            self._devices = devices
+            ports = self._probe(information)
+            removed = [self._ports[device]
+                       for device in sorted(set(self._ports) - set(ports))]
+            added = [ports[device]
+                     for device in sorted(set(ports) - set(self._ports))]
+            self._ports = ports
+        self._notify(removed, added)
+
+    def retry(self):
+        """Probe the ports which could not be opened in the last scan.
+
+        Other ports are not listed or probed again. Observers are notified
+        about the ports that answer now.
+        """
+        with self._lock:
+            ports = self._probe(self._unopened)
+            added = [ports[device]
+                     for device in sorted(set(ports) - set(self._ports))]
+            self._ports.update(ports)
+        self._notify([], added)
+
+    @property
+    def unopened_devices(self):
+        """The devices which could not be opened in the last scan.
+
+        :rtype: list
+        :return: the device paths which are probed by :meth:`retry`
+        """
+        with self._lock:
+            return [port.device for port in self._unopened]
+
+    def _probe(self, information):
+        """Probe the ports and remember the ones that could not be opened.
+
+        :rtype: dict
+        :return: a mapping of the device paths to the ports with a shield
+        """
+        cache = ProbeCache() if self._cache is None else self._cache
+        ports = {port.name: port for port in probe_ports(
+            information, self._timeout, cache, self._configuration)}
+        self._unopened = [port for port in information if port not in cache]
+        return ports
+
+    def _notify(self, removed, added):
+        """Notify the observers about removed and added ports."""
+        for port in removed:
+            for callable in self._on_removed:
+                callable(port)
+        for port in added:
+            for callable in self._on_added:
+                callable(port)
+
+    def uses_inotify(self):
+        """Whether the thread waits for changes with inotify.
+
+        :rtype: bool
+        :return: whether the watcher is :meth:`running <is_running>` and
+          inotify is used
+        """
+        return self._wake_up is not None
+
+    def start(self):
+        """Scan the ports in a separate thread.
+
+        The observers are called from this thread.
+
+        .. seealso:: :meth:`stop`
+        """
+        if self.is_running():
+            return
+        self._stopped.clear()
+        inotify = watch_directory(self._directory)
+        if inotify is None:
+            self._thread = Thread(target=self._poll)
+        else:
+            read, write = os.pipe()
+            self._wake_up = (read, write, inotify)
+            self._thread = Thread(target=self._watch, args=self._wake_up)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def is_running(self):
+        """Whether the thread was started and not stopped.
+
+        :rtype: bool
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        """Stop the thread.
+
+        :param float timeout: the seconds to wait for the thread to end
+        """
+        self._stopped.set()
+        with self._wake_up_lock:
+            if self._wake_up is not None:
+                os.write(self._wake_up[1], b"x")
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _poll(self):
+        """Scan the ports every interval until the watcher is stopped.
+
+        This does not use :func:`~select.select`, which only accepts
+        sockets on Windows.
+        """
+        self.scan()
+        while not self._stopped.wait(self._interval):
+            self.scan()
+
+    def _watch(self, wake_up, wake_up_writer, inotify):
+        """Scan the ports on changes until the watcher is stopped."""
+        file_descriptors = [wake_up, inotify]
+        try:
+            self.scan()
+            while not self._stopped.is_set():
+                timeout = self._retry_interval if self._unopened else None
+                readable = select(file_descriptors, [], [], timeout)[0]
+                if self._stopped.is_set():
+                    break
+                if inotify in readable:
+                    self._stopped.wait(SETTLE_TIME)
+                    _read_all(inotify)
+                    self.scan()
+                elif not readable:
+                    self.retry()
+        finally:
+            with self._wake_up_lock:
+                self._wake_up = None
+            for file_descriptor in file_descriptors + [wake_up_writer]:
+                os.close(file_descriptor)
+
+
+def _read_all(file_descriptor):
+    """Read everything from a non-blocking file descriptor."""
+    try:
+        while os.read(file_descriptor, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+__all__ = ["PortWatcher", "watch_directory", "POLL_INTERVAL", "RETRY_INTERVAL",
+           "SETTLE_TIME", "DEVICE_DIRECTORY"]
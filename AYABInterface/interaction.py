@@ -6,6 +6,8 @@ from .actions import SwitchOnMachine, \
     SwitchOffMachine
 from AYABInterface.carriages import KnitCarriage
 from AYABInterface.communication import Communication
+from AYABInterface.travel import carriage_movements, estimate_knitting_time, \
+    CARRIAGE_SPEED, TURN_TIME
 from itertools import chain
 
 
@@ -68,6 +70,45 @@ class Interaction(object):
                     number_of_needles / 2)
         return list(range(start, start + number_of_needles))
 
+    def get_row_needle_range(self, row_index):
+        """The needles of a row.
+
+        :param int row_index: the index of the row in knit order
+        :rtype: tuple
+        :return: a tuple ``(left_needle, right_needle)`` with the first and
+          the last needle of the row or :obj:`None` if the row has no
+          needles. This is narrower than the :attr:`left_end_needle` and
+          the :attr:`right_end_needle` if the row is narrower than the
+          pattern.
+        """
+        needles = self._get_row_needles(row_index)
+        if not needles:
+            return None
+        return needles[0], needles[-1]
+
+    @cached_property
+    def carriage_movements(self):
+        """The movements of the carriage over the needles of each row.
+
+        :return: a list of :class:`AYABInterface.travel.Movement`
+
+        .. seealso:: :func:`AYABInterface.travel.carriage_movements`
+        """
+        return carriage_movements(map(self.get_row_needle_range,
+                                      range(len(self._rows))))
+
+    def estimate_knitting_time(self, speed=CARRIAGE_SPEED,
+                               turn_time=TURN_TIME):
+        """Estimate the seconds needed to knit the pattern.
+
+        :rtype: float
+
+        The arguments are described in
+        :func:`AYABInterface.travel.estimate_knitting_time`.
+        """
+        return estimate_knitting_time(self.carriage_movements, speed,
+                                      turn_time)
+
     def _get_needle_positions(self, row_index):
         if row_index not in range(len(self._rows)):
             return None
@@ -1,8 +1,11 @@
 """This module provides the interface to the AYAB shield."""
+from collections.abc import Sequence
 
 _NEEDLE_POSITION_ERROR_MESSAGE = \
     "Needle position in row {} at index {} is {} but one of {} was expected."
 _ROW_LENGTH_ERROR_MESSAGE = "The length of row {} is {} but {} is expected."
+_MOTIF_WIDTH_ERROR_MESSAGE = "{} repeats of a motif with width {} at needle " \
+    "{} do not fit on {} needles."
 
 
 class NeedlePositions(object):
@@ -100,4 +103,155 @@ class NeedlePositions(object):
         """
         self._on_row_completed.append(callable)
 
-__all__ = ["NeedlePositions"]
+
+class _RepeatedRows(Sequence):
+
+    """The rows of a repeated motif, computed when they are accessed."""
+
+    def __init__(self, motif, number_of_rows, vertical_offset, left, right):
+        """Create the rows.
+
+        :param list motif: the rows of the motif, repeated horizontally
+        :param list left: the needle positions left of the repeats
+        :param list right: the needle positions right of the repeats
+        """
+        self._motif = motif
+        self._number_of_rows = number_of_rows
+        self._vertical_offset = vertical_offset
+        self._left = left
+        self._right = right
+        self._rows = [None] * len(motif)
+
+    def __len__(self):
+        return self._number_of_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if not isinstance(index, int):
+            raise TypeError("row indices must be integers or slices, "
+                            "not {}".format(type(index).__name__))
+        if index < 0:
+            index += self._number_of_rows
+        if not 0 <= index < self._number_of_rows:
+            raise IndexError(index)
+        motif_index = (index + self._vertical_offset) % len(self._motif)
+        row = self._rows[motif_index]
+        if row is None:
+            row = self._rows[motif_index] = \
+                self._left + self._motif[motif_index] + self._right
+        return row
+
+
+class RepeatedNeedlePositions(NeedlePositions):
+
+    """Needle positions of a motif which is repeated.
+
+    Only the rows of the motif are stored. A row of the repetition is
+    computed when it is accessed with :meth:`get_row`. Rows with the same
+    motif row are the same list.
+
+    .. code:: python
+
+        motif = [["B", "D"], ["D", "B"]]
+        # 100 checkered rows over the whole KH910
+        needle_positions = RepeatedNeedlePositions(motif, KH910(),
+                                                   vertical_repeats=50)
+    """
+
+    def __init__(self, motif, machine, horizontal_repeats=None,
+                 vertical_repeats=1, horizontal_offset=None,
+                 vertical_offset=0):
+        """Create needle positions by repeating a motif.
+
+        :param list motif: a list of rows of :attr:`needle positions
+            <AYABInterface.machines.Machine.needle_positions>` which all have
+            the same length
+        :param AYABInterface.machines.Machine: the machine type to use
+        :param int horizontal_repeats: how often the motif is repeated next
+          to itself. If it is :obj:`None`, the motif is repeated as often as
+          it fits on the machine.
+        :param int vertical_repeats: how often the motif is repeated above
+          itself
+        :param int horizontal_offset: the needle index of the first repeat.
+          If it is :obj:`None`, the repeats are centered on the machine.
+          The needles outside of the repeats are in the first of the
+          :attr:`~AYABInterface.machines.Machine.needle_positions`.
+        :param int vertical_offset: the index of the motif row of the first
+          row
+        :raises ValueError: if the arguments are not valid, see :meth:`check`
+        """
+        number_of_needles = machine.number_of_needles
+        width = len(motif[0]) if motif else 0
+        if horizontal_repeats is None:
+            available = number_of_needles - (horizontal_offset or 0)
+            horizontal_repeats = available // width if width else 0
+        if horizontal_offset is None:
+            horizontal_offset = \
+                (number_of_needles - width * horizontal_repeats) // 2
+        self._motif = motif
+        self._horizontal_repeats = horizontal_repeats
+        self._vertical_repeats = vertical_repeats
+        self._horizontal_offset = horizontal_offset
+        self._vertical_offset = vertical_offset
+        right_needles = number_of_needles - horizontal_offset - \
+            width * horizontal_repeats
+        first_position = machine.needle_positions[0]
+        rows = _RepeatedRows(
+            [list(row) * horizontal_repeats for row in motif],
+            len(motif) * vertical_repeats, vertical_offset,
+            [first_position] * horizontal_offset,
+            [first_position] * right_needles)
+        super().__init__(rows, machine)
+
+    def check(self):
+        """Check for validity.
+
+        :raises ValueError:
+
+          - if not all rows of the motif have the same length
+          - if the repeats do not fit on the machine
+          - if the contents of the motif are not :attr:`needle positions
+            <AYABInterface.machines.Machine.needle_positions>`
+
+        Only the motif is checked and not every row of the repetition.
+        """
+        motif = self._motif
+        width = len(motif[0]) if motif else 0
+        for row_index, row in enumerate(motif):
+            if len(row) != width:
+                raise ValueError(_ROW_LENGTH_ERROR_MESSAGE.format(
+                    row_index, len(row), width))
+        number_of_needles = self._machine.number_of_needles
+        if self._horizontal_offset < 0 or self._horizontal_repeats < 0 or \
+                self._horizontal_offset + width * self._horizontal_repeats > \
+                number_of_needles:
+            raise ValueError(_MOTIF_WIDTH_ERROR_MESSAGE.format(
+                self._horizontal_repeats, width, self._horizontal_offset,
+                number_of_needles))
+        expected_positions = self._machine.needle_positions
+        for row_index, row in enumerate(motif):
+            for needle_index, needle_position in enumerate(row):
+                if needle_position not in expected_positions:
+                    message = _NEEDLE_POSITION_ERROR_MESSAGE.format(
+                        row_index, needle_index, repr(needle_position),
+                        ", ".join(map(repr, expected_positions)))
+                    raise ValueError(message)
+
+    @property
+    def motif(self):
+        """The motif that is repeated.
+
+        :rtype: list
+        """
+        return self._motif
+
+    @property
+    def number_of_rows(self):
+        """The number of rows of all the vertical repeats.
+
+        :rtype: int
+        """
+        return len(self._rows)
+
+__all__ = ["NeedlePositions", "RepeatedNeedlePositions"]
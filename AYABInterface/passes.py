@@ -0,0 +1,168 @@
+"""Plan the passes of the carriage for rows with many colors.
+
+A row with one or two colors is knit in one pass of the carriage. A row
+with more colors is knit in one pass per color, see
+:func:`~AYABInterface.convert.colors_to_needle_positions`. The order of
+these passes is free. :func:`plan_passes` chooses it so that the yarn has
+to be changed as rarely as possible: a row starts with the color of the
+last pass of the row before it if possible.
+
+.. code:: python
+
+    needles = colors_to_needle_positions(rows)
+    passes = plan_passes(needles)
+    for action in passes_to_actions(passes):
+        print(action)
+
+Every pass moves the carriage once over the needles. The number of passes
+is the same for every order, so the order only changes the color changes.
+"""
+from .actions import MoveCarriageToTheLeft, MoveCarriageToTheRight, \
+    PutColorInNutA, PutColorInNutB
+from .carriages import KnitCarriage
+from collections import namedtuple
+
+#: A pass of the carriage over a :attr:`row`.
+#: The :attr:`needle_positions` are one of the
+#: :class:`~AYABInterface.convert.NeedlePositions` of the row and the
+#: :attr:`colors` are the colors in nut A and, for two colors, in nut B.
+Pass = namedtuple("Pass", ["row", "needle_positions", "colors"])
+
+
+def _color_changes(colors, previous, last):
+    """The color changes in nut A to knit a row.
+
+    :param tuple colors: the colors of the passes of the row
+    :param previous: the color in nut A before the row
+    :param last: the color of the last pass of the row
+    """
+    if len(colors) == 1:
+        return int(previous != last)
+    if previous in colors and previous != last:
+        return len(colors) - 1
+    return len(colors)
+
+
+def _order(colors, previous, last):
+    """The order of the colors of the passes of a row."""
+    middle = [color for color in colors if color not in (previous, last)]
+    if previous in colors and previous != last:
+        return [previous] + middle + [last]
+    return middle + [last]
+
+
+def _last_colors(row):
+    """The colors that can be in nut A after the row."""
+    if len(row) == 1:
+        return [row[0].colors[0]]
+    return [needle_positions.colors[0] for needle_positions in row]
+
+
+def plan_passes(rows, color=None):
+    """Plan the passes to knit the rows with the least color changes.
+
+    :param list rows: a list with a list of
+      :class:`~AYABInterface.convert.NeedlePositions` for each row, as
+      returned by :func:`~AYABInterface.convert.colors_to_needle_positions`
+    :param color: the color in nut A before the first row
+    :rtype: list
+    :return: a list of :class:`Passes <Pass>` in the order to knit them
+
+    The order of the passes of each row is found by dynamic programming
+    over the color in nut A after each row.
+    """
+    # costs maps the color after a row to the changes and the color before
+    costs = {color: (0, None)}
+    history = []
+    for row in rows:
+        if not row:
+            history.append(None)
+            continue
+        colors = [needle_positions.colors[0] for needle_positions in row]
+        new_costs = {}
+        for last in _last_colors(row):
+            new_costs[last] = min(
+                ((changes + _color_changes(colors, previous, last), previous)
+                 for previous, (changes, _) in costs.items()),
+                key=lambda cost: cost[0])
+        history.append(new_costs)
+        costs = new_costs
+    # on a tie, the colors keep the order of the row
+    last = min(reversed(list(costs)), key=lambda last: costs[last][0])
+    lasts = []
+    for row_costs in reversed(history):
+        lasts.append(last)
+        if row_costs is not None:
+            last = row_costs[last][1]
+    lasts.reverse()
+    passes = []
+    previous = color
+    for index, (row, last) in enumerate(zip(rows, lasts)):
+        if not row:
+            continue
+        if len(row) == 1:
+            passes.append(Pass(index, row[0], row[0].colors))
+        else:
+            by_color = {needle_positions.colors[0]: needle_positions
+                        for needle_positions in row}
+            for pass_color in _order(list(by_color), previous, last):
+                passes.append(Pass(index, by_color[pass_color],
+                                   (pass_color,)))
+        previous = last
+    return passes
+
+
+def _nut_changes(passes):
+    """Yield the nut, the old and the new color of each color change.
+
+    After the changes of a pass, ``(None, None, None)`` is yielded.
+    """
+    nuts = [None, None]
+    for pass_ in passes:
+        for nut, color in enumerate(pass_.colors):
+            if nuts[nut] != color:
+                yield nut, nuts[nut], color
+                nuts[nut] = color
+        yield None, None, None
+
+
+def count_color_changes(passes):
+    """Count how often a color has to be exchanged in a nut.
+
+    :param list passes: a list of :class:`Passes <Pass>`
+    :rtype: int
+    :return: how often a color is put into a nut that held another color
+      before
+    """
+    return sum(1 for nut, old, new in _nut_changes(passes)
+               if nut is not None and old is not None)
+
+
+def passes_to_actions(passes, carriage=None):
+    """The actions to knit the passes.
+
+    :param list passes: a list of :class:`Passes <Pass>`
+    :param AYABInterface.carriages.Carriage carriage: the carriage to move,
+      a :class:`~AYABInterface.carriages.KnitCarriage` by default
+    :rtype: list
+    :return: a list of :class:`~AYABInterface.actions.Action`. Before each
+      pass, the colors are put into the nuts if they changed. The carriage
+      moves to the right first, like in
+      :attr:`AYABInterface.interaction.Interaction.actions`.
+    """
+    if carriage is None:
+        carriage = KnitCarriage()
+    movements = (MoveCarriageToTheRight(carriage),
+                 MoveCarriageToTheLeft(carriage))
+    put_color = (PutColorInNutA, PutColorInNutB)
+    actions = []
+    index = 0
+    for nut, old, new in _nut_changes(passes):
+        if nut is None:
+            actions.append(movements[index & 1])
+            index += 1
+        else:
+            actions.append(put_color[nut](new))
+    return actions
+
+__all__ = ["plan_passes", "passes_to_actions", "count_color_changes", "Pass"]
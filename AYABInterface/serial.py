@@ -5,44 +5,352 @@ Execute this module to print all serial ports currently available.
 
 import sys
 import glob
+import array
+from collections import namedtuple
+from threading import Lock, Thread
+from time import monotonic
 try:
-    import serial
     from serial import Serial
 except:
     print("Install the serial module width '{} -m pip install PySerial'."
           "".format(sys.executable))
 
 
-def list_serial_port_strings():
-    """Lists serial port names.
+#: the baud rate of the :ref:`serial-communication-specification`
+BAUD_RATE = 115200
+
+#: the seconds to wait for ports to open in :func:`list_serial_port_strings`
+PROBE_TIMEOUT = 0.5
+
+#: USB vendor ids of Arduino boards and common USB serial converters
+USB_VENDOR_IDS = {
+    0x2341: "Arduino",
+    0x2a03: "Arduino",
+    0x0403: "FTDI",
+    0x1a86: "QinHeng CH340",
+    0x10c4: "Silicon Labs CP210x",
+}
+
+_ASYNC_LOW_LATENCY = 0x2000  # from linux/tty_flags.h
+_SERIAL_STRUCT_FLAGS = 4  # the index of the flags in struct serial_struct
+
+
+def set_low_latency(connection):
+    """Ask the driver of a serial connection for a low latency.
+
+    :param serial.Serial connection: an open serial connection
+    :rtype: bool
+    :return: whether the low latency mode could be set
+
+    On Linux, this sets the ``ASYNC_LOW_LATENCY`` flag of the port. USB
+    adapters like FTDI chips then use a latency timer of 1 ms instead of
+    16 ms. On other platforms, nothing happens.
+    """
+    set_low_latency_mode = getattr(connection, "set_low_latency_mode", None)
+    if set_low_latency_mode is not None:
+        try:
+            set_low_latency_mode(True)
+        except (ValueError, OSError):
+            return False
+        return True
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import fcntl
+        import termios
+        serial_struct = array.array('i', [0] * 32)
+        fcntl.ioctl(connection.fileno(), termios.TIOCGSERIAL, serial_struct)
+        serial_struct[_SERIAL_STRUCT_FLAGS] |= _ASYNC_LOW_LATENCY
+        fcntl.ioctl(connection.fileno(), termios.TIOCSSERIAL, serial_struct)
+    except (ImportError, AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+class SerialConfiguration(object):
+
+    """The settings for opening a serial port."""
+
+    def __init__(self, baud_rate=BAUD_RATE, timeout=None,
+                 inter_byte_timeout=None, write_timeout=None, exclusive=None,
+                 receive_buffer_size=None, transmit_buffer_size=None,
+                 low_latency=False):
+        """Create a new SerialConfiguration.
+
+        The default values open the port as specified in
+        :ref:`serial-communication-specification` with blocking reads.
+        Settings which are :obj:`None` are left to :mod:`serial`.
+
+        :param int baud_rate: the baud rate. Use a higher value only if the
+          firmware was built for it.
+        :param float timeout: the seconds to wait in a read. If no message
+          arrives in time,
+          :meth:`~AYABInterface.communication.Communication.receive_message`
+          returns without a message. The bytes of a partially received
+          message are kept until the rest arrives.
+        :param float inter_byte_timeout: the maximum seconds between two
+          bytes of a read
+        :param float write_timeout: the seconds to wait in a write
+        :param bool exclusive: whether the port is locked while it is open.
+          On POSIX, the lock is advisory: opening the port fails only if it
+          was also opened exclusively. On Windows, ports are always opened
+          exclusively.
+        :param int receive_buffer_size: the size of the receive buffer of
+          the operating system (Windows only)
+        :param int transmit_buffer_size: the size of the transmit buffer of
+          the operating system (Windows only)
+        :param bool low_latency: whether to :func:`set_low_latency`
+        """
+        self._baud_rate = baud_rate
+        self._timeout = timeout
+        self._inter_byte_timeout = inter_byte_timeout
+        self._write_timeout = write_timeout
+        self._exclusive = exclusive
+        self._receive_buffer_size = receive_buffer_size
+        self._transmit_buffer_size = transmit_buffer_size
+        self._low_latency = low_latency
+
+    @property
+    def baud_rate(self):
+        """The baud rate.
+
+        :rtype: int
+        """
+        return self._baud_rate
+
+    @property
+    def timeout(self):
+        """The read timeout in seconds or :obj:`None` to block.
+
+        :rtype: float
+        """
+        return self._timeout
+
+    @property
+    def inter_byte_timeout(self):
+        """The maximum seconds between two bytes or :obj:`None`.
+
+        :rtype: float
+        """
+        return self._inter_byte_timeout
+
+    @property
+    def write_timeout(self):
+        """The write timeout in seconds or :obj:`None` to block.
+
+        :rtype: float
+        """
+        return self._write_timeout
+
+    @property
+    def exclusive(self):
+        """Whether the port is opened exclusively or :obj:`None`.
+
+        :rtype: bool
+        """
+        return self._exclusive
+
+    @property
+    def receive_buffer_size(self):
+        """The size of the receive buffer or :obj:`None`.
+
+        :rtype: int
+        """
+        return self._receive_buffer_size
+
+    @property
+    def transmit_buffer_size(self):
+        """The size of the transmit buffer or :obj:`None`.
+
+        :rtype: int
+        """
+        return self._transmit_buffer_size
+
+    def is_low_latency(self):
+        """Whether the low latency mode is requested.
+
+        :rtype: bool
+        """
+        return self._low_latency
+
+    def open(self, port):
+        """Open a serial port with these settings.
+
+        :param str port: the port to open
+        :rtype: serial.Serial
+        """
+        arguments = {}
+        for name, value in [("timeout", self._timeout),
+                            ("inter_byte_timeout", self._inter_byte_timeout),
+                            ("write_timeout", self._write_timeout),
+                            ("exclusive", self._exclusive)]:
+            if value is not None:
+                arguments[name] = value
+        connection = Serial(port, self._baud_rate, **arguments)
+        if self._receive_buffer_size is not None or \
+                self._transmit_buffer_size is not None:
+            set_buffer_size = getattr(connection, "set_buffer_size", None)
+            if set_buffer_size is not None:
+                set_buffer_size(rx_size=self._receive_buffer_size or 4096,
+                                tx_size=self._transmit_buffer_size)
+        if self._low_latency:
+            set_low_latency(connection)
+        return connection
+
+    def __repr__(self):
+        """Return this object as string.
+
+        :rtype: str
+        """
+        return "<{} {} baud>".format(self.__class__.__name__,
+                                     self._baud_rate)
+
+
+#: The default configuration as in the specification. The port is opened
+#: exclusively, so that :func:`~AYABInterface.discovery.probe_controller`
+#: can not open it while knitting.
+DEFAULT_CONFIGURATION = SerialConfiguration(exclusive=True)
+
+#: A configuration that minimizes the receive latency.
+LOW_LATENCY_CONFIGURATION = SerialConfiguration(exclusive=True,
+                                                low_latency=True)
 
-    :raises EnvironmentError:
-        On unsupported or unknown platforms
-    :returns:
-        A list of the serial ports available on the system
+
+def _glob_port_strings():
+    """All device names that could be serial ports on this platform.
+
+    :raises EnvironmentError: On unsupported or unknown platforms
 
     .. seealso:: `The Stack Overflow answer
       <http://stackoverflow.com/a/14224477/1320237>`__
     """
     if sys.platform.startswith('win'):
-        ports = ['COM%s' % (i + 1) for i in range(256)]
+        return ['COM%s' % (i + 1) for i in range(256)]
     elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
         # this excludes your current terminal "/dev/tty"
-        ports = glob.glob('/dev/tty[A-Za-z]*')
+        return glob.glob('/dev/tty[A-Za-z]*')
     elif sys.platform.startswith('darwin'):
-        ports = glob.glob('/dev/tty.*')
-    else:
-        raise EnvironmentError('Unsupported platform')
+        return glob.glob('/dev/tty.*')
+    raise EnvironmentError('Unsupported platform')
 
-    result = []
-    for port in ports:
+
+#: The attributes of a port from :func:`list_port_information`
+PortInformation = namedtuple("PortInformation", ["device", "vid", "pid",
+                                                 "serial_number"])
+
+
+def list_port_information(usb_only=False):
+    """List the devices that could be serial ports without opening them.
+
+    :param bool usb_only: whether to list only USB devices with a vendor id
+      in :data:`USB_VENDOR_IDS`
+    :rtype: list
+    :return: a list of :class:`PortInformation`. Ports of known USB vendors
+      come first.
+
+    The ports are listed with :func:`serial.tools.list_ports.comports`
+    which reads the attributes of the devices, e.g. from sysfs on Linux.
+    If it is not available, all the device names of the platform are
+    listed without attributes.
+    """
+    try:
+        from serial.tools.list_ports import comports
+    except ImportError:
+        if usb_only:
+            return []
+        return [PortInformation(device, None, None, None)
+                for device in sorted(_glob_port_strings())]
+    known = []
+    unknown = []
+    for port in comports():
+        vid = getattr(port, "vid", None)
+        information = PortInformation(port.device, vid,
+                                      getattr(port, "pid", None),
+                                      getattr(port, "serial_number", None))
+        if vid in USB_VENDOR_IDS:
+            known.append(information)
+        elif not usb_only:
+            unknown.append(information)
+    return sorted(known) + sorted(unknown)
+
+
+def list_port_candidates(usb_only=False):
+    """List the names of the devices that could be serial ports.
+
+    :param bool usb_only: whether to list only USB devices with a vendor id
+      in :data:`USB_VENDOR_IDS`
+    :rtype: list
+    :return: the names of the ports. Ports of known USB vendors come first.
+
+    .. seealso:: :func:`list_port_information`
+    """
+    return [port.device for port in list_port_information(usb_only)]
+
+
+def probe_concurrently(ports, probe, timeout=PROBE_TIMEOUT):
+    """Call a probe for several ports at the same time.
+
+    :param list ports: the ports to probe
+    :param probe: a callable that takes a port. If it raises an exception,
+      the port is left out of the result.
+    :param float timeout: the seconds to wait for all probes. Probes which
+      take longer are left out of the result and continue in the background.
+    :rtype: dict
+    :return: a mapping of the ports to the results of their probe
+    """
+    results = {}
+    lock = Lock()
+
+    def run(port):
         try:
-            s = serial.Serial(port)
-            s.close()
-            result.append(port)
-        except (OSError, serial.SerialException):
-            pass
-    return result
+            result = probe(port)
+        except Exception:
+            return
+        with lock:
+            results[port] = result
+
+    threads = []
+    for port in ports:
+        thread = Thread(target=run, args=(port,))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    deadline = monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - monotonic()))
+    with lock:
+        return dict(results)
+
+
+def _can_open(port):
+    """Open and close the port.
+
+    :return: :obj:`True`
+    :raises serial.SerialException: if the port can not be opened
+    """
+    Serial(port).close()
+    return True
+
+
+def list_serial_port_strings(timeout=PROBE_TIMEOUT, usb_only=False):
+    """Lists serial port names.
+
+    :param float timeout: the seconds to wait for the ports to open
+    :param bool usb_only: whether to only list USB devices of
+      :data:`USB_VENDOR_IDS`
+    :raises EnvironmentError:
+        On unsupported or unknown platforms
+    :returns:
+        A list of the serial ports available on the system
+
+    The :func:`candidates <list_port_candidates>` are opened
+    :func:`concurrently <probe_concurrently>`.
+    Ports that can not be opened within the :paramref:`timeout` are not
+    listed.
+    """
+    ports = list_port_candidates(usb_only)
+    opened = probe_concurrently(ports, _can_open, timeout)
+    return [port for port in ports if port in opened]
 
 
 def list_serial_ports():
@@ -58,15 +366,21 @@ class SerialPort(object):
 
     """A class abstracting the port behavior."""
 
-    def __init__(self, port):
+    def __init__(self, port, configuration=DEFAULT_CONFIGURATION,
+                 controller=None):
         """Create a new serial port instance.
 
         :param str port: the port to connect to
+        :param SerialConfiguration configuration: the settings to
+          :meth:`connect` with
+        :param controller: the :attr:`controller` attached to the port
 
         .. note:: The baud rate is specified in
           :ref:`serial-communication-specification`
         """
         self._port = port
+        self._configuration = configuration
+        self._controller = controller
 
     @property
     def name(self):
@@ -76,12 +390,38 @@ class SerialPort(object):
         """
         return self._port
 
+    @property
+    def configuration(self):
+        """The settings used to connect.
+
+        :rtype: SerialConfiguration
+        """
+        return self._configuration
+
+    @property
+    def controller(self):
+        """Information about the controller attached to this port.
+
+        :rtype: AYABInterface.discovery.ControllerInformation
+        :return: the versions the controller answered to a :ref:`reqinfo`
+          with or :obj:`None` if the port was not probed
+
+        .. seealso:: :func:`AYABInterface.discovery.list_ayab_ports`
+        """
+        return self._controller
+
     def connect(self):
         """Return a connection to this port.
 
         :rtype: serial.Serial
+
+        .. code:: python
+
+            port = SerialPort("/dev/ttyUSB0", LOW_LATENCY_CONFIGURATION)
+            connection = port.connect()
+
         """
-        return Serial(self._port, 115200)
+        return self._configuration.open(self._port)
 
     def __repr__(self):
         """Return this object as string.
@@ -91,7 +431,12 @@ class SerialPort(object):
         return "<{} \"{}\">".format(self.__class__.__name__,
                                     repr(self._port)[1:-1])
 
-__all__ = ["list_serial_port_strings", "list_serial_ports", "SerialPort"]
+__all__ = ["list_serial_port_strings", "list_serial_ports", "SerialPort",
+           "list_port_candidates", "probe_concurrently", "PROBE_TIMEOUT",
+           "list_port_information", "PortInformation",
+           "USB_VENDOR_IDS",
+           "SerialConfiguration", "set_low_latency", "BAUD_RATE",
+           "DEFAULT_CONFIGURATION", "LOW_LATENCY_CONFIGURATION"]
 
 if __name__ == '__main__':
     print(list_serial_port_strings())
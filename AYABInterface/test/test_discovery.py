@@ -0,0 +1,185 @@
+"""Test finding the ports with an AYAB shield.
+
+.. seealso:: :mod:`AYABInterface.discovery`
+"""
+from AYABInterface.discovery import list_ayab_ports, probe_controller, \
+    ProbeCache, ControllerInformation, REQUEST_INTERVAL, PROBE_CONFIGURATION
+from AYABInterface.serial import PortInformation, SerialConfiguration, \
+    LOW_LATENCY_CONFIGURATION
+from AYABInterface.communication.simulator import Simulator
+import AYABInterface.discovery as discovery
+import AYABInterface
+from unittest.mock import Mock
+from io import BytesIO
+from pytest import fixture
+import pytest
+import sys
+
+CONTROLLER = b'\xc3\x04\x01\x02\r\n'
+
+
+class Connection(object):
+
+    """A connection to a controller which answers immediately."""
+
+    def __init__(self, answer):
+        self.read = BytesIO(answer).read
+        self.output = BytesIO()
+        self.write = self.output.write
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def configuration(connection):
+    configuration = Mock()
+    configuration.open.return_value = connection
+    return configuration
+
+
+class TestProbeController(object):
+
+    @pytest.mark.parametrize("answer", [
+        CONTROLLER, b'\x00\x84' + CONTROLLER,
+        b'#booting\r\n\x84\x01\x00\x00\x00\x00\x01\x00\r\n' + CONTROLLER])
+    def test_controller_answers(self, answer):
+        connection = Connection(answer)
+        controller = probe_controller("port", 1, configuration(connection))
+        assert controller.api_version == 4
+        assert controller.firmware_version == (1, 2)
+        assert controller == ControllerInformation(4, (1, 2))
+        assert connection.output.getvalue().startswith(b'\x03\r\n')
+        assert connection.closed
+
+    def test_no_answer(self):
+        connection = Connection(b'hello world\r\n')
+        assert probe_controller("port", 0.05, configuration(connection)) is \
+            None
+        assert connection.closed
+
+    def test_default_configuration(self, monkeypatch):
+        open = Mock(return_value=Connection(CONTROLLER))
+        monkeypatch.setattr(SerialConfiguration, "open", open)
+        probe_controller("/dev/ttyACM0")
+        open.assert_called_once_with("/dev/ttyACM0")
+
+    def test_ports_are_opened_exclusively(self):
+        assert PROBE_CONFIGURATION.exclusive
+        assert PROBE_CONFIGURATION.timeout == REQUEST_INTERVAL
+
+    @pytest.mark.timeout(5)
+    @pytest.mark.parametrize("data", [b"\x00", b"#noise\r\n"])
+    def test_streaming_device_is_not_read_forever(self, data):
+        connection = Connection(b"")
+        connection.read = lambda size=1: (data * size)[:size]
+        assert probe_controller("port", 0.05, configuration(connection)) is \
+            None
+        assert connection.closed
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"),
+                        reason="needs a pseudo terminal")
+    @pytest.mark.timeout(10)
+    def test_simulator(self):
+        simulator, device = Simulator.pty(firmware_version=(3, 7))
+        simulator.start()
+        try:
+            controller = probe_controller(device)
+        finally:
+            simulator.close()
+        assert controller.api_version == 4
+        assert controller.firmware_version == (3, 7)
+
+
+PORTS = [PortInformation("/dev/ttyACM0", 0x2341, 0x43, "A1"),
+         PortInformation("/dev/ttyUSB0", 0x0403, 0x6001, None),
+         PortInformation("/dev/ttyS0", None, None, None)]
+
+
+class TestListAyabPorts(object):
+
+    @fixture
+    def controller(self):
+        return Mock()
+
+    @fixture
+    def probe(self, monkeypatch, controller):
+        def probe(device, timeout):
+            if device == "/dev/ttyS0":
+                raise OSError("busy")
+            if device == "/dev/ttyACM0":
+                return controller
+            return None
+        probe = Mock(side_effect=probe)
+        monkeypatch.setattr(discovery, "probe_controller", probe)
+        return probe
+
+    @fixture(autouse=True)
+    def ports(self, monkeypatch):
+        ports = Mock(return_value=PORTS)
+        monkeypatch.setattr(discovery, "list_port_information", ports)
+        return ports
+
+    @fixture
+    def cache(self):
+        return ProbeCache()
+
+    def test_only_controllers_are_listed(self, probe, controller, cache):
+        ports = list_ayab_ports(1, cache)
+        assert [port.name for port in ports] == ["/dev/ttyACM0"]
+        assert ports[0].controller == controller
+        assert probe.call_count == 3
+
+    def test_results_are_cached(self, probe, cache, controller):
+        list_ayab_ports(1, cache)
+        assert len(cache) == 2
+        assert cache.get(PORTS[0]) == controller
+        probe.reset_mock()
+        ports = list_ayab_ports(1, cache)
+        assert [port.controller for port in ports] == [controller]
+        probe.assert_called_once_with("/dev/ttyS0", 1)
+
+    def test_other_device_on_same_path_is_probed(self, probe, cache, ports):
+        list_ayab_ports(1, cache)
+        probe.reset_mock()
+        ports.return_value = [PortInformation("/dev/ttyACM0", 0x2341, 0x43,
+                                              "B2")]
+        list_ayab_ports(1, cache)
+        probe.assert_called_once_with("/dev/ttyACM0", 1)
+
+    def test_without_cache(self, probe):
+        list_ayab_ports(1, None)
+        list_ayab_ports(1, None)
+        assert probe.call_count == 6
+
+    def test_configuration(self, probe, cache):
+        port = list_ayab_ports(1, cache,
+                               configuration=LOW_LATENCY_CONFIGURATION)[0]
+        assert port.configuration == LOW_LATENCY_CONFIGURATION
+
+    def test_usb_only(self, probe, cache, ports):
+        list_ayab_ports(1, cache)
+        ports.assert_called_once_with(True)
+
+    def test_all_ports(self, probe, cache, ports):
+        list_ayab_ports(1, cache, usb_only=False)
+        ports.assert_called_once_with(False)
+
+    def test_get_ayab_connections(self, monkeypatch):
+        list_ayab_ports = Mock()
+        monkeypatch.setattr(discovery, "list_ayab_ports", list_ayab_ports)
+        assert AYABInterface.get_ayab_connections() == \
+            list_ayab_ports.return_value
+
+
+class TestProbeCache(object):
+
+    def test_remove(self):
+        cache = ProbeCache()
+        cache.set(PORTS[0], 1)
+        cache.set(PORTS[1], 2)
+        cache.remove("/dev/ttyACM0")
+        assert PORTS[0] not in cache
+        assert PORTS[1] in cache
+        cache.clear()
+        assert len(cache) == 0
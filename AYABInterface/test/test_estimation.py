@@ -0,0 +1,93 @@
+"""Test :mod:`AYABInterface.estimation`."""
+import pytest
+from AYABInterface.estimation import KnittingTimeEstimator, \
+    carriage_samples, CarriageSample
+from AYABInterface.communication.recording import Chunk, FROM_CONTROLLER, \
+    TO_CONTROLLER
+from AYABInterface.travel import carriage_movements, CARRIAGE_SPEED, \
+    TURN_TIME
+from AYABInterface.machines import KH910
+from knittingpattern import load_from_relative_file
+
+
+def state(needle):
+    return b"\x84\x01\x00\x00\x00\x00\x01" + bytes([needle]) + b"\r\n"
+
+
+def samples(*timestamps_and_needles):
+    return [CarriageSample(timestamp, needle)
+            for timestamp, needle in timestamps_and_needles]
+
+
+class TestCarriageSamples(object):
+
+    def test_state_indications(self):
+        chunks = [Chunk(FROM_CONTROLLER, 0.5, state(3) + b"\x81\x01"),
+                  Chunk(TO_CONTROLLER, 0.75, state(4)),
+                  Chunk(FROM_CONTROLLER, 1, b"\r\n#debug\r\n" + state(5)[:4]),
+                  Chunk(FROM_CONTROLLER, 2, state(5)[4:] + state(9))]
+        assert carriage_samples(chunks) == samples((0.5, 3), (2, 5), (2, 9))
+
+    def test_no_chunks(self):
+        assert carriage_samples([]) == []
+
+
+class TestKnittingTimeEstimator(object):
+
+    @pytest.fixture
+    def estimator(self):
+        return KnittingTimeEstimator()
+
+    def test_defaults(self, estimator):
+        assert estimator.speed == CARRIAGE_SPEED
+        assert estimator.turn_time == TURN_TIME
+        estimator = KnittingTimeEstimator(10, 2)
+        assert estimator.speed == 10
+        assert estimator.turn_time == 2
+
+    def test_speed(self, estimator):
+        estimator.add_samples(samples((0, 0), (1, 50), (1.5, 100)))
+        assert estimator.speed == 100 / 1.5
+        assert estimator.turn_time == TURN_TIME
+
+    def test_turn(self, estimator):
+        estimator.add_samples(samples(
+            (0, 0), (1, 100), (2, 100), (4, 100), (5, 0)))
+        assert estimator.speed == 200 / 2
+        assert estimator.turn_time == 3
+
+    def test_immediate_reversal_is_not_a_turn(self, estimator):
+        estimator.add_samples(samples(
+            (0, 0), (1, 100), (2, 200), (3, 100), (4, 0),
+            (7, 0), (8, 100)))
+        assert estimator.speed == 500 / 5
+        assert estimator.turn_time == 3
+
+    def test_long_pauses_are_not_used(self, estimator):
+        estimator.add_samples(samples(
+            (0, 0), (1, 100), (100, 100), (101, 150), (105, 200)))
+        assert estimator.speed == 150 / 2
+        assert estimator.turn_time == TURN_TIME
+
+    def test_several_recordings(self, estimator):
+        estimator.add_samples(samples((0, 0), (1, 100), (2, 0)))
+        estimator.add_recording([
+            Chunk(FROM_CONTROLLER, 0, state(0)),
+            Chunk(FROM_CONTROLLER, 1, state(50)),
+            Chunk(FROM_CONTROLLER, 4, state(50)),
+            Chunk(FROM_CONTROLLER, 5, state(0))])
+        assert estimator.speed == 300 / 4
+        assert estimator.turn_time == 3
+
+    def test_estimate(self, estimator):
+        estimator.add_samples(samples((0, 0), (1, 50), (3, 50), (4, 0)))
+        movements = carriage_movements([(0, 100)] * 3, offset=0)
+        assert estimator.estimate(movements) == 300 / 50 + 2 * 2
+
+    def test_estimate_pattern(self, estimator):
+        pattern = load_from_relative_file(
+            __name__, "test_patterns/block6x3.json").patterns.at(0)
+        estimator.add_samples(samples((0, 0), (1, 10), (2, 10), (3, 0)))
+        # 3 rows of 6 needles and 12 needles on each side
+        assert estimator.estimate_pattern(pattern, KH910()) == \
+            3 * (5 + 24) / 10 + 2 * 1
@@ -0,0 +1,237 @@
+"""Test watching for shields being plugged in and out.
+
+.. seealso:: :mod:`AYABInterface.hotplug`
+"""
+from AYABInterface.hotplug import PortWatcher, watch_directory
+from AYABInterface.discovery import ProbeCache
+from AYABInterface.serial import PortInformation
+import AYABInterface.discovery as discovery
+import AYABInterface.hotplug as hotplug
+from unittest.mock import Mock
+from threading import Event
+from pytest import fixture
+import pytest
+import sys
+import os
+
+ACM0 = PortInformation("/dev/ttyACM0", 0x2341, 0x43, "A1")
+ACM1 = PortInformation("/dev/ttyACM1", 0x2341, 0x43, None)
+USB0 = PortInformation("/dev/ttyUSB0", 0x0403, 0x6001, None)
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                reason="inotify is only available on Linux")
+
+
+@fixture
+def ports(monkeypatch):
+    """The ports which are plugged in."""
+    ports = [ACM0, USB0]
+    monkeypatch.setattr(hotplug, "list_port_information",
+                        lambda usb_only: list(ports))
+    return ports
+
+
+@fixture
+def busy():
+    """The devices which can not be opened."""
+    return set()
+
+
+@fixture
+def probe(monkeypatch, busy):
+    """Probe the ports. ACM ports have a controller."""
+    def probe(device, timeout):
+        if device in busy:
+            raise OSError("busy")
+        if "ACM" in device:
+            return device + " controller"
+        return None
+    probe = Mock(side_effect=probe)
+    monkeypatch.setattr(discovery, "probe_controller", probe)
+    return probe
+
+
+@fixture
+def cache():
+    return ProbeCache()
+
+
+@fixture
+def watcher(cache, ports, probe):
+    watcher = PortWatcher(cache=cache)
+    watcher.added = []
+    watcher.removed = []
+    watcher.on_added(watcher.added.append)
+    watcher.on_removed(watcher.removed.append)
+    yield watcher
+    watcher.stop(1)
+
+
+def names(ports):
+    return [port.name for port in ports]
+
+
+class TestScan(object):
+
+    def test_first_scan_adds_controllers(self, watcher):
+        watcher.scan()
+        assert names(watcher.added) == ["/dev/ttyACM0"]
+        assert watcher.added[0].controller == "/dev/ttyACM0 controller"
+        assert names(watcher.ports) == ["/dev/ttyACM0"]
+        assert watcher.removed == []
+
+    def test_unchanged_ports_are_not_notified(self, watcher, probe):
+        watcher.scan()
+        watcher.scan()
+        assert len(watcher.added) == 1
+        assert probe.call_count == 2
+
+    def test_plug_in(self, watcher, ports):
+        watcher.scan()
+        ports.append(ACM1)
+        watcher.scan()
+        assert names(watcher.added) == ["/dev/ttyACM0", "/dev/ttyACM1"]
+        assert names(watcher.ports) == ["/dev/ttyACM0", "/dev/ttyACM1"]
+
+    def test_unplug(self, watcher, ports, cache):
+        watcher.scan()
+        ports.remove(ACM0)
+        watcher.scan()
+        assert watcher.removed == watcher.added
+        assert watcher.ports == []
+        assert ACM0 not in cache
+
+    def test_swapped_device_without_serial_number_is_probed(
+            self, watcher, ports, probe):
+        ports[:] = [ACM1]
+        watcher.scan()
+        ports[:] = []
+        watcher.scan()
+        ports[:] = [ACM1]
+        probe.reset_mock()
+        watcher.scan()
+        probe.assert_called_once_with("/dev/ttyACM1", watcher._timeout)
+        assert names(watcher.added) == ["/dev/ttyACM1"] * 2
+
+    def test_busy_ports_are_unopened(self, watcher, busy):
+        busy.add(ACM0.device)
+        watcher.scan()
+        assert watcher.unopened_devices == [ACM0.device]
+        assert watcher.added == []
+
+    def test_retry_probes_only_unopened_ports(self, watcher, ports, busy,
+                                              probe):
+        ports.append(ACM1)
+        busy.add(ACM1.device)
+        watcher.scan()
+        busy.clear()
+        probe.reset_mock()
+        watcher.retry()
+        probe.assert_called_once_with(ACM1.device, watcher._timeout)
+        assert names(watcher.added) == [ACM0.device, ACM1.device]
+        assert names(watcher.ports) == [ACM0.device, ACM1.device]
+        assert watcher.unopened_devices == []
+
+    def test_unopened_ports_without_cache(self, ports, probe, busy):
+        busy.add(USB0.device)
+        watcher = PortWatcher(cache=None)
+        watcher.scan()
+        assert watcher.unopened_devices == [USB0.device]
+
+
+class TestThread(object):
+
+    @pytest.mark.timeout(10)
+    def test_polling(self, ports, probe, cache, monkeypatch):
+        monkeypatch.setattr(hotplug, "watch_directory", lambda path: None)
+        # on Windows, select only accepts sockets
+        monkeypatch.setattr(hotplug, "select",
+                            Mock(side_effect=OSError("not a socket")))
+        watcher = PortWatcher(0.01, cache=cache)
+        added = Event()
+        watcher.on_added(lambda port: added.set())
+        watcher.start()
+        try:
+            assert added.wait(5)
+            assert watcher.is_running()
+            assert not watcher.uses_inotify()
+            added.clear()
+            ports.append(ACM1)
+            assert added.wait(5)
+        finally:
+            watcher.stop(5)
+        assert not watcher.is_running()
+
+    @pytest.mark.timeout(10)
+    def test_stop_polling(self, ports, probe, monkeypatch):
+        monkeypatch.setattr(hotplug, "watch_directory", lambda path: None)
+        watcher = PortWatcher(60, cache=None)
+        watcher.start()
+        watcher.stop(5)
+        assert not watcher.is_running()
+
+    @linux_only
+    @pytest.mark.timeout(10)
+    def test_inotify(self, ports, probe, cache, tmpdir, monkeypatch):
+        monkeypatch.setattr(hotplug, "SETTLE_TIME", 0)
+        watcher = PortWatcher(60, cache=cache, directory=str(tmpdir))
+        added = Event()
+        watcher.on_added(lambda port: added.set())
+        watcher.start()
+        try:
+            assert added.wait(5)
+            assert watcher.uses_inotify()
+            added.clear()
+            ports.append(ACM1)
+            tmpdir.join("ttyACM1").write("")
+            assert added.wait(5)
+        finally:
+            watcher.stop(5)
+        assert not watcher.is_running()
+
+    @linux_only
+    @pytest.mark.timeout(10)
+    def test_inotify_retries_only_unopened_ports(
+            self, ports, probe, busy, cache, tmpdir):
+        busy.add(ACM0.device)
+        watcher = PortWatcher(0.01, cache=cache, directory=str(tmpdir),
+                              retry_interval=0.05)
+        added = Event()
+        watcher.on_added(lambda port: added.set())
+        watcher.start()
+        try:
+            while probe.call_count < 5:
+                Event().wait(0.01)
+            assert [call[0][0] for call in probe.call_args_list[2:5]] == \
+                [ACM0.device] * 3
+            busy.clear()
+            assert added.wait(5)
+        finally:
+            watcher.stop(5)
+
+    @linux_only
+    @pytest.mark.timeout(10)
+    def test_inotify_does_not_poll(self, ports, probe, tmpdir):
+        watcher = PortWatcher(0.01, cache=None, directory=str(tmpdir))
+        watcher.start()
+        try:
+            Event().wait(0.2)
+        finally:
+            watcher.stop(5)
+        assert probe.call_count == len(ports)
+
+
+class TestWatchDirectory(object):
+
+    @linux_only
+    def test_changes_are_readable(self, tmpdir):
+        file_descriptor = watch_directory(str(tmpdir))
+        try:
+            with pytest.raises(BlockingIOError):
+                os.read(file_descriptor, 4096)
+            tmpdir.join("ttyUSB3").write("")
+            assert os.read(file_descriptor, 4096)
+        finally:
+            os.close(file_descriptor)
+
+    def test_missing_directory(self, tmpdir):
+        assert watch_directory(str(tmpdir.join("missing"))) is None
@@ -9,6 +9,7 @@ from AYABInterface.actions import SwitchOnMachine, \
 from AYABInterface.carriages import KnitCarriage
 from unittest.mock import Mock
 from AYABInterface.machines import KH910
+from AYABInterface.travel import END_OF_LINE_OFFSET
 from pytest import fixture, raises
 import AYABInterface.interaction as interaction
 
@@ -44,6 +45,23 @@ class InteractionTest(object):
     def test_right_end_needle(self, interaction):
         assert interaction.right_end_needle == self.right_end_needle
 
+    def test_row_needle_ranges(self, interaction):
+        number_of_rows = len(self.needle_positions)
+        ranges = list(map(interaction.get_row_needle_range,
+                          range(number_of_rows)))
+        assert ranges == [(self.left_end_needle, self.right_end_needle)] * \
+            number_of_rows
+
+    def test_carriage_movements(self, interaction):
+        number_of_rows = len(self.needle_positions)
+        width = self.right_end_needle - self.left_end_needle + \
+            2 * END_OF_LINE_OFFSET
+        distances = [movement.distance
+                     for movement in interaction.carriage_movements]
+        assert distances == [width] * number_of_rows
+        time = interaction.estimate_knitting_time(speed=width, turn_time=1)
+        assert time == 2 * number_of_rows - 1
+
 
 class TestOneColorBlockPattern(InteractionTest):
 
@@ -0,0 +1,97 @@
+"""Test :mod:`AYABInterface.passes`."""
+import pytest
+from AYABInterface.passes import plan_passes, passes_to_actions, \
+    count_color_changes, Pass
+from AYABInterface.convert import colors_to_needle_positions
+from AYABInterface.actions import MoveCarriageToTheLeft, \
+    MoveCarriageToTheRight, PutColorInNutA, PutColorInNutB
+from AYABInterface.carriages import KnitCarriage
+from itertools import permutations, product
+
+
+def pass_colors(rows, color=None):
+    passes = plan_passes(colors_to_needle_positions(rows), color)
+    return [(pass_.row, pass_.colors) for pass_ in passes]
+
+
+def all_orders(needles):
+    """All the orders of the passes of the rows."""
+    for orders in product(*(permutations(row) for row in needles)):
+        yield [Pass(index, needle_positions, needle_positions.colors)
+               for index, order in enumerate(orders)
+               for needle_positions in order]
+
+
+class TestPlanPasses(object):
+
+    def test_one_and_two_colors(self):
+        assert pass_colors([[1, 1], [1, 2], [2, 1]]) == \
+            [(0, (1,)), (1, (1, 2)), (2, (2, 1))]
+
+    def test_continue_with_the_last_color(self):
+        assert pass_colors([[0, 1, 2], [2, 3, 4]]) == [
+            (0, (0,)), (0, (1,)), (0, (2,)),
+            (1, (2,)), (1, (3,)), (1, (4,))]
+
+    def test_end_with_the_color_of_the_next_row(self):
+        assert pass_colors([[0, 1, 2], [1, 3, 4]]) == [
+            (0, (0,)), (0, (2,)), (0, (1,)),
+            (1, (1,)), (1, (3,)), (1, (4,))]
+
+    def test_start_with_the_color_in_the_nut(self):
+        assert pass_colors([[0, 1, 2]], 2)[0] == (0, (2,))
+
+    def test_needle_positions_of_the_color(self):
+        needles = colors_to_needle_positions([[0, 1, 2, 1]])
+        passes = plan_passes(needles, 2)
+        assert [pass_.needle_positions.needle_coloring
+                for pass_ in passes][0] == [1, 1, 0, 1]
+        assert sorted(pass_.needle_positions for pass_ in passes) == \
+            sorted(needles[0])
+
+    def test_empty_rows(self):
+        assert pass_colors([[0, 1, 2], [], [2, 3, 4]]) == [
+            (0, (0,)), (0, (1,)), (0, (2,)),
+            (2, (2,)), (2, (3,)), (2, (4,))]
+        assert plan_passes([]) == []
+
+    @pytest.mark.parametrize("rows", [
+        [[0, 1, 2], [1, 2, 3], [2, 0, 4], [0, 1, 2]],
+        [[0, 1, 2], [2], [0, 2, 1], [1, 0], [1, 3, 2]],
+        [[0, 1, 2, 3], [3, 0, 1, 2], [1, 2, 4]]])
+    def test_least_color_changes(self, rows):
+        needles = colors_to_needle_positions(rows)
+        best = min(map(count_color_changes, all_orders(needles)))
+        assert count_color_changes(plan_passes(needles)) == best
+
+
+class TestActions(object):
+
+    def test_actions(self):
+        passes = plan_passes(colors_to_needle_positions(
+            [[0, 1], [0, 2], [3, 4, 3]]))
+        carriage = KnitCarriage()
+        assert passes_to_actions(passes) == [
+            PutColorInNutA(0), PutColorInNutB(1),
+            MoveCarriageToTheRight(carriage),
+            PutColorInNutB(2),
+            MoveCarriageToTheLeft(carriage),
+            PutColorInNutA(3), PutColorInNutB(4),
+            MoveCarriageToTheRight(carriage)]
+
+    def test_carriage(self):
+        passes = plan_passes(colors_to_needle_positions([[0], [0]]))
+        carriage = object()
+        assert passes_to_actions(passes, carriage)[1:] == [
+            MoveCarriageToTheRight(carriage), MoveCarriageToTheLeft(carriage)]
+
+
+class TestCountColorChanges(object):
+
+    @pytest.mark.parametrize("colors,changes", [
+        ([], 0), ([(1,)], 0), ([(1,), (1,)], 0), ([(1,), (2,), (1,)], 2),
+        ([(1, 2), (1, 3), (3,)], 2), ([(1,), (1, 2)], 0)])
+    def test_count(self, colors, changes):
+        passes = [Pass(index, None, colors_)
+                  for index, colors_ in enumerate(colors)]
+        assert count_color_changes(passes) == changes
@@ -0,0 +1,111 @@
+"""Test :class:`AYABInterface.needle_positions.RepeatedNeedlePositions`."""
+import pytest
+from pytest import fixture, raises
+from AYABInterface import RepeatedNeedlePositions
+from collections import namedtuple
+Machine = namedtuple("Machine", ("number_of_needles", "needle_positions"))
+
+
+@fixture
+def machine():
+    return Machine(7, ("B", "D"))
+
+
+@fixture
+def motif():
+    return [["D", "B"], ["B", "D"], ["D", "D"]]
+
+
+def rows(needle_positions):
+    result = []
+    while True:
+        row = needle_positions.get_row(len(result))
+        if row is None:
+            return result
+        result.append(row)
+
+
+class TestRows(object):
+
+    def test_fill_the_machine(self, motif, machine):
+        needle_positions = RepeatedNeedlePositions(motif, machine)
+        assert rows(needle_positions) == [
+            list("DBDBDBB"), list("BDBDBDB"), list("DDDDDDB")]
+
+    def test_repeats_and_offsets(self, motif, machine):
+        needle_positions = RepeatedNeedlePositions(
+            motif, machine, horizontal_repeats=2, vertical_repeats=2,
+            horizontal_offset=1, vertical_offset=1)
+        assert needle_positions.number_of_rows == 6
+        assert rows(needle_positions) == [
+            list("BBDBDBB"), list("BDDDDBB"), list("BDBDBBB")] * 2
+
+    def test_centered(self, machine):
+        needle_positions = RepeatedNeedlePositions(
+            [["D"]], machine, horizontal_repeats=3)
+        assert needle_positions.get_row(0) == list("BBDDDBB")
+
+    def test_rows_are_shared(self, motif, machine):
+        needle_positions = RepeatedNeedlePositions(motif, machine,
+                                                   vertical_repeats=5)
+        assert needle_positions.get_row(1) is needle_positions.get_row(13)
+        assert needle_positions.get_row(1) is not needle_positions.get_row(2)
+
+    @pytest.mark.parametrize("index", [-1, 3, 1.0, None])
+    def test_outside(self, motif, machine, index):
+        needle_positions = RepeatedNeedlePositions(motif, machine)
+        assert needle_positions.get_row(index, "default") == "default"
+
+    def test_many_rows_are_not_expanded(self, motif, machine):
+        needle_positions = RepeatedNeedlePositions(
+            motif, machine, vertical_repeats=10 ** 9)
+        assert needle_positions.number_of_rows == 3 * 10 ** 9
+        assert needle_positions.get_row(3 * 10 ** 9 - 1) == list("DDDDDDB")
+
+    def test_motif(self, motif, machine):
+        assert RepeatedNeedlePositions(motif, machine).motif is motif
+
+
+class TestRepeatedRows(object):
+
+    """Test the sequence of rows of a repetition."""
+
+    @fixture
+    def repeated_rows(self, motif, machine):
+        return RepeatedNeedlePositions(motif, machine,
+                                       vertical_repeats=2)._rows
+
+    def test_slice(self, repeated_rows):
+        assert repeated_rows[1:5:2] == [list("BDBDBDB"), list("DBDBDBB")]
+        assert repeated_rows[1] is repeated_rows[4:][0]
+
+    def test_negative_index(self, repeated_rows):
+        assert repeated_rows[-1] is repeated_rows[2]
+
+    @pytest.mark.parametrize("index", [1.0, None, "1"])
+    def test_invalid_index(self, repeated_rows, index):
+        with raises(TypeError):
+            repeated_rows[index]
+
+
+class TestCheck(object):
+
+    def test_row_length(self, machine):
+        with raises(ValueError) as error:
+            RepeatedNeedlePositions([["B", "D"], ["B"]], machine)
+        assert error.value.args[0] == \
+            "The length of row 1 is 1 but 2 is expected."
+
+    @pytest.mark.parametrize("repeats,offset", [(4, 0), (3, 2), (1, -1)])
+    def test_too_wide(self, motif, machine, repeats, offset):
+        with raises(ValueError) as error:
+            RepeatedNeedlePositions(motif, machine, horizontal_repeats=repeats,
+                                    horizontal_offset=offset)
+        assert error.value.args[0] == "{} repeats of a motif with width 2 " \
+            "at needle {} do not fit on 7 needles.".format(repeats, offset)
+
+    def test_needle_position(self, machine):
+        with raises(ValueError) as error:
+            RepeatedNeedlePositions([["B", "D"], ["B", "X"]], machine)
+        assert error.value.args[0] == "Needle position in row 1 at index 1 " \
+            "is 'X' but one of 'B', 'D' was expected."
@@ -1,6 +1,10 @@
 """Test the serial specification."""
 from AYABInterface.serial import list_serial_ports, list_serial_port_strings, \
-    SerialPort
+    SerialPort, SerialConfiguration, set_low_latency, BAUD_RATE, \
+    DEFAULT_CONFIGURATION, LOW_LATENCY_CONFIGURATION, list_port_candidates, \
+    probe_concurrently, list_port_information, PortInformation
+from serial.tools import list_ports
+from threading import Event
 import AYABInterface
 import AYABInterface.serial as serial
 import pytest
@@ -34,6 +38,89 @@ class TestListPorts(object):
     def test_list_serial_ports_strings_works(self):
         assert isinstance(list_serial_port_strings(), list)
 
+    def test_only_candidates_that_can_be_opened_are_listed(self, monkeypatch):
+        monkeypatch.setattr(serial, "list_port_candidates",
+                            Mock(return_value=["a", "b", "c"]))
+
+        def Serial(port):
+            if port == "b":
+                raise OSError("busy")
+            return Mock()
+        monkeypatch.setattr(serial, "Serial", Serial)
+        assert list_serial_port_strings(usb_only=True) == ["a", "c"]
+        serial.list_port_candidates.assert_called_once_with(True)
+
+
+def port_info(device, vid=None):
+    return Mock(device=device, vid=vid)
+
+
+class TestListPortCandidates(object):
+
+    """Test list_port_candidates."""
+
+    @pytest.fixture(autouse=True)
+    def comports(self, monkeypatch):
+        comports = Mock(return_value=[
+            port_info("/dev/ttyS0"), port_info("/dev/ttyUSB1", 0x0403),
+            port_info("/dev/ttyACM0", 0x2341), port_info("/dev/ttyUSB0", 0x1)])
+        monkeypatch.setattr(list_ports, "comports", comports)
+        return comports
+
+    def test_known_vendors_come_first(self):
+        assert list_port_candidates() == [
+            "/dev/ttyACM0", "/dev/ttyUSB1", "/dev/ttyS0", "/dev/ttyUSB0"]
+
+    def test_usb_only(self):
+        assert list_port_candidates(True) == ["/dev/ttyACM0", "/dev/ttyUSB1"]
+
+    def test_port_information(self, comports):
+        comports.return_value = [Mock(device="/dev/ttyACM0", vid=0x2341,
+                                      pid=0x43, serial_number="A1")]
+        assert list_port_information() == [
+            PortInformation("/dev/ttyACM0", 0x2341, 0x43, "A1")]
+
+
+class TestProbeConcurrently(object):
+
+    """Test probe_concurrently."""
+
+    def test_results(self):
+        assert probe_concurrently([1, 2, 3], lambda port: port * 2) == \
+            {1: 2, 2: 4, 3: 6}
+
+    def test_failing_probes_are_left_out(self):
+        def probe(port):
+            if port == 2:
+                raise ValueError()
+            return port
+        assert probe_concurrently([1, 2, 3], probe) == {1: 1, 3: 3}
+
+    def test_slow_probes_are_left_out(self):
+        release = Event()
+
+        def probe(port):
+            if port == "slow":
+                release.wait()
+            return port
+        try:
+            assert probe_concurrently(["slow", "fast"], probe, 0.1) == \
+                {"fast": "fast"}
+        finally:
+            release.set()
+
+    def test_probes_run_at_the_same_time(self):
+        started = []
+        all_started = Event()
+
+        def probe(port):
+            started.append(port)
+            if len(started) == 3:
+                all_started.set()
+            return all_started.wait(1)
+        assert probe_concurrently([1, 2, 3], probe, 2) == \
+            {1: True, 2: True, 3: True}
+
 
 class TestSerialPort(object):
 
@@ -55,7 +142,7 @@ class TestSerialPort(object):
         serial_port = SerialPort(port)
         serial_connection = serial_port.connect()
         assert serial_connection == Serial.return_value
-        Serial.assert_called_once_with(port, 115200)
+        Serial.assert_called_once_with(port, 115200, exclusive=True)
 
     def test_can_mock_serial_Serial(self):
         from serial import Serial
@@ -66,3 +153,93 @@ class TestSerialPort(object):
         serial_port = SerialPort(port)
         string = repr(serial_port)
         assert string == "<SerialPort \"{}\">".format(port)
+
+    def test_default_configuration(self):
+        assert SerialPort("COM1").configuration == DEFAULT_CONFIGURATION
+
+    def test_connections_are_exclusive(self):
+        assert DEFAULT_CONFIGURATION.exclusive
+
+    def test_controller(self):
+        controller = Mock()
+        assert SerialPort("COM1").controller is None
+        assert SerialPort("COM1", controller=controller).controller == \
+            controller
+
+    def test_connect_with_configuration(self, monkeypatch):
+        configuration = Mock()
+        serial_port = SerialPort("COM3", configuration)
+        assert serial_port.configuration == configuration
+        assert serial_port.connect() == configuration.open.return_value
+        configuration.open.assert_called_once_with("COM3")
+
+
+class TestSerialConfiguration(object):
+
+    """Test the SerialConfiguration."""
+
+    @pytest.fixture
+    def Serial(self, monkeypatch):
+        Serial = Mock()
+        Serial.return_value = Mock(spec=["read", "write"])
+        monkeypatch.setattr(serial, "Serial", Serial)
+        return Serial
+
+    def test_default_values(self):
+        configuration = SerialConfiguration()
+        assert configuration.baud_rate == BAUD_RATE == 115200
+        assert configuration.timeout is None
+        assert configuration.inter_byte_timeout is None
+        assert configuration.write_timeout is None
+        assert configuration.exclusive is None
+        assert configuration.receive_buffer_size is None
+        assert configuration.transmit_buffer_size is None
+        assert not configuration.is_low_latency()
+
+    def test_open_passes_only_given_settings(self, Serial):
+        configuration = SerialConfiguration(
+            230400, timeout=0.5, inter_byte_timeout=0.01, exclusive=True)
+        connection = configuration.open("/dev/ttyUSB0")
+        assert connection == Serial.return_value
+        Serial.assert_called_once_with(
+            "/dev/ttyUSB0", 230400, timeout=0.5, inter_byte_timeout=0.01,
+            exclusive=True)
+
+    def test_buffer_sizes(self, Serial):
+        connection = Serial.return_value = Mock()
+        SerialConfiguration(receive_buffer_size=8192,
+                            transmit_buffer_size=1024).open("COM1")
+        connection.set_buffer_size.assert_called_once_with(
+            rx_size=8192, tx_size=1024)
+
+    def test_buffer_sizes_are_ignored_if_not_supported(self, Serial):
+        SerialConfiguration(receive_buffer_size=8192).open("COM1")
+
+    def test_low_latency(self, Serial):
+        connection = Serial.return_value = Mock()
+        LOW_LATENCY_CONFIGURATION.open("/dev/ttyUSB0")
+        connection.set_low_latency_mode.assert_called_once_with(True)
+        assert Serial.call_args[1] == {"exclusive": True}
+
+    def test_repr(self):
+        assert repr(SerialConfiguration(9600)) == \
+            "<SerialConfiguration 9600 baud>"
+
+
+class TestSetLowLatency(object):
+
+    """Test set_low_latency."""
+
+    def test_use_pyserial(self):
+        connection = Mock()
+        assert set_low_latency(connection)
+        connection.set_low_latency_mode.assert_called_once_with(True)
+
+    def test_pyserial_fails(self):
+        connection = Mock()
+        connection.set_low_latency_mode.side_effect = ValueError()
+        assert not set_low_latency(connection)
+
+    def test_not_a_serial_port(self, tmpdir):
+        with open(str(tmpdir.join("file")), "wb") as file:
+            assert not set_low_latency(file)
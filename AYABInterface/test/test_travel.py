@@ -0,0 +1,61 @@
+"""Test :mod:`AYABInterface.travel`."""
+from AYABInterface.travel import carriage_movements, \
+    estimate_knitting_time, Movement
+
+
+class TestCarriageMovements(object):
+
+    def test_single_row(self):
+        assert carriage_movements([(2, 7)], offset=0) == \
+            [Movement(0, 2, 7, 2, 7, 5)]
+
+    def test_alternating_directions(self):
+        movements = carriage_movements([(10, 20), (12, 18), (10, 20)],
+                                       offset=2)
+        assert movements == [
+            Movement(0, 10, 20, 8, 22, 14),
+            Movement(1, 12, 18, 22, 10, 12),
+            Movement(2, 10, 20, 10, 22, 16)]
+
+    def test_move_back_to_start_outside_of_the_row(self):
+        movements = carriage_movements([(10, 20), (30, 40)], offset=0)
+        assert movements[1] == Movement(1, 30, 40, 20, 30, 30)
+
+    def test_start_position(self):
+        assert carriage_movements([(10, 20)], offset=0, start=15) == \
+            [Movement(0, 10, 20, 15, 20, 15)]
+        assert carriage_movements([(10, 20)], offset=0, start=0) == \
+            [Movement(0, 10, 20, 0, 20, 20)]
+
+    def test_rows_without_needles_are_not_skipped(self):
+        movements = carriage_movements([None, (1, 2), None, (3, 4)],
+                                       offset=0)
+        assert movements == [
+            Movement(0, 1, 2, 1, 2, 1),
+            Movement(1, 1, 2, 2, 1, 1),
+            Movement(2, 1, 2, 1, 2, 1),
+            Movement(3, 3, 4, 2, 3, 3)]
+
+    def test_no_row_has_needles(self):
+        assert carriage_movements([None, None], start=5) == [
+            Movement(0, None, None, 5, 5, 0),
+            Movement(1, None, None, 5, 5, 0)]
+
+    def test_trimmed_rows_need_less_travel(self):
+        full = carriage_movements([(0, 100)] * 4)
+        trimmed = carriage_movements([(0, 100), (40, 60), (40, 60),
+                                      (0, 100)])
+        assert sum(movement.distance for movement in trimmed) < \
+            sum(movement.distance for movement in full)
+
+
+class TestEstimateKnittingTime(object):
+
+    def test_no_movements(self):
+        assert estimate_knitting_time([]) == 0
+
+    def test_time(self):
+        movements = carriage_movements([(0, 80), (0, 80), (0, 80)],
+                                       offset=10)
+        assert estimate_knitting_time(movements, speed=50, turn_time=0.5) \
+            == 3 * 100 / 50 + 2 * 0.5
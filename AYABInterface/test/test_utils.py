@@ -2,6 +2,9 @@
 import pytest
 from AYABInterface.utils import sum_all, number_of_colors, next_line, \
     camel_case_to_under_score
+import AYABInterface.utils as utils
+import importlib
+import time
 
 
 class TestSumAll(object):
@@ -21,6 +24,18 @@ class TestSumAll(object):
         assert sum_all(map(set, [[1, 2], [3, 5], [3, 1]]), set([0, 5])) == \
             set([0, 1, 2, 3, 5])
 
+    def test_list_is_extended(self):
+        start = [1]
+        assert sum_all(iter([(2, 3), [4]]), start) is start
+        assert start == [1, 2, 3, 4]
+
+    def test_tuples(self):
+        assert sum_all([(1,), (2, 3)], ()) == (1, 2, 3)
+
+    def test_frozen_sets(self):
+        assert sum_all([frozenset([1]), frozenset([2])], frozenset()) == \
+            frozenset([1, 2])
+
 
 class TestNumberOfColors(object):
 
@@ -33,6 +48,21 @@ class TestNumberOfColors(object):
         """Test different inputs."""
         assert number_of_colors(colors) == number
 
+    @pytest.mark.parametrize("maximum", [4, 5, 100])
+    def test_maximum_is_not_exceeded(self, maximum):
+        rows = [[1, 2], [3], [1, 4]]
+        assert number_of_colors(rows, maximum) == 4
+
+    def test_stop_after_maximum(self):
+        def rows():
+            yield [1, 2]
+            yield [3, 3]
+            assert False, "the rows after the maximum should not be read"
+        assert number_of_colors(rows(), 2) == 3
+
+    def test_rows_of_any_iterable(self):
+        assert number_of_colors([b"\x00\x01", "ab", iter([1, 9])]) == 5
+
 
 class TestNextLine(object):
 
@@ -62,3 +92,20 @@ class TestCamelCase(object):
         ("A", "a"), ("AA", "a_a"), ("ACalCal", "a_cal_cal"), ("NaN", "na_n")])
     def test_conversion(self, input, output):
         assert camel_case_to_under_score(input) == output
+
+
+class TestPerfCounterNs(object):
+
+    """Test the fallback of perf_counter_ns for Python 3.6 and lower."""
+
+    @pytest.fixture
+    def fallback(self, monkeypatch):
+        monkeypatch.delattr(time, "perf_counter_ns", raising=False)
+        monkeypatch.setattr(time, "perf_counter", lambda: 1.5)
+        yield importlib.reload(utils).perf_counter_ns
+        monkeypatch.undo()
+        importlib.reload(utils)
+
+    def test_nanoseconds(self, fallback):
+        assert fallback() == 1500000000
+        assert isinstance(fallback(), int)
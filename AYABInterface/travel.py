@@ -0,0 +1,105 @@
+"""Compute the travel of the carriage and estimate the knitting time.
+
+The :ref:`reqstart` contains the left and right end needle of the whole
+pattern. A row may use fewer needles, so the carriage does not need to move
+over the whole range every time. :func:`carriage_movements` computes how
+far the carriage has to move for each row if it only moves past the
+needles of the row:
+
+.. code:: python
+
+    movements = carriage_movements([(10, 20), (12, 18), (10, 20)])
+    print(sum(movement.distance for movement in movements), "needles")
+    print(estimate_knitting_time(movements), "seconds")
+
+The needle ranges of the rows of a knitting pattern come from
+:meth:`AYABInterface.interaction.Interaction.get_row_needle_range`.
+:attr:`AYABInterface.interaction.Interaction.carriage_movements` and
+:meth:`AYABInterface.interaction.Interaction.estimate_knitting_time` use
+them.
+
+Positions and distances are measured in needles.
+"""
+from collections import namedtuple
+
+#: the needles the carriage moves past the last needle of a row so that
+#: all its needles are knit
+END_OF_LINE_OFFSET = 12
+
+#: the needles the carriage moves per second
+CARRIAGE_SPEED = 100
+
+#: the seconds needed to turn the carriage around between two rows
+TURN_TIME = 1
+
+#: A movement of the carriage to knit a :attr:`row`. The needles of the row
+#: go from :attr:`left_needle` to :attr:`right_needle`. The carriage moves
+#: from the position :attr:`start` to :attr:`end`. The :attr:`distance`
+#: includes moving back if the carriage did not start outside the row.
+Movement = namedtuple("Movement", ["row", "left_needle", "right_needle",
+                                   "start", "end", "distance"])
+
+
+def carriage_movements(ranges, offset=END_OF_LINE_OFFSET, start=None):
+    """Compute the shortest movements of the carriage to knit the rows.
+
+    :param ranges: an iterable over the needle ranges ``(left_needle,
+      right_needle)`` of the rows. A row with the range :obj:`None` has no
+      needles. The carriage still passes over the range of the row before
+      it or, for the first rows, of the next row with needles.
+    :param int offset: the needles to move past the end of each row
+    :param int start: the position of the carriage before the first row.
+      By default, it is left of the first row.
+    :rtype: list
+    :return: a list of :class:`Movements <Movement>`. The carriage moves to
+      the right first and then alternates.
+    """
+    ranges = list(ranges)
+    movements = []
+    position = start
+    known_range = next((needle_range for needle_range in ranges
+                        if needle_range is not None), None)
+    for row, needle_range in enumerate(ranges):
+        if needle_range is None:
+            needle_range = known_range
+        else:
+            known_range = needle_range
+        if needle_range is None:
+            # no row has needles
+            movements.append(Movement(row, None, None, position, position,
+                                      0))
+            continue
+        left_needle, right_needle = needle_range
+        low = left_needle - offset
+        high = right_needle + offset
+        if position is None:
+            position = low
+        if len(movements) % 2 == 0:
+            begin = min(position, low)
+            end = high
+            distance = position - begin + end - begin
+        else:
+            begin = max(position, high)
+            end = low
+            distance = begin - position + begin - end
+        movements.append(Movement(row, left_needle, right_needle, position,
+                                  end, distance))
+        position = end
+    return movements
+
+
+def estimate_knitting_time(movements, speed=CARRIAGE_SPEED,
+                           turn_time=TURN_TIME):
+    """Estimate the seconds needed to knit.
+
+    :param list movements: a list of :class:`Movements <Movement>`
+    :param float speed: the needles the carriage moves per second
+    :param float turn_time: the seconds needed to turn the carriage around
+      between two movements
+    :rtype: float
+    """
+    distance = sum(movement.distance for movement in movements)
+    return distance / speed + turn_time * max(len(movements) - 1, 0)
+
+__all__ = ["carriage_movements", "estimate_knitting_time", "Movement",
+           "END_OF_LINE_OFFSET", "CARRIAGE_SPEED", "TURN_TIME"]
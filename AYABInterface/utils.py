@@ -1,13 +1,34 @@
 """Utility methods."""
+try:
+    from time import perf_counter_ns
+except ImportError:
+    # Python 3.6 and lower
+    from time import perf_counter
+
+    def perf_counter_ns():
+        """The value of :func:`time.perf_counter` in nanoseconds.
+
+        :rtype: int
+        """
+        return int(perf_counter() * 1000000000)
 
 
 def sum_all(iterable, start):
     """Sum up an iterable starting with a start value.
 
     In contrast to :func:`sum`, this also works on other types like
-    :class:`lists <list>` and :class:`sets <set>`.
+    :class:`lists <list>` and :class:`sets <set>`. Lists and sets are
+    extended in place.
     """
-    if hasattr(start, "__add__"):
+    if isinstance(start, list):
+        extend = start.extend
+        for value in iterable:
+            extend(value)
+    elif isinstance(start, set):
+        update = start.update
+        for value in iterable:
+            update(value)
+    elif hasattr(start, "__add__"):
         for value in iterable:
             start += value
     else:
@@ -16,12 +37,30 @@ def sum_all(iterable, start):
     return start
 
 
-def number_of_colors(rows):
+def number_of_colors(rows, maximum=None):
     """Determine the numer of colors in the rows.
 
+    :param rows: an iterable over rows of colors
+    :param int maximum: If the rows have more colors than this, stop
+      counting after the row with the first color too many. Use this to
+      check large patterns against the colors a machine can knit.
     :rtype: int
+    :return: the number of colors or, if counting stopped early, a number
+      greater than :paramref:`maximum`
+
+    The colors are collected in one :class:`set` in a single pass.
     """
-    return len(sum_all(map(set, rows), set()))
+    colors = set()
+    update = colors.update
+    if maximum is None:
+        for row in rows:
+            update(row)
+        return len(colors)
+    for row in rows:
+        update(row)
+        if len(colors) > maximum:
+            break
+    return len(colors)
 
 
 def next_line(last_line, next_line_8bit):
@@ -68,4 +107,4 @@ def camel_case_to_under_score(camel_case_name):
     return "".join(result)
 
 __all__ = ["sum_all", "number_of_colors", "next_line",
-           "camel_case_to_under_score"]
+           "camel_case_to_under_score", "perf_counter_ns"]
@@ -0,0 +1,11 @@
+"""Benchmarks for the hot paths of the AYABInterface.
+
+The benchmarks follow the naming conventions of `airspeed velocity
+<https://asv.readthedocs.io/>`__: each class has an optional ``setup``
+method and ``time_*`` methods which are timed. The attribute
+``operations`` tells how many operations one call of a ``time_*`` method
+performs so that the rate can be reported.
+
+Run all benchmarks with ``python -m benchmarks`` from the repository root.
+The memory of long sessions is measured with ``python -m benchmarks.memory``.
+"""
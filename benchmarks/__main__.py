@@ -0,0 +1,54 @@
+"""Run the benchmarks and print the rates.
+
+Usage::
+
+    python -m benchmarks [name ...]
+
+Only the benchmarks whose ``module.Class.method`` name contains one of the
+given names are run.
+"""
+from timeit import Timer
+import importlib
+import sys
+
+MODULES = ["messages", "encoding", "convert", "session"]
+REPEAT = 5  #: the number of measurements of which the fastest is reported
+
+
+def benchmarks(module_names=MODULES):
+    """Yield the names, classes and methods of the benchmarks."""
+    for module_name in module_names:
+        module = importlib.import_module(__package__ + "." + module_name)
+        for class_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or class_name.startswith("_") or \
+                    cls.__module__ != module.__name__:
+                continue
+            for method_name in sorted(vars(cls)):
+                if method_name.startswith("time_"):
+                    yield ("{}.{}.{}".format(module_name, class_name,
+                                             method_name), cls, method_name)
+
+
+def run(name, cls, method_name, repeat=REPEAT):
+    """Run a benchmark.
+
+    :return: the fastest time in seconds and the operations per second
+    """
+    benchmark = cls()
+    if hasattr(benchmark, "setup"):
+        benchmark.setup()
+    seconds = min(Timer(getattr(benchmark, method_name)).repeat(repeat, 1))
+    operations = getattr(benchmark, "operations", 1)
+    return seconds, operations / seconds
+
+
+def main(arguments):
+    """Run the selected benchmarks and print the results."""
+    for name, cls, method_name in benchmarks():
+        if arguments and not any(argument in name for argument in arguments):
+            continue
+        seconds, rate = run(name, cls, method_name)
+        print("{:<64} {:>10.4f}s {:>14.1f}/s".format(name, seconds, rate))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,41 @@
+"""Benchmark the conversion of colors to needle positions."""
+from AYABInterface.convert import colors_to_needle_positions, \
+    colors_to_packed_needle_positions
+
+NUMBER_OF_ROWS = 500
+WIDTH = 200
+
+
+def rows(number_of_colors):
+    """Rows of a jacquard pattern with a number of colors."""
+    return [[(needle * (row + 1) // 3) % number_of_colors
+             for needle in range(WIDTH)]
+            for row in range(NUMBER_OF_ROWS)]
+
+
+class ColorsToNeedlePositions(object):
+
+    """Rows converted per second in colors_to_needle_positions."""
+
+    operations = NUMBER_OF_ROWS
+
+    def setup(self):
+        self.two_colors = rows(2)
+        self.six_colors = rows(6)
+
+    def time_two_colors(self):
+        colors_to_needle_positions(self.two_colors)
+
+    def time_six_colors(self):
+        colors_to_needle_positions(self.six_colors)
+
+
+class ColorsToPackedNeedlePositions(ColorsToNeedlePositions):
+
+    """Rows converted per second in colors_to_packed_needle_positions."""
+
+    def time_two_colors(self):
+        colors_to_packed_needle_positions(self.two_colors)
+
+    def time_six_colors(self):
+        colors_to_packed_needle_positions(self.six_colors)
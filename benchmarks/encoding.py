@@ -0,0 +1,72 @@
+"""Benchmark the conversion of needle positions to the wire format."""
+from AYABInterface.communication.cache import NeedlePositionCache
+from AYABInterface.machines import KH910
+
+NUMBER_OF_LINES = 1000
+
+
+def lines():
+    """Different lines of needle positions for a KH910."""
+    return [[("B", "D")[(line >> (needle % 10)) & 1] for needle in range(200)]
+            for line in range(NUMBER_OF_LINES)]
+
+
+def repeated_lines(repeat=10):
+    """A stripe pattern that repeats every few lines."""
+    return lines()[:repeat] * (NUMBER_OF_LINES // repeat)
+
+
+class NeedlePositionsToBytes(object):
+
+    """Lines encoded per second in Machine.needle_positions_to_bytes."""
+
+    operations = NUMBER_OF_LINES
+
+    def setup(self):
+        self.machine = KH910()
+        self.lines = lines()
+
+    def time_needle_positions_to_bytes(self):
+        to_bytes = self.machine.needle_positions_to_bytes
+        for line in self.lines:
+            to_bytes(line)
+
+
+class LineConfigurationMessages(object):
+
+    """Lines encoded per second in the NeedlePositionCache."""
+
+    operations = NUMBER_OF_LINES
+
+    def setup(self):
+        self.machine = KH910()
+        self.lines = lines()
+        self.cache = NeedlePositionCache(self._get_line, self.machine)
+        self.time_cached()
+
+    def _get_line(self, line_number):
+        if 0 <= line_number < NUMBER_OF_LINES:
+            return self.lines[line_number]
+        return None
+
+    def time_uncached(self):
+        cache = NeedlePositionCache(self._get_line, self.machine)
+        for line_number in range(NUMBER_OF_LINES):
+            cache.get_line_configuration_message(line_number)
+
+    def time_cached(self):
+        cache = self.cache
+        for line_number in range(NUMBER_OF_LINES):
+            cache.get_line_configuration_message(line_number)
+
+
+class RepeatedLineConfigurationMessages(LineConfigurationMessages):
+
+    """Lines of a repeat encoded per second in the NeedlePositionCache."""
+
+    def setup(self):
+        self.machine = KH910()
+        self.lines = repeated_lines()
+
+    def time_uncached(self):
+        LineConfigurationMessages.time_uncached(self)
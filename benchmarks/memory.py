@@ -0,0 +1,114 @@
+"""Measure the memory of long knitting sessions.
+
+This runs a simulated session through the
+:class:`~AYABInterface.communication.Communication` and takes
+:mod:`tracemalloc` snapshots at regular intervals.
+Execute it to print a report::
+
+    python -m benchmarks.memory [number_of_lines [interval]]
+
+The report shows for each interval the traced memory, the bytes allocated
+per line, the entries in the
+:class:`~AYABInterface.communication.cache.NeedlePositionCache` and the
+number of observers. At the end, the peak resident set size and the
+allocations that grew the most are shown.
+"""
+from .session import knit
+from collections import namedtuple
+import tracemalloc
+import sys
+
+NUMBER_OF_LINES = 100000  #: the default length of the session
+INTERVAL = 10000  #: the default number of lines between the snapshots
+TOP_ALLOCATIONS = 10  #: the number of grown allocations in the report
+
+#: the measurement after a number of lines
+Sample = namedtuple("Sample", ["line", "traced_bytes", "bytes_per_line",
+                               "cache_entries", "observers"])
+
+
+def peak_resident_set_size():
+    """The peak resident set size of the process in bytes.
+
+    :return: the size or :obj:`None` if it can not be determined
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak
+    return peak * 1024
+
+
+def _number_of_observers(communication):
+    """The number of registered observers of the communication."""
+    return (len(communication._on_message) +
+            len(communication._on_frame) +
+            len(communication._on_message_received))
+
+
+def measure(number_of_lines=NUMBER_OF_LINES, interval=INTERVAL):
+    """Run a session and measure the memory.
+
+    :param int number_of_lines: the number of lines to knit
+    :param int interval: the number of lines between the samples
+    :return: a tuple ``(samples, statistics, peak)`` with a list of
+      :class:`Samples <Sample>`, the :class:`tracemalloc.StatisticDiff`
+      between the first and the last snapshot and the
+      :func:`peak_resident_set_size`
+    """
+    samples = []
+    snapshots = []
+
+    def on_line(communication, line_number):
+        if line_number % interval:
+            return
+        traced_bytes = tracemalloc.get_traced_memory()[0]
+        if samples:
+            last = samples[-1]
+            bytes_per_line = (traced_bytes - last.traced_bytes) / \
+                (line_number - last.line)
+        else:
+            bytes_per_line = None
+        samples.append(Sample(
+            line_number, traced_bytes, bytes_per_line,
+            len(communication.needle_positions),
+            _number_of_observers(communication)))
+        snapshots.append(tracemalloc.take_snapshot())
+
+    tracemalloc.start()
+    try:
+        knit(number_of_lines, on_line, record_lines=False)
+        statistics = []
+        if len(snapshots) >= 2:
+            statistics = snapshots[-1].compare_to(snapshots[0], "lineno")
+    finally:
+        tracemalloc.stop()
+    return samples, statistics, peak_resident_set_size()
+
+
+def main(arguments):
+    """Print the report of a measurement."""
+    number_of_lines = int(arguments[0]) if arguments else NUMBER_OF_LINES
+    interval = int(arguments[1]) if len(arguments) > 1 else INTERVAL
+    samples, statistics, peak = measure(number_of_lines, interval)
+    print("{:>10} {:>14} {:>14} {:>14} {:>10}".format(
+        "line", "traced bytes", "bytes/line", "cache entries", "observers"))
+    for sample in samples:
+        print("{:>10} {:>14} {:>14} {:>14} {:>10}".format(
+            sample.line, sample.traced_bytes,
+            "" if sample.bytes_per_line is None else
+            "{:.1f}".format(sample.bytes_per_line),
+            sample.cache_entries, sample.observers))
+    print()
+    print("peak resident set size:",
+          "unknown" if peak is None else "{} bytes".format(peak))
+    print()
+    print("largest growth:")
+    for statistic in statistics[:TOP_ALLOCATIONS]:
+        print(statistic)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
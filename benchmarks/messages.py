@@ -0,0 +1,39 @@
+"""Benchmark the parsing of the messages from the controller."""
+from AYABInterface.communication.hardware_messages import read_message_type
+from io import BytesIO
+
+NUMBER_OF_MESSAGES = 10000
+
+
+class _Communication(object):
+
+    """The part of the communication the messages use."""
+
+    last_requested_line_number = 0
+
+
+class MessageParsing(object):
+
+    """Messages parsed per second in hardware_messages."""
+
+    operations = NUMBER_OF_MESSAGES
+
+    def setup(self):
+        line_requests = b''.join(bytes([0x82, i & 255]) + b'\r\n'
+                                 for i in range(NUMBER_OF_MESSAGES))
+        self.line_requests = line_requests
+        self.state_indications = \
+            b'\x84\x01\x00\x00\x00\x00\x01\x00\r\n' * NUMBER_OF_MESSAGES
+        self.communication = _Communication()
+
+    def _parse(self, data):
+        file = BytesIO(data)
+        communication = self.communication
+        for _ in range(NUMBER_OF_MESSAGES):
+            read_message_type(file)(file, communication)
+
+    def time_line_requests(self):
+        self._parse(self.line_requests)
+
+    def time_state_indications(self):
+        self._parse(self.state_indications)
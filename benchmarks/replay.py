@@ -0,0 +1,54 @@
+"""Replay a recorded session as fast as possible.
+
+A log written by a :class:`~AYABInterface.communication.recording.Recorder`
+is fed through a new :class:`~AYABInterface.communication.Communication`
+without waiting. The needle positions are taken from the recording, so no
+pattern is needed. Execute it to print the lines per second and whether the
+host wrote the same bytes as in the recording::
+
+    python -m benchmarks.replay session.ayabrec [repetitions]
+
+"""
+from AYABInterface.communication import Communication
+from AYABInterface.communication.recording import ReplayFile, read_log, \
+    recorded_needle_positions
+from AYABInterface.machines import KH910
+from time import perf_counter
+import sys
+
+REPETITIONS = 10  #: the default number of replays
+
+
+def replay(chunks, machine, get_needle_positions):
+    """Replay the chunks once.
+
+    :return: the :class:`~AYABInterface.communication.recording.ReplayFile`
+      after the replay
+    """
+    file = ReplayFile(chunks, None)
+    communication = Communication(file, get_needle_positions, machine)
+    communication.start()
+    while not file.is_at_end() and \
+            not communication.state.is_connection_closed():
+        communication.receive_message()
+    return file
+
+
+def main(arguments):
+    """Print the speed of the replay."""
+    with open(arguments[0], "rb") as log:
+        chunks = read_log(log)
+    repetitions = int(arguments[1]) if len(arguments) > 1 else REPETITIONS
+    machine = KH910()
+    lines = recorded_needle_positions(chunks, machine)
+    start = perf_counter()
+    for _ in range(repetitions):
+        file = replay(chunks, machine, lines.get)
+    duration = perf_counter() - start
+    print("lines:", len(lines))
+    print("lines per second: {:.0f}".format(
+        len(lines) * repetitions / duration))
+    print("output matches:", file.output_matches())
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
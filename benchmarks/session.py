@@ -0,0 +1,55 @@
+"""Benchmark complete knitting sessions against the simulator."""
+from AYABInterface.communication import Communication
+from AYABInterface.communication.simulator import Simulator
+from AYABInterface.machines import KH910
+
+NUMBER_OF_LINES = 2000
+
+
+def knit(number_of_lines, on_line=None, record_lines=True,
+         **communication_arguments):
+    """Knit a session with the simulator over a socket pair.
+
+    :param int number_of_lines: the number of lines to knit
+    :param on_line: a callable that is called with the communication and
+      the line number after each line was sent
+    :param bool record_lines: whether the simulator records the lines
+    :return: the communication and the simulator after the session
+    """
+    line = ["B", "D"] * 100
+
+    def get_line(line_number):
+        if 0 <= line_number < number_of_lines:
+            return line
+        return None
+
+    simulator, file = Simulator.socketpair(record_lines=record_lines)
+    simulator.start()
+    communication = Communication(file, get_line, KH910(),
+                                  **communication_arguments)
+    communication.start()
+    state = communication.state
+    while not (state.is_knitting_line() and
+               state.line_number == number_of_lines - 1):
+        communication.receive_message()
+        if on_line is not None and communication.state is not state and \
+                communication.state.is_knitting_line():
+            on_line(communication, communication.state.line_number)
+        state = communication.state
+    simulator.join()
+    simulator.close()
+    communication.receive_message()
+    return communication, simulator
+
+
+class KnittingSession(object):
+
+    """Lines per second of a full session over an in-memory pipe."""
+
+    operations = NUMBER_OF_LINES
+
+    def time_session(self):
+        knit(NUMBER_OF_LINES)
+
+    def time_session_with_history(self):
+        knit(NUMBER_OF_LINES, history_capacity=65536)